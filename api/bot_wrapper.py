@@ -9,12 +9,20 @@ from bot.searcher.base import SearchEngine
 from bot.searcher.question import QuestionSearchEngine
 from bot.searcher.faq import FAQSearchEngine
 from bot.answer.detector import AnswerDetector
+from bot.answer.cascade import CascadeAnswerDetector
+from bot.searcher.selector import CandidateSelector
+from bot.answer.contexts import load_context_store
+from bot.answer.cache import AnswerCache
+from bot.answer.verified import VerifiedAnswerIndex
 from bot.database.sqlite import Database
+from bot.database.connections import ConnectionManager
+from bot.database.writer import BackgroundWriter
 from bot.utils import check_positive, str2bool
 from bot.config import MODELS_DIR
 
 # general python
 import time
+import atexit
 import torch
 import os.path
 import sys
@@ -55,9 +63,28 @@ class Donkeybot:
     :param model: NLP model, e.g. distilbert-base-cased-distilled-squad.
     :param data_storage: db where data is stored.
     :param num_answers_to_predict: number of answers predicted per document looked at.
+    :param quantize: use the int8 quantized model when running on CPU.
+    :param cascade_model: larger model the questions are escalated to when the answers aren't confident enough.
+    :param cascade_threshold: confidence of the best answer under which the question is escalated.
+    :param min_score_fraction: retrieved questions and docs scoring less than this fraction of the top hit aren't read.
+    :param cache_answers: return the cached answers of questions asked before, until the indexes are updated (default is False).
+    :param verified_threshold: similarity to a question whose answer was labeled correct above which that answer is returned, eg. 0.8 (default is None, disabled).
+    :param write_behind: store the answers and labels in a background thread instead of before replying (default is False).
     """
 
-    def __init__(self, model=None, db_name="data_storage", num_answers_to_predict=3):
+    def __init__(
+        self,
+        model=None,
+        db_name="data_storage",
+        num_answers_to_predict=3,
+        quantize=False,
+        cascade_model=None,
+        cascade_threshold=0.5,
+        min_score_fraction=0.0,
+        cache_answers=False,
+        verified_threshold=None,
+        write_behind=False,
+    ):
 
         self.model = "distilbert-base-cased-distilled-squad"
         if model:
@@ -67,22 +94,74 @@ class Donkeybot:
         # better if just CPU for inference
         gpu = 0 if torch.cuda.is_available() else -1
         self.answer_detector = AnswerDetector(
-            model=self.model, device=gpu, num_answers_to_predict=num_answers_to_predict
+            model=self.model,
+            device=gpu,
+            num_answers_to_predict=num_answers_to_predict,
+            quantize=quantize and gpu < 0,
+            context_store=load_context_store(self.db_name, self.model),
         )
-        data_storage = Database(f"{self.db_name}.db")
-        faq_se, docs_se, question_se = setup_search_engines(db=data_storage)
+        if cascade_model:
+            check_model_availability(cascade_model)
+            self.answer_detector = CascadeAnswerDetector(
+                small_detector=self.answer_detector,
+                large_detector=AnswerDetector(
+                    model=cascade_model,
+                    device=gpu,
+                    num_answers_to_predict=num_answers_to_predict,
+                    quantize=quantize and gpu < 0,
+                    context_store=load_context_store(self.db_name, cascade_model),
+                ),
+                confidence_threshold=cascade_threshold,
+            )
+        # each Slack handler thread reads and writes with a connection of its own,
+        # kept open between requests
+        self.connections = ConnectionManager(f"{self.db_name}.db")
+        # the indexes are only read, once, when donkeybot starts
+        index_connections = ConnectionManager(f"{self.db_name}.db", read_only=True)
+        faq_se, docs_se, question_se = setup_search_engines(
+            db=index_connections.database()
+        )
+        index_connections.close_all()
         self.qa_interface = QAInterface(
             detector=self.answer_detector,
             question_engine=question_se,
             faq_engine=faq_se,
             docs_engine=docs_se,
+            question_selector=CandidateSelector(min_score_fraction=min_score_fraction),
+            docs_selector=CandidateSelector(min_score_fraction=min_score_fraction),
+            answer_cache=AnswerCache(db_name=self.db_name, connections=self.connections)
+            if cache_answers
+            else None,
         )
-        # thread that innits donkeybot instance wont used db again
-        data_storage.close_connection()
+        self.verified_answers = None
+        if verified_threshold is not None:
+            self.verified_answers = VerifiedAnswerIndex(
+                question_engine=question_se,
+                db_name=self.db_name,
+                threshold=verified_threshold,
+                connections=self.connections,
+            )
+        self.writer = None
+        if write_behind:
+            self.writer = BackgroundWriter(
+                connections=self.connections,
+                on_label=self.verified_answers.update_label
+                if self.verified_answers is not None
+                else None,
+            )
+        # write what is still queued when the slack bot shuts down
+        atexit.register(self.close)
 
-    def get_answers(self, question, top_k=1, store_answers=False):
+    def get_answers(self, question, top_k=1, store_answers=False, latency_budget=None):
         """Search past questions table for an answer"""
-        answers = self.qa_interface.get_answers(question, top_k=top_k)
+        answers = None
+        if self.verified_answers is not None:
+            # answers the users labeled correct for a similar question
+            answers = self.verified_answers.get(question, top_k=top_k)
+        if answers is None:
+            answers = self.qa_interface.get_answers(
+                question, top_k=top_k, latency_budget=latency_budget
+            )
         # TODO add confidence cutoff
         if store_answers:
             self._store_answers(answers)
@@ -97,17 +176,28 @@ class Donkeybot:
         return answers
 
     def _store_answers(self, answers):
-        # a different thread is running each time so new connection to db is needed
-        # could use 'sqlite3.connect('your.db', check_same_thread=False)' but need to do my own synchronization
-        data_storage = Database(f"{self.db_name}.db")
-        for answer in answers:
-            data_storage.insert_answer(answer)
-        data_storage.close_connection()
+        if self.writer is not None:
+            self.writer.put_answers(answers)
+            return
+        # connection of the handler's thread
+        data_storage = self.connections.database()
+        data_storage.insert_answers(answers)
         return
 
     def update_label(self, answer_id, label):
-        data_storage = Database(f"{self.db_name}.db")
         assert label in (0, 1)
+        if self.writer is not None:
+            # the verified answers are updated by the writer, once the label is stored
+            self.writer.put_label(answer_id, label)
+            return
+        data_storage = self.connections.database()
         data_storage.update_label(answer_id, label)
-        data_storage.close_connection()
+        if self.verified_answers is not None:
+            self.verified_answers.update_label(answer_id, label)
         return
+
+    def close(self):
+        """Writes the queued answers and labels and closes the db connections."""
+        if self.writer is not None:
+            self.writer.close()
+        self.connections.close_all()
@@ -1,11 +1,39 @@
 # general python
 from uuid import uuid4
 import datetime
+import threading
 import hashlib
+import time
 import re
 
+# the id of an Answer can be first used by two threads at once, eg. a Slack
+# handler and the BackgroundWriter storing it, they must get the same id
+_id_lock = threading.Lock()
+
 
 class Answer:
+    # most answers are discarded after the top_k are selected, so their id,
+    # user_question_id, creation date, origin and metadata are only created
+    # when they are first used
+    __slots__ = (
+        "user_question",
+        "answer",
+        "start",
+        "end",
+        "confidence",
+        "extended_answer",
+        "extended_start",
+        "extended_end",
+        "model",
+        "label",
+        "_id",
+        "_user_question_id",
+        "_created_at",
+        "_origin",
+        "_metadata",
+        "_source",
+    )
+
     def __init__(
         self,
         question,
@@ -17,18 +45,17 @@ class Answer:
         extended_answer,
         extended_start,
         extended_end,
-        metadata,
+        metadata=None,
+        source=None,
     ):
-        # Set unique ID
-        self.id = str(uuid4().hex)
+        """
+        :param metadata : dict with the metadata of the document the answer was found in
+        :param source   : the document's row (pandas Series) instead of its metadata,
+                          the metadata is built from it when first used (optional)
+        """
+        self._id = None
         self.user_question = question
-        # Since multiple answers can be created for the same user_question
-        # Let's create an id for the user_question
-        clean_question = str(question).lower()
-        # disregard all trailing question marks and spaces from the hashing
-        if clean_question[-1] == "?":
-            clean_question = re.sub("[ ?]*$", "", clean_question)
-        self.user_question_id = hashlib.md5(clean_question.encode("utf-8")).hexdigest()[:10]
+        self._user_question_id = None
         self.answer = answer
         self.start = start
         self.end = end
@@ -37,17 +64,88 @@ class Answer:
         self.extended_start = extended_start
         self.extended_end = extended_end
         self.model = model
-        # TODO add FAQ option as an origin
-        if "doc_id" in metadata:
-            self.origin = "documentation"
-        elif "faq_id" in metadata:
-            self.origin = "faq"
-        else:
-            self.origin = "questions"
-        # +00:00 since its utcnow() + same format as other dates saved in data_storage
-        self.created_at = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S+00:00")
+        self._origin = None
+        # unix time, formatted as the other dates saved in data_storage when used
+        self._created_at = time.time()
         self.label = None
-        self.metadata = metadata
+        self._metadata = metadata
+        self._source = source
+
+    @property
+    def id(self):
+        # Set unique ID
+        if self._id is None:
+            with _id_lock:
+                if self._id is None:
+                    self._id = str(uuid4().hex)
+        return self._id
+
+    @property
+    def user_question_id(self):
+        # Since multiple answers can be created for the same user_question
+        # Let's create an id for the user_question
+        if self._user_question_id is None:
+            self._user_question_id = question_id(self.user_question)
+        return self._user_question_id
+
+    @property
+    def created_at(self):
+        # +00:00 since its utcnow() + same format as other dates saved in data_storage
+        if type(self._created_at) == float:
+            self._created_at = datetime.datetime.utcfromtimestamp(
+                self._created_at
+            ).strftime("%Y-%m-%d %H:%M:%S+00:00")
+        return self._created_at
+
+    @property
+    def origin(self):
+        # TODO add FAQ option as an origin
+        if self._origin is None:
+            keys = self._source.index if self._metadata is None else self._metadata
+            if "doc_id" in keys:
+                self._origin = "documentation"
+            elif "faq_id" in keys:
+                self._origin = "faq"
+            else:
+                self._origin = "questions"
+        return self._origin
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = {} if self._source is None else _metadata(self._source)
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata
+        self._origin = None
+
+    @property
+    def context(self):
+        """Context of the document the answer was found in."""
+        if self._metadata is None and self._source is not None:
+            return self._source["context"]
+        return self.metadata.get("context")
 
     def __str__(self):
         return f"answer: {self.extended_answer}... , confidence: {self.confidence}''"
+
+
+def question_id(question):
+    """Returns the id of a user question, the same for questions differing only in case or trailing '?'."""
+    clean_question = str(question).lower()
+    # disregard all trailing question marks and spaces from the hashing
+    if clean_question[-1] == "?":
+        clean_question = re.sub("[ ?]*$", "", clean_question)
+    return hashlib.md5(clean_question.encode("utf-8")).hexdigest()[:10]
+
+
+def _metadata(doc):
+    """Metadata of the document's row, without the extra columns."""
+    # errors ignored for when we have Question metadata and the 'body' column doesn't exist
+    return (
+        doc.drop(["body", "query"], errors="ignore")
+        .rename({"question": "most_similar_question"}, axis=1)
+        .to_dict()
+    )
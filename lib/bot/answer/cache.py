@@ -0,0 +1,170 @@
+# bot modules
+from bot.answer.base import Answer, question_id
+from bot.database.sqlite import Database
+
+# general python
+from collections import OrderedDict
+import threading
+import json
+import time
+
+# attributes of the Answers kept in the cache, the id, question and creation
+# date are the ones of each request the answers are returned for
+CACHED_ATTRIBUTES = [
+    "answer",
+    "model",
+    "start",
+    "end",
+    "confidence",
+    "extended_answer",
+    "extended_start",
+    "extended_end",
+    "metadata",
+]
+
+
+class AnswerCache:
+    """Persistent cache of the Answers of user questions"""
+
+    def __init__(
+        self,
+        db_name="data_storage",
+        table_name="answer_cache",
+        ttl=7 * 24 * 3600,
+        max_size=10000,
+        memory_size=1024,
+        connections=None,
+    ):
+        """
+        Answers are cached on the user_question_id of the question (see Answer), the
+        model that predicted them and the version of the indexes they were retrieved
+        from, so they are never returned after the indexes are updated.
+
+        The cached answers are stored in the table_name table of the db and the most
+        recently used ones are also kept in memory, so that repeated questions are
+        answered without querying the db.
+
+        :param db_name     : name of the db storing the cache (default is data_storage)
+        :param table_name  : name of the table holding the cached Answers (default is answer_cache)
+        :param ttl         : seconds the answers are cached for (default is 7 days)
+        :param max_size    : maximum number of cached questions, the oldest are evicted (default is 10000)
+        :param memory_size : maximum number of cached questions kept in memory (default is 1024)
+        :param connections : ConnectionManager of the db, a new connection is opened
+                             for every access when not given (optional)
+        """
+        self.db_name = db_name
+        self.table_name = table_name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.memory_size = memory_size
+        self.connections = connections
+        self._memory = OrderedDict()
+        # the Slack handlers use the cache from different threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        data_storage = self._database()
+        data_storage.create_answer_cache_table(table_name=self.table_name)
+        data_storage.close_connection()
+
+    def get(self, question, model, index_version, request=""):
+        """
+        Returns the cached answers of the question, None on a miss.
+
+        :param question      : user question
+        :param model         : name of the model (or engine) answering the question
+        :param index_version : version of the indexes the answers are retrieved from
+        :param request       : parameters of the request changing the answers, eg. top_k (optional)
+        :returns answers     : list of new Answer objects for the question or None
+        """
+        key = _cache_key(question, model, index_version, request)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            # the cache can be used by any thread
+            data_storage = self._database()
+            row = data_storage.get_cached_answers(key, table_name=self.table_name)
+            data_storage.close_connection()
+            if row is not None:
+                entry = (json.loads(row[0]), row[1])
+                self._remember(key, entry)
+        with self._lock:
+            if entry is None or time.time() - entry[1] > self.ttl:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [_answer_from_dict(question, data) for data in entry[0]]
+
+    def put(self, question, answers, model, index_version, request=""):
+        """
+        Caches the answers of the question, evicting the expired and oldest entries.
+
+        :param question      : user question
+        :param answers       : list of Answer objects
+        :param model         : name of the model (or engine) answering the question
+        :param index_version : version of the indexes the answers are retrieved from
+        :param request       : parameters of the request changing the answers, eg. top_k (optional)
+        """
+        key = _cache_key(question, model, index_version, request)
+        entry = ([_answer_to_dict(answer) for answer in answers], time.time())
+        self._remember(key, entry)
+        data_storage = self._database()
+        data_storage.insert_cached_answers(
+            key,
+            question_id(question),
+            model,
+            index_version,
+            json.dumps(entry[0], default=_json_value),
+            entry[1],
+            table_name=self.table_name,
+        )
+        data_storage.evict_cached_answers(
+            entry[1] - self.ttl, self.max_size, table_name=self.table_name
+        )
+        data_storage.close_connection()
+
+    def _database(self):
+        """Database of the calling thread, close_connection() keeps pooled connections open."""
+        if self.connections is not None:
+            return self.connections.database()
+        return Database(f"{self.db_name}.db")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.memory_size:
+                # least recently used entry
+                self._memory.popitem(last=False)
+
+    def cache_info(self):
+        """Returns the hits, misses and the number of questions cached in memory."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_size": len(self._memory),
+                "max_memory_size": self.memory_size,
+            }
+
+
+def _cache_key(question, model, index_version, request):
+    return f"{question_id(question)}|{model}|{index_version}|{request}"
+
+
+def _answer_to_dict(answer):
+    return {name: getattr(answer, name) for name in CACHED_ATTRIBUTES}
+
+
+def _answer_from_dict(question, data):
+    return Answer(question=question, **dict(data, metadata=dict(data["metadata"])))
+
+
+def _json_value(value):
+    """Converts the numpy values of the metadata to python values."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
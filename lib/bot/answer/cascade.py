@@ -0,0 +1,107 @@
+# bot modules
+from bot.answer.detector import AnswerDetector
+
+# general python
+import pandas as pd
+import time
+import sys
+
+
+class CascadeAnswerDetector:
+    """Cascade of a fast and an accurate AnswerDetector"""
+
+    def __init__(
+        self,
+        small_detector=AnswerDetector,
+        large_detector=AnswerDetector,
+        confidence_threshold=0.5,
+        num_escalated_documents=3,
+    ):
+        """
+        The small (eg. DistilBERT) detector predicts the answers from all the
+        documents, only when the confidence of its best answer is below
+        confidence_threshold the top num_escalated_documents documents are
+        predicted again by the large (eg. BERT large) detector, whose answers
+        replace the ones of the small detector for those documents.
+
+        :param small_detector : AnswerDetector run on all the documents
+        :param large_detector : AnswerDetector run on the escalated documents
+        :param confidence_threshold : best answer confidence under which the question is escalated (default is 0.5)
+        :param num_escalated_documents : number of documents the large detector predicts from (default is 3)
+        """
+        try:
+            assert type(small_detector) == AnswerDetector
+            assert type(large_detector) == AnswerDetector
+        except AssertionError as _e:
+            sys.exit(
+                "Error: Wrong detector type. Make sure to use DonkeyBot's AnswerDetector."
+            )
+        self.small_detector = small_detector
+        self.large_detector = large_detector
+        self.confidence_threshold = confidence_threshold
+        self.num_escalated_documents = num_escalated_documents
+        # questions predicted and escalated so far, see cascade_info()
+        self.num_questions = 0
+        self.num_escalations = 0
+        self.small_latency = 0.0
+        self.large_latency = 0.0
+
+    def predict(self, question, documents, top_k=1):
+        """
+        Returns the top_k answer(s) from the documents, same interface as AnswerDetector.predict().
+
+        :param question  : question string
+        :param documents : pd.DataFrame that contains 'context' and other data, or a list of them
+        :param top_k     : number of answers to return (default is 1)
+        :returns top_k_answers : list of top_k number of Answer objects
+        """
+        if type(documents) == pd.DataFrame:
+            documents = [documents]
+        self.num_questions += 1
+        start = time.perf_counter()
+        answers = self.small_detector.predict(question, documents, top_k=None)
+        self.small_latency += time.perf_counter() - start
+        if answers and answers[0].confidence >= self.confidence_threshold:
+            return answers[:top_k]
+
+        self.num_escalations += 1
+        escalated_contexts = self._escalated_contexts(documents, answers)
+        escalated = [frame[frame["context"].isin(escalated_contexts)] for frame in documents]
+        start = time.perf_counter()
+        large_answers = self.large_detector.predict(question, escalated, top_k=None)
+        self.large_latency += time.perf_counter() - start
+        answers = [a for a in answers if a.context not in escalated_contexts]
+        answers = sorted(answers + large_answers, key=lambda k: k.confidence, reverse=True)
+        return answers[:top_k]
+
+    def _escalated_contexts(self, documents, answers):
+        """
+        Returns the contexts predicted by the large detector, those with the most
+        confident answers of the small detector first, then in retrieval order.
+        """
+        ranked_contexts = dict.fromkeys(a.context for a in answers)
+        for frame in documents:
+            for context in frame["context"]:
+                ranked_contexts.setdefault(context)
+        return set(list(ranked_contexts)[: self.num_escalated_documents])
+
+    def cascade_info(self):
+        """
+        Returns the number of questions predicted so far, how many of them were
+        escalated to the large detector and the average latency (in seconds) of
+        each tier: per question for the small detector and per escalated question
+        for the large detector.
+        """
+        return {
+            "questions": self.num_questions,
+            "escalations": self.num_escalations,
+            "escalation_rate": self.num_escalations / self.num_questions
+            if self.num_questions
+            else None,
+            "small_latency": self.small_latency / self.num_questions
+            if self.num_questions
+            else None,
+            "large_latency": self.large_latency / self.num_escalations
+            if self.num_escalations
+            else None,
+        }
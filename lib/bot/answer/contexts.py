@@ -0,0 +1,253 @@
+# bot modules
+from bot.searcher.bm25 import MappedVocabulary, IndexFormatError, _offsets
+import bot.config as config
+
+# general python
+import numpy as np
+import hashlib
+import json
+import os
+import re
+import shutil
+
+# version of the on-disk context store format, bump when the arrays saved change
+CONTEXT_STORE_FORMAT_VERSION = 1
+# arrays of the on-disk context store, each one saved as <name>.npy
+CONTEXT_STORE_ARRAYS = [
+    "key_bytes",
+    "key_offsets",
+    "hashes",
+    "token_ids",
+    "token_words",
+    "token_offsets",
+    "word_starts",
+    "word_ends",
+    "word_offsets",
+]
+# columns of the retrieved documents identifying where their context comes from
+KEY_COLUMNS = ["doc_id", "question_id", "faq_id"]
+# words of a context are split on the same whitespace as transformers' SquadExample
+WORD_REGEX = re.compile("[^ \t\r\n\u202f]+")
+
+
+class ContextStore:
+    """Contexts of the documents, pre-tokenized with the tokenizer of the AnswerDetector"""
+
+    def __init__(self, arrays, header):
+        """
+        Use ContextStore.build() to tokenize and save the contexts
+        and ContextStore.load() to memory-map them.
+
+        For every context the store keeps:
+            - the token ids of its words, tokenized one word at a time
+              (as the transformers QA pipeline does)
+            - the word each token belongs to
+            - the first and last (+1) character of each word
+            - a hash of the context text, so that contexts that changed
+              since the store was built aren't used
+        """
+        self.keys = MappedVocabulary(arrays["key_bytes"], arrays["key_offsets"])
+        self.arrays = {name: array.view(np.ndarray) for name, array in arrays.items()}
+        self.model = header["model"]
+        self.size = header["size"]
+
+    @staticmethod
+    def default_path(db_name, model):
+        """Directory of the context store of the db for the model's tokenizer."""
+        return os.path.join(config.INDEXES_DIR, db_name, "contexts", model)
+
+    @classmethod
+    def build(cls, path, keys, contexts, tokenizer, model):
+        """
+        Tokenizes the contexts and saves them under the path directory.
+
+        The format is a header.json (format version and model) plus one .npy
+        file per array (see CONTEXT_STORE_ARRAYS), keys are saved sorted so that
+        they are found with a binary search.
+
+        :param path      : directory of the context store
+        :param keys      : key of each context, see context_key()
+        :param contexts  : context strings
+        :param tokenizer : tokenizer of the QA model
+        :param model     : name of the QA model
+        :returns store   : the memory-mapped ContextStore
+        """
+        # the same words are tokenized once
+        word_ids = {}
+        entries = {}
+        for key, context in zip(keys, contexts):
+            if key is None or type(context) != str:
+                continue
+            entries[key] = tokenize_context(context, tokenizer, word_ids)
+
+        sorted_keys = sorted(entries, key=lambda key: key.encode("utf-8"))
+        encoded_keys = [key.encode("utf-8") for key in sorted_keys]
+        values = [entries[key] for key in sorted_keys]
+        arrays = {
+            "key_bytes": np.frombuffer(b"".join(encoded_keys), np.uint8),
+            "key_offsets": _offsets([len(key) for key in encoded_keys]),
+            "hashes": np.array(
+                [np.frombuffer(_hash(v.context), np.uint8) for v in values],
+                dtype=np.uint8,
+            ).reshape(len(values), 20),
+            "token_ids": _concatenate([v.token_ids for v in values]),
+            "token_words": _concatenate([v.token_words for v in values]),
+            "token_offsets": _offsets([len(v.token_ids) for v in values]),
+            "word_starts": _concatenate([v.word_starts for v in values]),
+            "word_ends": _concatenate([v.word_ends for v in values]),
+            "word_offsets": _offsets([len(v.word_starts) for v in values]),
+        }
+        header = {
+            "format_version": CONTEXT_STORE_FORMAT_VERSION,
+            "model": model,
+            "tokenizer": type(tokenizer).__name__,
+            "size": len(values),
+        }
+        path = path.rstrip("/")
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in CONTEXT_STORE_ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp_path, "header.json"), "w") as f:
+            json.dump(header, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads a context store saved with build().
+
+        :param path     : directory of the context store
+        :param mmap     : memory-map the arrays instead of reading them (default is True)
+        :returns store  : ContextStore object
+        :raises IndexFormatError : when the store is missing or of another format version
+        """
+        try:
+            with open(os.path.join(path, "header.json")) as f:
+                header = json.load(f)
+        except (OSError, ValueError) as _e:
+            raise IndexFormatError(f"No context store found under {path}") from _e
+        if header.get("format_version") != CONTEXT_STORE_FORMAT_VERSION:
+            raise IndexFormatError(
+                f"Context store under {path} has format version {header.get('format_version')}, "
+                f"expected {CONTEXT_STORE_FORMAT_VERSION}. Please rebuild it."
+            )
+        arrays = {
+            name: np.load(
+                os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None
+            )
+            for name in CONTEXT_STORE_ARRAYS
+        }
+        return cls(arrays, header)
+
+    def get(self, key, context):
+        """
+        Returns the tokenized context, None if it isn't in the store
+        or if the context changed since the store was built.
+
+        :param key     : key of the context, see context_key()
+        :param context : context string
+        :returns context : TokenizedContext or None
+        """
+        if key is None or type(context) != str:
+            return None
+        row = self.keys.get(key)
+        if row is None:
+            return None
+        if self.arrays["hashes"][row].tobytes() != _hash(context):
+            return None
+        tokens = slice(*self.arrays["token_offsets"][row : row + 2])
+        words = slice(*self.arrays["word_offsets"][row : row + 2])
+        return TokenizedContext(
+            context,
+            self.arrays["token_ids"][tokens],
+            self.arrays["token_words"][tokens],
+            self.arrays["word_starts"][words],
+            self.arrays["word_ends"][words],
+        )
+
+    def __len__(self):
+        return self.size
+
+
+class TokenizedContext:
+    """Token ids of a context and the words (characters) they come from"""
+
+    def __init__(self, context, token_ids, token_words, word_starts, word_ends):
+        """
+        :param context     : context string
+        :param token_ids   : ids of the tokens of the context
+        :param token_words : word of each token
+        :param word_starts : first character of each word
+        :param word_ends   : last character (+1) of each word
+        """
+        self.context = context
+        self.token_ids = token_ids
+        self.token_words = token_words
+        self.word_starts = word_starts
+        self.word_ends = word_ends
+
+
+def tokenize_context(context, tokenizer, word_ids=None):
+    """
+    Tokenizes the context one word at a time, as the transformers QA pipeline does.
+
+    :param context   : context string
+    :param tokenizer : tokenizer of the QA model
+    :param word_ids  : dict caching the token ids of the words already tokenized (optional)
+    :returns context : TokenizedContext
+    """
+    word_ids = {} if word_ids is None else word_ids
+    words = [(m.start(), m.end()) for m in WORD_REGEX.finditer(context)]
+    token_ids, token_words = [], []
+    for i, (start, end) in enumerate(words):
+        word = context[start:end]
+        if word not in word_ids:
+            word_ids[word] = tokenizer.convert_tokens_to_ids(tokenizer.tokenize(word))
+        token_ids += word_ids[word]
+        token_words += [i] * len(word_ids[word])
+    return TokenizedContext(
+        context,
+        np.array(token_ids, dtype=np.int32),
+        np.array(token_words, dtype=np.int32),
+        np.array([start for start, _ in words], dtype=np.int32),
+        np.array([end for _, end in words], dtype=np.int32),
+    )
+
+
+def load_context_store(db_name, model):
+    """
+    Loads the context store of the db for the model's tokenizer,
+    None (the contexts are tokenized at query time) if it wasn't built.
+    """
+    try:
+        return ContextStore.load(ContextStore.default_path(db_name, model))
+    except IndexFormatError as _e:
+        print(_e)
+        return None
+
+
+def context_key(doc):
+    """
+    Returns the key of the context of a retrieved document (pandas Series),
+    None for documents without an id column.
+    """
+    for column in KEY_COLUMNS:
+        if column in doc.index and not _is_missing(doc[column]):
+            return f"{column}:{doc[column]}"
+    return None
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _hash(context):
+    return hashlib.sha1(context.encode("utf-8")).digest()
+
+
+def _concatenate(arrays):
+    return np.concatenate([np.zeros(0, dtype=np.int32)] + list(arrays)).astype(np.int32)
@@ -10,14 +10,26 @@
 # bot modules
 import bot.config as config
 from bot.answer.base import Answer
+from bot.answer.contexts import context_key, tokenize_context
 
 # general python
 from transformers import pipeline
-from transformers import AutoTokenizer, AutoModelForQuestionAnswering
+from transformers import AutoConfig, AutoTokenizer, AutoModelForQuestionAnswering
+from transformers import squad_convert_examples_to_features, SquadFeatures
+from transformers.pipelines import QuestionAnsweringArgumentHandler
 from tqdm import tqdm
 import pandas as pd
+import numpy as np
+import torch
+import os
 import sys
 
+# int8 weights of the dynamically quantized models, cached next to their fp32 weights
+QUANTIZED_WEIGHTS_NAME = "pytorch_model_int8.bin"
+# ONNX graphs of the models, exported and optimized once next to their weights
+ONNX_MODEL_NAME = "model.onnx"
+ONNX_OPTIMIZED_MODEL_NAME = "model.optimized.onnx"
+
 
 class AnswerDetector:
     """Answer Detector"""
@@ -33,6 +45,12 @@ class AnswerDetector:
         num_answers_to_predict=3,
         doc_stride=128,
         device=-1,
+        batch_size=16,
+        dynamic_padding=True,
+        quantize=False,
+        backend="pytorch",
+        num_threads=None,
+        context_store=None,
     ):
         """
         <!> Default values from source code for transformers.pipelines:
@@ -54,26 +72,74 @@ class AnswerDetector:
         :param doc_stride : length of the split in the sliding window documents longer than max_sq_len.
         :param device : if < 0 -> use cpu (default -1 to use cpu)
                         if >=0 -> use gpu
+        :param batch_size : number of (question, context) features passed through the model at once,
+                            features of all the documents (including their doc_stride windows) are
+                            batched together. None to run the pipeline once per document. (default is 16)
+        :param dynamic_padding : True to batch features of similar length and pad each batch only
+                                 up to its longest feature, False to pad all features to max_seq_len.
+                                 Only used by the batched predictions. (default is True)
+        :param quantize : True to use the dynamically quantized (int8) version of the model, for cpu only.
+                          It is created and cached under MODELS_DIR the first time. (default is False)
+        :param backend : 'pytorch' to run the model with pytorch or 'onnx' to run its ONNX graph
+                         with onnxruntime on cpu. The graph is exported and optimized under MODELS_DIR
+                         the first time. (default is 'pytorch')
+        :param num_threads : number of threads used by onnxruntime, None for its default. (default is None)
+        :param context_store : ContextStore with the contexts of the documents pre-tokenized for this model,
+                               the batched predictions then only tokenize the question. (default is None)
         """
 
         self.model_name = model
-        try:
-            qa_model = AutoModelForQuestionAnswering.from_pretrained(
-                config.MODELS_DIR + self.model_name
+        self.quantize = quantize
+        self.backend = backend
+        if backend not in ("pytorch", "onnx"):
+            sys.exit(f"Unknown backend '{backend}', use 'pytorch' or 'onnx'")
+        if (quantize or backend == "onnx") and device >= 0:
+            sys.exit("Quantized and ONNX models only run on cpu, use device=-1")
+        if quantize and backend == "onnx":
+            sys.exit("Quantized models are only available with the 'pytorch' backend")
+        if context_store is not None and context_store.model != model:
+            sys.exit(
+                f"The context store was tokenized for {context_store.model}, not for {model}"
             )
-            qa_tokenizer = AutoTokenizer.from_pretrained(
+        try:
+            self.tokenizer = AutoTokenizer.from_pretrained(
                 config.MODELS_DIR + self.model_name
             )
+            # the ONNX graph is run without loading the pytorch model
+            self.session = None
+            self.model = None
+            if backend == "onnx":
+                self.session = load_onnx_session(self.model_name, num_threads=num_threads)
+            elif quantize:
+                qa_model = load_quantized_model(self.model_name)
+            else:
+                qa_model = AutoModelForQuestionAnswering.from_pretrained(
+                    config.MODELS_DIR + self.model_name
+                )
         except Exception as _e:
             print(_e)
             sys.exit(f"Make sure that the model exists under {config.MODELS_DIR}")
-        self.model = pipeline(
-            "question-answering",
-            model=qa_model,
-            tokenizer=qa_tokenizer,
-            framework="pt",
-            device=device,
+        if self.session is None:
+            self.model = pipeline(
+                "question-answering",
+                model=qa_model,
+                tokenizer=self.tokenizer,
+                framework="pt",
+                device=device,
+            )
+        self._args_parser = QuestionAnsweringArgumentHandler()
+        # features are built from the (pre-)tokenized contexts for tokenizers adding
+        # [CLS] question [SEP] context [SEP] like special tokens, padded on the right,
+        # other tokenizers go through squad_convert_examples_to_features()
+        self._native_features = (
+            self.tokenizer.padding_side == "right"
+            and self.tokenizer.num_special_tokens_to_add(pair=True)
+            == self.tokenizer.num_special_tokens_to_add(pair=False) + 1
         )
+        if context_store is not None and not self._native_features:
+            print(f"Pre-tokenized contexts can't be used with {type(self.tokenizer).__name__}")
+            context_store = None
+        self.context_store = context_store
         self.extended_answer_size = extended_answer_size
         self.num_answers_to_predict = num_answers_to_predict
         self.handle_impossible_answer = handle_impossible_answer
@@ -81,6 +147,11 @@ class AnswerDetector:
         self.max_question_len = max_question_len
         self.max_seq_len = max_seq_len
         self.doc_stride = doc_stride
+        self.batch_size = batch_size
+        self.dynamic_padding = dynamic_padding
+        # tokens passed through the model by the batched predictions, see padding_info()
+        self.real_tokens = 0
+        self.padded_tokens = 0
 
     def predict(self, question, documents, top_k=1):
         """
@@ -89,8 +160,11 @@ class AnswerDetector:
 
         :param question  : question string
         :type question   : str
-        :param documents : pd.DataFrame that contains 'context' and other data
-        :type documents  : pandas DataFrame
+        :param documents : pd.DataFrame that contains 'context' and other data, or a list
+                           of them (eg. retrieved by different Search Engines) to predict from
+                           all their documents at once. Documents with identical contexts are
+                           predicted once, the first one is kept.
+        :type documents  : pandas DataFrame or list of pandas DataFrames
         :param topk      : number of answers to return for each document (default is 1)
         :returns top_k_answers : list of top_k number of Answer objects
         """
@@ -98,27 +172,30 @@ class AnswerDetector:
         answers = []
         best_overall_score = 0
 
-        assert type(documents) == pd.DataFrame
-        assert "context" in documents.columns
+        if type(documents) == pd.DataFrame:
+            documents = [documents]
+        contexts = {}
+        for frame in documents:
+            assert type(frame) == pd.DataFrame
+            assert "context" in frame.columns
+            for _, doc in frame.iterrows():
+                contexts.setdefault(doc["context"], doc)
+        docs = list(contexts.values())
 
-        print(f"Predicting answers from {documents.shape[0]} document(s)...")
-        for _, doc in tqdm(documents.iterrows(), total=documents.shape[0]):
-            try:
-                predictions = self.model(
-                    question=question,
-                    context=doc["context"],
-                    topk=self.num_answers_to_predict,
-                    handle_impossible_answer=self.handle_impossible_answer,
-                    max_answer_len=self.max_answer_len,
-                    max_question_len=self.max_question_len,
-                    max_seq_len=self.max_seq_len,
-                    doc_stride=self.doc_stride,
-                )
-            # reason for KeyError: https://github.com/huggingface/transformers/issues/5910
-            except KeyError as _e:
-                continue
-            except Exception as _other_e:
-                print(_other_e)
+        print(f"Predicting answers from {len(docs)} document(s)...")
+        if self.batch_size:
+            document_predictions = self._predict_batched(
+                question,
+                [doc["context"] for doc in docs],
+                [context_key(doc) for doc in docs],
+            )
+        else:
+            document_predictions = (
+                self._predict_document(question, doc["context"])
+                for doc in tqdm(docs, total=len(docs))
+            )
+        for doc, predictions in zip(docs, document_predictions):
+            if predictions is None:
                 continue
 
             # If only 1 answer is requested (self.num_answers_to_predict) transformers returns a dict
@@ -146,19 +223,301 @@ class AnswerDetector:
 
         return top_k_answers
 
+    def _predict_document(self, question, context):
+        """Returns the pipeline's predictions for one document, None if it fails."""
+        if self.model is None:
+            # without a pipeline, the document is predicted on its own the same way
+            return self._predict_batched(question, [context])[0]
+        try:
+            return self.model(
+                question=question,
+                context=context,
+                topk=self.num_answers_to_predict,
+                handle_impossible_answer=self.handle_impossible_answer,
+                max_answer_len=self.max_answer_len,
+                max_question_len=self.max_question_len,
+                max_seq_len=self.max_seq_len,
+                doc_stride=self.doc_stride,
+            )
+        # reason for KeyError: https://github.com/huggingface/transformers/issues/5910
+        except KeyError as _e:
+            return None
+        except Exception as _other_e:
+            print(_other_e)
+            return None
+
+    def _predict_batched(self, question, contexts, keys=None):
+        """
+        Returns the predictions for each context, same as calling the pipeline
+        once per document, but the features of all the documents are passed
+        through the model in batches of self.batch_size and their answer spans
+        are decoded together, see _decode_batch().
+
+        :param question : question string
+        :param contexts : list of context strings
+        :param keys     : list of keys of the contexts in the context store (optional)
+        :returns predictions : list with the predictions per context
+                               (None for the contexts without any features)
+        """
+        keys = keys or [None] * len(contexts)
+        passages, features = [], []
+        question_ids = None
+        for context, key in zip(contexts, keys):
+            try:
+                tokenized = None
+                if self.context_store is not None:
+                    tokenized = self.context_store.get(key, context)
+                if tokenized is None and self._native_features and type(context) == str:
+                    tokenized = tokenize_context(context, self.tokenizer)
+                if tokenized is not None:
+                    if question_ids is None:
+                        question_ids = self.tokenizer.encode(
+                            question,
+                            add_special_tokens=False,
+                            truncation=True,
+                            max_length=self.max_question_len,
+                        )
+                    passage = _Passage.from_tokenized_context(tokenized)
+                    document_features = self._tokenized_features(question_ids, tokenized)
+                else:
+                    example = self._args_parser(question=question, context=context)[0]
+                    passage = _Passage.from_example(example)
+                    document_features = self._convert_to_features(example)
+                passages.append(passage)
+                features.append(document_features)
+            except Exception as _e:
+                print(_e)
+                passages.append(None)
+                features.append([])
+
+        start_logits, end_logits = self._batch_logits(
+            [feature for document_features in features for feature in document_features]
+        )
+        return self._decode_batch(passages, features, start_logits, end_logits)
+
+    def _tokenized_features(self, question_ids, tokenized):
+        """
+        Returns the (doc_stride) features of a pre-tokenized context, the same
+        features squad_convert_examples_to_features() creates from the text.
+
+        :param question_ids : token ids of the (truncated) question
+        :param tokenized    : TokenizedContext from the context store
+        :returns features   : list of SquadFeatures
+        """
+        # [CLS] question [SEP]
+        question_length = len(question_ids) + self.tokenizer.num_special_tokens_to_add(
+            pair=False
+        )
+        # context tokens that fit in one feature
+        window = (
+            self.max_seq_len
+            - len(question_ids)
+            - self.tokenizer.num_special_tokens_to_add(pair=True)
+        )
+        features = []
+        start = 0
+        while start < len(tokenized.token_ids):
+            span_ids = tokenized.token_ids[start : start + window].tolist()
+            encoded = self.tokenizer.prepare_for_model(
+                question_ids,
+                span_ids,
+                padding="max_length",
+                max_length=self.max_seq_len,
+                return_token_type_ids=True,
+                return_attention_mask=True,
+            )
+            input_ids = encoded["input_ids"]
+            cls_index = input_ids.index(self.tokenizer.cls_token_id)
+            # 1 for the tokens that can't be part of the answer
+            p_mask = np.ones(len(input_ids), dtype=int)
+            p_mask[question_length:] = 0
+            special_tokens = self.tokenizer.get_special_tokens_mask(
+                input_ids, already_has_special_tokens=True
+            )
+            p_mask[np.asarray(special_tokens).nonzero()] = 1
+            p_mask[cls_index] = 0
+            token_to_orig_map = dict(
+                zip(
+                    range(question_length, question_length + len(span_ids)),
+                    tokenized.token_words[start : start + len(span_ids)].tolist(),
+                )
+            )
+            features.append(
+                SquadFeatures(
+                    input_ids,
+                    encoded["attention_mask"],
+                    encoded["token_type_ids"],
+                    cls_index,
+                    p_mask.tolist(),
+                    example_index=0,
+                    unique_id=0,
+                    paragraph_len=len(span_ids),
+                    token_is_max_context={},
+                    tokens=[],
+                    token_to_orig_map=token_to_orig_map,
+                    start_position=0,
+                    end_position=0,
+                    is_impossible=False,
+                )
+            )
+            if start + window >= len(tokenized.token_ids):
+                break
+            start += self.doc_stride
+        return features
+
+    def _convert_to_features(self, example):
+        """Tokenizes the example into its (doc_stride) features, as the pipeline does."""
+        return squad_convert_examples_to_features(
+            examples=[example],
+            tokenizer=self.tokenizer,
+            max_seq_length=self.max_seq_len,
+            doc_stride=self.doc_stride,
+            max_query_length=self.max_question_len,
+            padding_strategy="max_length",
+            is_training=False,
+            tqdm_enabled=False,
+        )
+
+    def _batch_logits(self, features):
+        """
+        Runs the model once per batch of features and returns the start and end logits.
+
+        With dynamic padding the features are sorted by their number of tokens and
+        batched with features of similar length, each batch is then only padded up
+        to its longest feature instead of max_seq_len.
+        The logits of the padding (which are masked when decoding) are -10000.
+        """
+        model_input_names = _model_input_names(self.tokenizer)
+        lengths = np.array([sum(feature.attention_mask) for feature in features], dtype=int)
+        if self.dynamic_padding:
+            order = np.argsort(lengths, kind="stable")
+        else:
+            order = np.arange(len(features))
+        start_logits = np.full((len(features), self.max_seq_len), -10000.0, dtype=np.float32)
+        end_logits = np.full((len(features), self.max_seq_len), -10000.0, dtype=np.float32)
+
+        batch_size = self.batch_size or max(len(features), 1)
+        batches = range(0, len(features), batch_size)
+        for first in tqdm(batches, total=len(batches)):
+            batch = order[first : first + batch_size]
+            seq_len = lengths[batch].max() if self.dynamic_padding else self.max_seq_len
+            # the tokens of the features are on the same side as their padding
+            if self.tokenizer.padding_side == "left":
+                tokens = slice(self.max_seq_len - seq_len, self.max_seq_len)
+            else:
+                tokens = slice(0, seq_len)
+            inputs = {
+                k: np.array([features[i].__dict__[k][tokens] for i in batch], dtype=np.int64)
+                for k in model_input_names
+            }
+            start_logits[batch, tokens], end_logits[batch, tokens] = self._run_model(inputs)
+            self.real_tokens += int(lengths[batch].sum())
+            self.padded_tokens += len(batch) * int(seq_len)
+        return start_logits, end_logits
+
+    def _run_model(self, inputs):
+        """Returns the start and end logits of the model for a batch of inputs (numpy arrays)."""
+        if self.session is not None:
+            start, end = self.session.run(["start_logits", "end_logits"], inputs)
+            return start, end
+        with self.model.device_placement():
+            with torch.no_grad():
+                fw_args = {
+                    k: torch.tensor(v, device=self.model.device) for k, v in inputs.items()
+                }
+                start, end = self.model.model(**fw_args)[:2]
+                return start.cpu().numpy(), end.cpu().numpy()
+
+    def padding_info(self):
+        """
+        Returns the number of real (non padding) and padded tokens passed through
+        the model by the batched predictions so far, and the padding efficiency:
+        real tokens / padded tokens (1.0 means no padding at all).
+        """
+        return {
+            "real_tokens": self.real_tokens,
+            "padded_tokens": self.padded_tokens,
+            "padding_efficiency": self.real_tokens / self.padded_tokens
+            if self.padded_tokens
+            else None,
+        }
+
+    def _decode_batch(self, passages, features, start_logits, end_logits):
+        """
+        Decodes the logits of the features of all the passages into answer spans,
+        scored the same way as the pipeline does.
+
+        The masking, softmax and top spans of every feature are computed at once,
+        only spans of context tokens are candidates, so all the predicted spans
+        can be mapped back to the text of their passage.
+
+        :param passages     : _Passage of each context (None when it failed)
+        :param features     : list with the features of each context
+        :param start_logits : start logits of all the features, in passage order
+        :param end_logits   : end logits of all the features, in passage order
+        :returns predictions : list with the predictions per passage
+                               (None for the passages without any features)
+        """
+        all_features = [feature for document_features in features for feature in document_features]
+        if not all_features:
+            return [None] * len(passages)
+        p_mask = np.array([feature.p_mask for feature in all_features])
+        attention_mask = np.array([feature.attention_mask for feature in all_features])
+        # padded & question tokens can't be part of the answer
+        undesired_tokens_mask = (np.abs(p_mask - 1) & attention_mask) == 0
+        start_ = np.where(undesired_tokens_mask, -10000.0, start_logits)
+        end_ = np.where(undesired_tokens_mask, -10000.0, end_logits)
+
+        # softmax over the context tokens
+        start_ = np.exp(start_ - np.log(np.sum(np.exp(start_), axis=-1, keepdims=True)))
+        end_ = np.exp(end_ - np.log(np.sum(np.exp(end_), axis=-1, keepdims=True)))
+        null_scores = start_[:, 0] * end_[:, 0]
+
+        # mask CLS
+        start_[:, 0] = end_[:, 0] = 0.0
+
+        token_words = _token_words(all_features, start_.shape[1])
+        starts, ends, scores = _top_spans(
+            start_, end_, token_words, self.num_answers_to_predict, self.max_answer_len
+        )
+
+        predictions = []
+        first = 0
+        for passage, document_features in zip(passages, features):
+            last = first + len(document_features)
+            if passage is None or first == last:
+                predictions.append(None)
+                first = last
+                continue
+            answers = [
+                {
+                    "score": score.item(),
+                    "start": passage.word_first_char[token_words[i, s]].item(),
+                    "end": passage.word_last_char[token_words[i, e]].item(),
+                    "answer": passage.answer(token_words[i, s], token_words[i, e]),
+                }
+                for i in range(first, last)
+                for s, e, score in zip(starts[i], ends[i], scores[i])
+                if score >= 0
+            ]
+            if self.handle_impossible_answer:
+                min_null_score = null_scores[first:last].min().item()
+                answers.append({"score": min_null_score, "start": 0, "end": 0, "answer": ""})
+            predictions.append(
+                sorted(answers, key=lambda x: x["score"], reverse=True)[
+                    : self.num_answers_to_predict
+                ]
+            )
+            first = last
+        return predictions
+
     def _create_answer_object(self, question, pred, doc):
         extended_start = max(0, pred["start"] - self.extended_answer_size)
         extended_end = min(len(doc.context), pred["end"] + self.extended_answer_size)
-        # drop extra metadata columns
-        # errors ignored for when we have Question metadata and the 'body' column doesn't exist
-        metadata = (
-            doc.drop(["body", "query"], errors="ignore")
-            .rename({"question": "most_similar_question"}, axis=1)
-            .to_dict()
-        )
+        # the metadata is only built from the document's row for the answers that are used
         answer = Answer(
             question=question,
-            model=self.model_name,
+            model=f"{self.model_name}-int8" if self.quantize else self.model_name,
             answer=pred["answer"],
             start=pred["start"],
             end=pred["end"],
@@ -166,6 +525,208 @@ class AnswerDetector:
             extended_answer=doc.context[extended_start:extended_end],
             extended_start=extended_start,
             extended_end=extended_end,
-            metadata=metadata,
+            source=doc,
         )
         return answer
+
+
+def quantize_model(model_name):
+    """
+    Dynamically quantizes the Linear layers of the QA model to int8
+    and caches the quantized weights next to the fp32 weights.
+
+    :param model_name : name of the model under MODELS_DIR
+    :returns model    : the quantized model
+    """
+    model_dir = config.MODELS_DIR + model_name
+    model = _quantize_dynamic(AutoModelForQuestionAnswering.from_pretrained(model_dir))
+    torch.save(model.state_dict(), os.path.join(model_dir, QUANTIZED_WEIGHTS_NAME))
+    return model
+
+
+def load_quantized_model(model_name):
+    """
+    Loads the cached quantized version of the QA model, it is created if it isn't cached.
+
+    :param model_name : name of the model under MODELS_DIR
+    :returns model    : the quantized model
+    """
+    model_dir = config.MODELS_DIR + model_name
+    weights = os.path.join(model_dir, QUANTIZED_WEIGHTS_NAME)
+    if not os.path.isfile(weights):
+        return quantize_model(model_name)
+    model_config = AutoConfig.from_pretrained(model_dir)
+    model = _quantize_dynamic(AutoModelForQuestionAnswering.from_config(model_config))
+    model.load_state_dict(torch.load(weights))
+    return model
+
+
+def _quantize_dynamic(model):
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx_model(model_name):
+    """
+    Exports the QA model to an ONNX graph, saved next to the model weights.
+    Batch size and sequence length of the inputs are dynamic.
+
+    :param model_name : name of the model under MODELS_DIR
+    :returns path     : path of the ONNX graph
+    """
+    model_dir = config.MODELS_DIR + model_name
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    input_names = _model_input_names(tokenizer)
+    model = _OrderedInputs(
+        AutoModelForQuestionAnswering.from_pretrained(model_dir), input_names
+    )
+    # export sets back the training mode of the module, dropout has to stay off
+    model.eval()
+    output_names = ["start_logits", "end_logits"]
+    path = os.path.join(model_dir, ONNX_MODEL_NAME)
+    torch.onnx.export(
+        model,
+        tuple(torch.ones((1, 8), dtype=torch.long) for _ in input_names),
+        path,
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + output_names},
+        opset_version=12,
+    )
+    return path
+
+
+def load_onnx_session(model_name, num_threads=None):
+    """
+    Returns an onnxruntime session of the optimized ONNX graph of the QA model.
+    The model is exported and its graph optimized the first time only.
+
+    :param model_name  : name of the model under MODELS_DIR
+    :param num_threads : number of threads used by onnxruntime, None for its default
+    :returns session   : onnxruntime InferenceSession
+    """
+    try:
+        import onnxruntime
+    except ImportError as _e:
+        sys.exit(
+            "The onnx backend needs onnxruntime, install it with 'pip install donkeybot[onnx]'"
+        )
+
+    model_dir = config.MODELS_DIR + model_name
+    optimized_path = os.path.join(model_dir, ONNX_OPTIMIZED_MODEL_NAME)
+    options = onnxruntime.SessionOptions()
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    # extended optimizations are hardware independent so the optimized graph can be cached
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    if os.path.isfile(optimized_path):
+        return onnxruntime.InferenceSession(optimized_path, options)
+    path = os.path.join(model_dir, ONNX_MODEL_NAME)
+    if not os.path.isfile(path):
+        path = export_onnx_model(model_name)
+    options.optimized_model_filepath = optimized_path
+    return onnxruntime.InferenceSession(path, options)
+
+
+class _OrderedInputs(torch.nn.Module):
+    """Model called with the inputs in the order of input_names, and returning (start, end) logits."""
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.model(**dict(zip(self.input_names, inputs)))[:2]
+
+
+class _Passage:
+    """Words of a context, to map the predicted word spans back to the text"""
+
+    def __init__(self, words, word_first_char, word_last_char):
+        """
+        :param words           : the words of the context
+        :param word_first_char : first character of each word
+        :param word_last_char  : last character of each word, including the whitespace after it
+        """
+        self.words = words
+        self.word_first_char = word_first_char
+        self.word_last_char = word_last_char
+
+    @classmethod
+    def from_example(cls, example):
+        """Passage of a SquadExample."""
+        char_to_word = np.array(example.char_to_word_offset)
+        words = np.arange(len(example.doc_tokens))
+        return cls(
+            example.doc_tokens,
+            np.searchsorted(char_to_word, words, side="left"),
+            np.searchsorted(char_to_word, words, side="right") - 1,
+        )
+
+    @classmethod
+    def from_tokenized_context(cls, tokenized):
+        """Passage of a TokenizedContext from the context store."""
+        context = tokenized.context
+        words = [
+            context[start:end]
+            for start, end in zip(tokenized.word_starts.tolist(), tokenized.word_ends.tolist())
+        ]
+        word_last_char = np.append(tokenized.word_starts[1:] - 1, len(context) - 1)
+        return cls(words, tokenized.word_starts, word_last_char)
+
+    def answer(self, first_word, last_word):
+        """Answer text of the words first_word ... last_word."""
+        return " ".join(self.words[first_word : last_word + 1])
+
+
+def _model_input_names(tokenizer):
+    return ["input_ids"] + [
+        name for name in tokenizer.model_input_names if name != "input_ids"
+    ]
+
+
+def _token_words(features, seq_len):
+    """Returns the word of each token of the features, -1 for the tokens outside of the context."""
+    token_words = np.full((len(features), seq_len), -1, dtype=np.int64)
+    for i, feature in enumerate(features):
+        tokens = np.fromiter(feature.token_to_orig_map.keys(), dtype=np.int64)
+        words = np.fromiter(feature.token_to_orig_map.values(), dtype=np.int64)
+        token_words[i, tokens] = words
+    return token_words
+
+
+def _top_spans(start, end, token_words, topk, max_answer_len):
+    """
+    Returns the topk (start, end) token spans of every feature and their scores, from the
+    start and end probabilities of the tokens, as the transformers QA pipeline's decode.
+    Spans end after they start, are at most max_answer_len tokens long and only
+    contain context tokens, features with fewer spans get -1 scores for the rest.
+    """
+    num_features, seq_len = start.shape
+    max_answer_len = min(max_answer_len, seq_len)
+    # scores[i, s, k] is the score of the span (s, s + k) of feature i
+    pad = np.zeros((num_features, max_answer_len - 1), dtype=end.dtype)
+    end_windows = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate([end, pad], axis=1), max_answer_len, axis=1
+    )
+    scores = start[:, :, None] * end_windows
+    in_context = token_words >= 0
+    context_windows = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate([in_context, np.zeros_like(pad, dtype=bool)], axis=1),
+        max_answer_len,
+        axis=1,
+    )
+    scores = np.where(in_context[:, :, None] & context_windows, scores, -1).reshape(
+        num_features, -1
+    )
+
+    topk = min(topk, scores.shape[1])
+    if topk == 1:
+        idx = np.argmax(scores, axis=1)[:, None]
+    else:
+        idx = np.argpartition(-scores, topk - 1, axis=1)[:, :topk]
+        top_scores = np.take_along_axis(scores, idx, axis=1)
+        idx = np.take_along_axis(idx, np.argsort(-top_scores, axis=1), axis=1)
+    starts, offsets = np.divmod(idx, max_answer_len)
+    return starts, starts + offsets, np.take_along_axis(scores, idx, axis=1)
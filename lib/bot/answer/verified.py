@@ -0,0 +1,267 @@
+# bot modules
+from bot.answer.base import Answer, question_id
+from bot.searcher.question import QuestionSearchEngine
+from bot.database.sqlite import Database
+
+# general python
+import threading
+import json
+import sys
+
+
+class VerifiedAnswerIndex:
+    """Index of the answers the users labeled as correct"""
+
+    def __init__(
+        self,
+        question_engine=QuestionSearchEngine,
+        db_name="data_storage",
+        table_name="answers",
+        threshold=0.8,
+        connections=None,
+    ):
+        """
+        Answers labeled correct (label 1) are indexed on the terms of their user
+        question, a new question matching one of them is answered with the
+        verified answer without running the AnswerDetector.
+
+        Questions are matched with the analyzer and the BM25 idf of the Question
+        Search Engine's index: the similarity of two questions is the idf weighted
+        share of their terms they have in common (1.0 for the same terms), so that
+        rare terms such as daemon or command names weigh more than common ones.
+        The idf of the (large) questions index is used since the few verified
+        answers are too little data for BM25 statistics of their own.
+
+        Answers labeled wrong are never indexed, and a verified answer that is
+        labeled wrong for a question it was returned for isn't returned again
+        for that question.
+
+        <!> Note: The index is loaded from the answers table, keep it up to date
+                  with .update_label() whenever a label is updated.
+
+        :param question_engine : QuestionSearchEngine whose index weighs the question terms
+        :param db_name         : name of the db storing the answers (default is data_storage)
+        :param table_name      : name of the table holding the Answers (default is answers)
+        :param threshold       : minimum similarity of the questions to return a verified answer (default is 0.8)
+        :param connections     : ConnectionManager of the db, a new connection is opened
+                                 for every access when not given (optional)
+        """
+        try:
+            assert type(question_engine) == QuestionSearchEngine
+        except AssertionError as _e:
+            sys.exit(
+                "Error: Wrong search engine type. Make sure to use DonkeyBot's QuestionSearchEngine."
+            )
+        self.question_engine = question_engine
+        self.db_name = db_name
+        self.table_name = table_name
+        self.threshold = threshold
+        self.connections = connections
+        # Slack handlers can match and update labels from different threads
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Indexes the answers labeled correct in the answers table."""
+        with self._lock:
+            # answer_id -> answer row, question terms
+            self._answers = {}
+            self._terms = {}
+            # question term -> answer_ids
+            self._postings = {}
+            # (verified answer_id, user_question_id) it was labeled wrong for
+            self._rejected = set()
+            # idf of the terms and summed idf of the verified questions,
+            # for the version of the questions index
+            self._weights = {}
+            self._question_weights = {}
+            self._weights_version = None
+            data_storage = self._database()
+            tables = [table[0] for table in data_storage.get_tables()]
+            if self.table_name in tables:
+                labeled_answers = data_storage.get_labeled_answers(
+                    table_name=self.table_name
+                )
+            else:
+                labeled_answers = None
+            data_storage.close_connection()
+            if labeled_answers is not None:
+                for _, row in labeled_answers.iterrows():
+                    self._apply_label(row)
+
+    def update_label(self, answer_id, label):
+        """
+        Updates the index after the label of an answer is updated in the answers table.
+
+        :param answer_id : id of the answer
+        :param label     : the new label, 0 (wrong), 1 (correct) or None
+        """
+        data_storage = self._database()
+        answer = data_storage.get_answer(answer_id, table_name=self.table_name)
+        data_storage.close_connection()
+        with self._lock:
+            self._remove(answer_id)
+            if not answer.empty:
+                row = answer.iloc[0].copy()
+                row["label"] = label
+                self._apply_label(row)
+
+    def _database(self):
+        """Database of the calling thread, close_connection() keeps pooled connections open."""
+        if self.connections is not None:
+            return self.connections.database()
+        return Database(f"{self.db_name}.db")
+
+    def _apply_label(self, row):
+        label = _label(row["label"])
+        metadata = json.loads(row["metadata"]) if row["metadata"] else {}
+        if label == 1:
+            self._add(row, metadata)
+        elif label == 0 and "verified_answer_id" in metadata:
+            # answered by a verified answer that didn't fit the question
+            self._rejected.add(
+                (metadata["verified_answer_id"], row["user_question_id"])
+            )
+
+    def _add(self, row, metadata):
+        answer_id = row["answer_id"]
+        terms = frozenset(self.question_engine.preprocess(row["user_question"]))
+        if not terms:
+            return
+        self._answers[answer_id] = dict(row, metadata=metadata)
+        self._terms[answer_id] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(answer_id)
+
+    def _remove(self, answer_id):
+        terms = self._terms.pop(answer_id, ())
+        self._answers.pop(answer_id, None)
+        self._question_weights.pop(answer_id, None)
+        for term in terms:
+            self._postings[term].discard(answer_id)
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def match(self, question, top_k=1):
+        """
+        Returns the verified answers whose question is at least threshold similar to the question.
+
+        :param question : user question
+        :param top_k    : maximum number of verified answers returned (default is 1)
+        :returns matches: list of (answer row as a dict, similarity), the most similar first
+        """
+        terms = frozenset(self.question_engine.preprocess(question))
+        user_question_id = question_id(question)
+        with self._lock:
+            self._check_weights()
+            # idf weight of the terms each verified question shares with the question
+            common = {}
+            for term in terms:
+                weight = self._weight(term)
+                for answer_id in self._postings.get(term, ()):
+                    common[answer_id] = common.get(answer_id, 0.0) + weight
+            question_weight = sum(self._weight(term) for term in terms)
+            matches = []
+            for answer_id, common_weight in common.items():
+                if (answer_id, user_question_id) in self._rejected:
+                    continue
+                if answer_id not in self._question_weights:
+                    self._question_weights[answer_id] = sum(
+                        self._weight(term) for term in self._terms[answer_id]
+                    )
+                verified_weight = self._question_weights[answer_id]
+                # idf weighted Jaccard similarity of the terms of the questions
+                union_weight = question_weight + verified_weight - common_weight
+                similarity = common_weight / union_weight if union_weight > 0 else 0.0
+                if similarity >= self.threshold:
+                    matches.append((self._answers[answer_id], similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:top_k]
+
+    def get(self, question, top_k=1):
+        """
+        Returns the verified answers of the question, None when there isn't a match.
+
+        :param question : user question
+        :param top_k    : maximum number of verified answers returned (default is 1)
+        :returns answers: list of new Answer objects for the question or None
+        """
+        matches = self.match(question, top_k=top_k)
+        if not matches:
+            return None
+        answers = []
+        for row, similarity in matches:
+            metadata = dict(
+                row["metadata"],
+                verified_answer_id=row["answer_id"],
+                verified_similarity=similarity,
+            )
+            answers.append(
+                Answer(
+                    question=question,
+                    answer=row["answer"],
+                    model=row["model"],
+                    start=_number(row["start"]),
+                    end=_number(row["end"]),
+                    confidence=_float(row["confidence"]),
+                    extended_answer=row["extended_answer"],
+                    extended_start=_number(row["extended_start"]),
+                    extended_end=_number(row["extended_end"]),
+                    metadata=metadata,
+                )
+            )
+        return answers
+
+    def _check_weights(self):
+        """Forgets the idf weights when the Question Search Engine's index changed."""
+        if self._weights_version == self.question_engine.index_version:
+            return
+        bm25 = self.question_engine.bm25
+        self._weights = {}
+        self._question_weights = {}
+        self._weights_version = self.question_engine.index_version
+        if type(bm25.idf) == dict:
+            # rank_bm25 backend
+            self._max_weight = max(bm25.idf.values())
+        else:
+            self._max_weight = float(bm25.idf.max())
+
+    def _weight(self, term):
+        """
+        Returns the idf of the term in the Question Search Engine's index,
+        terms it doesn't know are weighed as the rarest terms.
+        """
+        if term not in self._weights:
+            bm25 = self.question_engine.bm25
+            if type(bm25.idf) == dict:
+                weight = bm25.idf.get(term)
+            else:
+                term_id = bm25.vocabulary.get(term)
+                weight = None if term_id is None else float(bm25.idf[term_id])
+            self._weights[term] = self._max_weight if weight is None else weight
+        return self._weights[term]
+
+    def __len__(self):
+        return len(self._answers)
+
+
+def _label(value):
+    """Labels are stored as TEXT, returns 0, 1 or None."""
+    if value is None or value != value:
+        return None
+    return int(float(value))
+
+
+def _float(value):
+    """Confidences are stored as TEXT, FAQ answers have none."""
+    if value is None or value != value:
+        return None
+    return float(value)
+
+
+def _number(value):
+    """Numbers of the answers table are stored as TEXT."""
+    if value is None:
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() else number
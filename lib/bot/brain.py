@@ -3,9 +3,13 @@ from bot.searcher.base import SearchEngine
 from bot.searcher.question import QuestionSearchEngine
 from bot.searcher.faq import FAQSearchEngine
 from bot.answer.detector import AnswerDetector
+from bot.answer.cascade import CascadeAnswerDetector
 from bot.answer.base import Answer
+from bot.searcher.selector import CandidateSelector, select_within_budget, count_tokens
 
 # general python
+import threading
+import time
 import sys
 
 
@@ -16,17 +20,40 @@ class QAInterface:
         question_engine=QuestionSearchEngine,
         faq_engine=FAQSearchEngine,
         docs_engine=SearchEngine,
+        question_selector=None,
+        docs_selector=None,
+        answer_cache=None,
     ):
+        """
+        :param detector          : AnswerDetector (or CascadeAnswerDetector) reading the retrieved contexts
+        :param question_engine   : QuestionSearchEngine retrieving the most similar questions
+        :param faq_engine        : FAQSearchEngine retrieving the most similar FAQ
+        :param docs_engine       : SearchEngine retrieving the most similar documentation
+        :param question_selector : CandidateSelector pruning the retrieved questions (default is None, no pruning)
+        :param docs_selector     : CandidateSelector pruning the retrieved documentation (default is None, no pruning)
+        :param answer_cache      : AnswerCache returning the answers of repeated questions (default is None, no caching)
+        """
         self.detector = detector
         self.question_engine = question_engine
         self.docs_engine = docs_engine
         self.faq_engine = faq_engine
+        self.question_selector = question_selector or CandidateSelector()
+        self.docs_selector = docs_selector or CandidateSelector()
+        self.answer_cache = answer_cache
+        # candidates retrieved and read so far, see selection_info()
+        self.num_candidates = 0
+        self.num_selected = 0
+        self.candidate_tokens = 0
+        self.selected_tokens = 0
+        self.reader_time = 0.0
+        # the counters are updated by the threads answering concurrently
+        self._stats_lock = threading.Lock()
         self._check_detector()
         self._check_engines()
 
     def _check_detector(self):
         try:
-            assert type(self.detector) == AnswerDetector
+            assert type(self.detector) in (AnswerDetector, CascadeAnswerDetector)
         except AssertionError as _e:
             sys.exit(
                 "Error: Wrong detector type. Make sure to use DonkeyBot's AnswerDetector."
@@ -54,6 +81,15 @@ class QAInterface:
         :param num_faqs      : Number of retrieved FAQ answers (default is 3)
         :return faq_answers : list of Answer objects
         """
+        if self.answer_cache is not None:
+            cache_args = (
+                "FAQSearchEngine",
+                self.faq_engine.index_version,
+                f"num_faqs={num_faqs}",
+            )
+            faq_answers = self.answer_cache.get(query, *cache_args)
+            if faq_answers is not None:
+                return faq_answers
         self.retrieved_faqs = self.faq_engine.search(query, num_faqs)
         faq_answers = []
         for _, faq in self.retrieved_faqs.iterrows():
@@ -75,46 +111,147 @@ class QAInterface:
                 metadata=metadata,
             )
             faq_answers.append(answer)
+        if self.answer_cache is not None:
+            self.answer_cache.put(query, faq_answers, *cache_args)
         return faq_answers
 
-    def _get_question_answers(self, query, num_questions):
-        """Returns num_questions answers based on the most similar questions and their context."""
-        # most similar questions
-        self.retrieved_questions = self.question_engine.search(query, num_questions)
-        question_answers = self.detector.predict(
-            query, self.retrieved_questions, top_k=self.top_k
-        )
-        return question_answers
-
-    def _get_docs_answers(self, query, num_docs):
-        """Returns num_docs answers based on the most similar documentation."""
-        # most similar documentation docs
-        self.retrieved_docs = self.docs_engine.search(query, num_docs)
-        doc_answers = self.detector.predict(
-            query, self.retrieved_docs, top_k=self.top_k
-        )
-        return doc_answers
-
-    def get_answers(self, query, top_k=3, num_questions=10, num_docs=10):
+    def get_answers(
+        self,
+        query,
+        top_k=3,
+        num_questions=10,
+        num_docs=10,
+        fused=True,
+        latency_budget=None,
+    ):
         """
         Return top_k number of Answers based on user query.
 
-        :param query         : User's question/query (passed on to private functions)
-        :param top_k         : Number of Answers returned (default is 3)
-        :param num_questions : Number of retrieved Questions (default is 10)
-        :param num_docs      : Number of retrieved Documents (default is 10)
-        :returns answers     : List of top_k Answer objects + num_faq Answer objects from FAQ
+        :param query          : User's question/query (passed on to private functions)
+        :param top_k          : Number of Answers returned (default is 3)
+        :param num_questions  : Number of retrieved Questions (default is 10)
+        :param num_docs       : Number of retrieved Documents (default is 10)
+        :param fused          : True to predict from the retrieved Questions and Documents
+                                in a single AnswerDetector pass, False for one pass for each (default is True)
+                                <!> with fused=True .question_answers and .doc_answers hold the
+                                    returned top_k Answers split by origin, not the top_k of each
+        :param latency_budget : seconds the AnswerDetector may spend reading, turned into a token
+                                budget with the reading speed of the previous requests (default is None)
+        :returns answers      : List of top_k Answer objects + num_faq Answer objects from FAQ
         """
         # self.query = query
         self.top_k = top_k
 
-        # extract answers
-        self.question_answers = self._get_question_answers(query, num_questions)
-        self.doc_answers = self._get_docs_answers(query, num_docs)
+        if self.answer_cache is not None:
+            cache_args = (
+                _detector_name(self.detector),
+                f"{self.question_engine.index_version}:{self.docs_engine.index_version}",
+                f"top_k={top_k},num_questions={num_questions},num_docs={num_docs},"
+                f"fused={fused},latency_budget={latency_budget},"
+                f"selectors={vars(self.question_selector)}:{vars(self.docs_selector)}",
+            )
+            answers = self.answer_cache.get(query, *cache_args)
+            if answers is not None:
+                self.answers = answers
+                self.question_answers = [a for a in answers if a.origin == "questions"]
+                self.doc_answers = [a for a in answers if a.origin == "documentation"]
+                return self.answers
+
+        self.retrieved_questions = self.question_engine.search(query, num_questions)
+        self.retrieved_docs = self.docs_engine.search(query, num_docs)
+        questions, docs = self._select_candidates(latency_budget)
 
-        # sort answers by their `confidence` and select top-k from question/doc answers
-        self.answers = self.question_answers + self.doc_answers
-        self.answers = sorted(self.answers, key=lambda k: k.confidence, reverse=True)
-        self.answers = self.answers[:top_k]
+        if fused:
+            # one reader pass, the top_k are selected from the answers of both
+            self.answers = self._read(query, [questions, docs])
+            self.question_answers = [a for a in self.answers if a.origin == "questions"]
+            self.doc_answers = [a for a in self.answers if a.origin == "documentation"]
+        else:
+            # extract answers
+            self.question_answers = self._read(query, questions)
+            self.doc_answers = self._read(query, docs)
 
+            # sort answers by their `confidence` and select top-k from question/doc answers
+            self.answers = self.question_answers + self.doc_answers
+            self.answers = sorted(self.answers, key=lambda k: k.confidence, reverse=True)
+            self.answers = self.answers[:top_k]
+
+        if self.answer_cache is not None:
+            self.answer_cache.put(query, self.answers, *cache_args)
         return self.answers
+
+    def _select_candidates(self, latency_budget=None):
+        """
+        Returns the retrieved questions and documentation the AnswerDetector reads,
+        pruned by the selector of each engine and by the token budget of the request.
+        """
+        questions = self.question_selector.select(self.retrieved_questions)
+        docs = self.docs_selector.select(self.retrieved_docs)
+        tokens_per_second = self.reading_speed()
+        if latency_budget is not None and tokens_per_second:
+            questions, docs = select_within_budget(
+                [questions, docs], latency_budget * tokens_per_second
+            )
+        retrieved = (self.retrieved_questions, self.retrieved_docs)
+        candidate_tokens = sum(_frame_tokens(frame) for frame in retrieved)
+        selected_tokens = _frame_tokens(questions) + _frame_tokens(docs)
+        with self._stats_lock:
+            self.num_candidates += sum(len(frame) for frame in retrieved)
+            self.num_selected += len(questions) + len(docs)
+            self.candidate_tokens += candidate_tokens
+            self.selected_tokens += selected_tokens
+        return questions, docs
+
+    def _read(self, query, documents):
+        """Returns the top_k answers of the AnswerDetector and times its reading."""
+        start = time.perf_counter()
+        answers = self.detector.predict(query, documents, top_k=self.top_k)
+        with self._stats_lock:
+            self.reader_time += time.perf_counter() - start
+        return answers
+
+    def reading_speed(self):
+        """Returns the tokens read per second by the AnswerDetector so far, None before reading."""
+        with self._stats_lock:
+            return _reading_speed(self.selected_tokens, self.reader_time)
+
+    def selection_info(self):
+        """
+        Returns the number of candidates retrieved and selected for reading so far,
+        their tokens and the reader time saved by not reading the pruned candidates
+        (estimated with the reading speed of the selected ones, in seconds).
+        """
+        with self._stats_lock:
+            info = {
+                "candidates": self.num_candidates,
+                "selected": self.num_selected,
+                "candidate_tokens": self.candidate_tokens,
+                "selected_tokens": self.selected_tokens,
+                "reader_time": self.reader_time,
+            }
+        tokens_per_second = _reading_speed(info["selected_tokens"], info["reader_time"])
+        pruned_tokens = info["candidate_tokens"] - info["selected_tokens"]
+        info["saved_time"] = (
+            pruned_tokens / tokens_per_second if tokens_per_second else None
+        )
+        return info
+
+
+def _reading_speed(selected_tokens, reader_time):
+    if not reader_time or not selected_tokens:
+        return None
+    return selected_tokens / reader_time
+
+
+def _frame_tokens(results):
+    return int(results["context"].map(count_tokens).sum()) if not results.empty else 0
+
+
+def _detector_name(detector):
+    """Name of the model(s) of the detector, as used by the AnswerCache."""
+    if type(detector) == CascadeAnswerDetector:
+        return (
+            f"{_detector_name(detector.small_detector)}>{_detector_name(detector.large_detector)}"
+            f"@{detector.confidence_threshold}x{detector.num_escalated_documents}"
+        )
+    return f"{detector.model_name}-int8" if detector.quantize else detector.model_name
@@ -6,6 +6,7 @@ import re
 TOP_LEVEL_DIR = str(Path(__file__).parents[2])
 DATA_DIR = os.path.join(TOP_LEVEL_DIR, "data/")
 MODELS_DIR = os.path.join(TOP_LEVEL_DIR, "models/")
+INDEXES_DIR = os.path.join(DATA_DIR, "indexes/")
 
 # REGEX
 REGEX_METACHARACTERS = "^$.|?*+(){}[]"
@@ -0,0 +1,105 @@
+# bot modules
+from bot.database.sqlite import Database
+import bot.config as config
+
+# general python
+import threading
+import sqlite3
+import os.path
+
+
+class ConnectionManager:
+    """Thread-local pool of connections to a sqlite3 Database"""
+
+    def __init__(
+        self,
+        db_name,
+        read_only=False,
+        immutable=False,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        busy_timeout=5.0,
+    ):
+        """
+        Every thread gets its own connection to the db the first time it asks for
+        one, and keeps using it afterwards, so that threads (eg. the Slack handlers)
+        neither reconnect for every request nor share a connection.
+
+        Read-write connections switch the db to WAL journaling, where readers don't
+        block the writer and the writer doesn't block readers, with synchronous=NORMAL
+        (WAL stays consistent, only the last commits can be lost on power failure)
+        and memory-mapped reads of up to mmap_size bytes.
+
+        <!> Note: immutable=True tells sqlite3 that the db file can't change, it is
+                  read without any locking. Only use it for a db that nothing writes
+                  to while it's open, eg. a copy of the indexes and corpus used for
+                  serving, since changes (and the WAL file) aren't seen.
+
+        :param db_name      : name of the db file under DATA_DIR, eg. data_storage.db
+        :param read_only    : open the connections read-only (default is False)
+        :param immutable    : read-only connections to a db file that doesn't change (default is False)
+        :param journal_mode : journal mode set by read-write connections (default is WAL)
+        :param synchronous  : synchronous pragma of read-write connections (default is NORMAL)
+        :param mmap_size    : maximum number of bytes of the db memory-mapped (default is 256MB)
+        :param busy_timeout : seconds a connection waits for a lock held by another one (default is 5.0)
+        """
+        self.db_name = db_name
+        self.read_only = read_only or immutable
+        self.immutable = immutable
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        # connections of all the threads, closed by close_all()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """Returns the sqlite3 connection of the calling thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+            self._local.database = Database(self.db_name, connection=connection)
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def database(self):
+        """
+        Returns the Database of the calling thread, its close_connection()
+        keeps the connection open for the next requests of the thread.
+        """
+        self.connection()
+        return self._local.database
+
+    def _connect(self):
+        path = os.path.abspath(config.DATA_DIR + self.db_name)
+        if self.read_only:
+            mode = "ro&immutable=1" if self.immutable else "ro"
+            uri = f"file:{path}?mode={mode}"
+            connection = sqlite3.connect(
+                uri, uri=True, timeout=self.busy_timeout, check_same_thread=False
+            )
+        else:
+            connection = sqlite3.connect(
+                path, timeout=self.busy_timeout, check_same_thread=False
+            )
+            connection.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return connection
+
+    def close_all(self):
+        """Closes the connections of all the threads."""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        # a new thread-local, the threads connect again if they are used afterwards
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._connections)
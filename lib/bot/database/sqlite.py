@@ -8,16 +8,29 @@ import os.path
 import pandas as pd
 import json
 
+# rows passed to each executemany() by the bulk insert_* methods
+INSERT_BATCH_SIZE = 1000
+
 
 class Database:
     """Database wrapper for sqlite3"""
 
-    def __init__(self, db_name, default_table="emails"):
+    def __init__(self, db_name, default_table="emails", connection=None):
+        """
+        :param db_name       : name of the db file under DATA_DIR
+        :param default_table : (default is emails)
+        :param connection    : existing sqlite3 connection to the db, eg. from a
+                               ConnectionManager, it isn't closed by close_connection() (optional)
+        """
         self.db_name = db_name
-        try:
-            self.db = sqlite3.connect(config.DATA_DIR + db_name)
-        except Error as err:
-            print(err)
+        self._owns_connection = connection is None
+        if connection is not None:
+            self.db = connection
+        else:
+            try:
+                self.db = sqlite3.connect(config.DATA_DIR + db_name)
+            except Error as err:
+                print(err)
         self.default_table = default_table
         self.cursor = self.db.cursor()
 
@@ -29,8 +42,9 @@ class Database:
         return pd.read_sql_query(f"SELECT * FROM {table}", self.db)
 
     def close_connection(self):
-        """Close Database connection."""
-        self.db.close()
+        """Close Database connection, unless it was given to the Database."""
+        if self._owns_connection:
+            self.db.close()
 
     def drop_table(self, table_name):
         """Drop a table if it exists."""
@@ -62,6 +76,32 @@ class Database:
         self.cursor.execute(query_string)
         return self.cursor.fetchall()
 
+    def _insert_many(self, query, rows, batch_size=INSERT_BATCH_SIZE):
+        """
+        Inserts the rows in a single transaction, with one executemany() per
+        batch_size rows so that iterables of any length can be inserted.
+        Nothing is inserted if any of the rows fails.
+
+        :param query      : INSERT statement with a placeholder for each column
+        :param rows       : iterable of tuples with the values of each row
+        :param batch_size : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count    : number of inserted rows
+        """
+        count = 0
+        batch = []
+        # commits the transaction at the end, rolls it back on errors
+        with self.db:
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    self.db.executemany(query, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.db.executemany(query, batch)
+                count += len(batch)
+        return count
+
     # emails
     def create_emails_table(self, table_name="emails"):
         """
@@ -87,36 +127,35 @@ class Database:
             },
         )
 
-    def insert_email(self, email_obj, table_name):
+    def insert_email(self, email_obj, table_name="emails"):
         """
         Insert Email objects into the database.
 
         :param email_obj  : Email object from bot.parser.emails
         :param table_name : name of the table to store the email
         """
-        data = (
-            email_obj.id,
-            email_obj.sender,
-            email_obj.receiver,
-            email_obj.subject,
-            email_obj.body,
-            email_obj.clean_body,
-            email_obj.date,
-            email_obj.first_email,
-            email_obj.reply_email,
-            email_obj.fwd_email,
-            email_obj.conversation_id,
-        )
+        self.insert_emails([email_obj], table_name)
 
-        self.db.execute(
+    def insert_emails(
+        self, email_objs, table_name="emails", batch_size=INSERT_BATCH_SIZE
+    ):
+        """
+        Insert Email objects into the database in a single transaction.
+
+        :param email_objs  : iterable of Email objects from bot.parser.emails
+        :param table_name  : name of the table to store them
+        :param batch_size  : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count     : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (email_id, sender, receiver, subject, body, clean_body, \
                 email_date , first_email, reply_email, \
                 fwd_email, conversation_id) \
                 values(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            data,
+            (_email_row(email_obj) for email_obj in email_objs),
+            batch_size,
         )
-        self.db.commit()
 
     # issues
     def create_issues_table(self, table_name="issues"):
@@ -141,31 +180,34 @@ class Database:
             },
         )
 
-    def insert_issue(self, issue_obj, table_name):
+    def insert_issue(self, issue_obj, table_name="issues"):
         """
         Insert Issue objects into the database.
 
         :param issue_obj  : Email object from bot.parser.issues
         :param table_name : name of the table to store the issue
         """
-        data = (
-            issue_obj.issue_id,
-            issue_obj.title,
-            issue_obj.state,
-            issue_obj.creator,
-            issue_obj.created_at,
-            issue_obj.comments,
-            issue_obj.body,
-            issue_obj.clean_body,
-        )
-        self.db.execute(
+        self.insert_issues([issue_obj], table_name)
+
+    def insert_issues(
+        self, issue_objs, table_name="issues", batch_size=INSERT_BATCH_SIZE
+    ):
+        """
+        Insert Issue objects into the database in a single transaction.
+
+        :param issue_objs  : iterable of Issue objects from bot.parser.issues
+        :param table_name  : name of the table to store them
+        :param batch_size  : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count     : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (issue_id, title, state, creator, created_at, \
                 comments, body, clean_body) \
                 values(?, ?, ?, ?, ?, ?, ?, ?)",
-            data,
+            (_issue_row(issue_obj) for issue_obj in issue_objs),
+            batch_size,
         )
-        self.db.commit()
 
     # issue comments
     def create_issue_comments_table(self, table_name="issue_comments"):
@@ -189,29 +231,40 @@ class Database:
             },
         )
 
-    def insert_issue_comment(self, issue_comment_obj, table_name):
+    def insert_issue_comment(self, issue_comment_obj, table_name="issue_comments"):
         """
         Insert IssueComment objects into the database.
 
         :param issue_comment_obj  : IssueComment object from bot.parser.comments
         :param table_name         : name of the table to store the comments
         """
-        data = (
-            issue_comment_obj.comment_id,
-            issue_comment_obj.issue_id,
-            issue_comment_obj.creator,
-            issue_comment_obj.created_at,
-            issue_comment_obj.body,
-            issue_comment_obj.clean_body,
-        )
-        self.db.execute(
+        self.insert_issue_comments([issue_comment_obj], table_name)
+
+    def insert_issue_comments(
+        self,
+        issue_comment_objs,
+        table_name="issue_comments",
+        batch_size=INSERT_BATCH_SIZE,
+    ):
+        """
+        Insert IssueComment objects into the database in a single transaction.
+
+        :param issue_comment_objs : iterable of IssueComment objects from bot.parser.comments
+        :param table_name         : name of the table to store them
+        :param batch_size         : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count            : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (comment_id, issue_id, creator, created_at, \
                 body, clean_body) \
                 values(?, ?, ?, ?, ?, ?)",
-            data,
+            (
+                _issue_comment_row(issue_comment_obj)
+                for issue_comment_obj in issue_comment_objs
+            ),
+            batch_size,
         )
-        self.db.commit()
 
     # rucio docs
     def create_docs_table(self, table_name="docs"):
@@ -233,28 +286,34 @@ class Database:
             },
         )
 
-    def insert_doc(self, docs_obj, table_name):
+    def insert_doc(self, docs_obj, table_name="docs"):
         """
         Insert RucioDoc objects into the database.
 
         :param docs_obj   : RucioDoc object from bot.parser.docs
         :param table_name : name of the table to store the docs
         """
-        data = (
-            docs_obj.doc_id,
-            docs_obj.name,
-            docs_obj.url,
-            docs_obj.body,
-            docs_obj.doc_type,
-        )
-        self.db.execute(
+        self.insert_docs([docs_obj], table_name)
+
+    def insert_docs(
+        self, docs_objs, table_name="docs", batch_size=INSERT_BATCH_SIZE
+    ):
+        """
+        Insert RucioDoc objects into the database in a single transaction.
+
+        :param docs_objs   : iterable of RucioDoc objects from bot.parser.docs
+        :param table_name  : name of the table to store them
+        :param batch_size  : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count     : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (doc_id, name, url, body, \
                 doc_type) \
                 values(?, ?, ?, ?, ?)",
-            data,
+            (_doc_row(docs_obj) for docs_obj in docs_objs),
+            batch_size,
         )
-        self.db.commit()
 
     # questions
     def create_question_table(self, table_name="questions"):
@@ -289,25 +348,30 @@ class Database:
         :param question_obj   : Question object from bot.question
         :param table_name     : name of the table to store the question
         """
-        data = (
-            question_obj.id,
-            question_obj.question,
-            question_obj.start,
-            question_obj.end,
-            question_obj.context,
-            question_obj.email_id,
-            question_obj.issue_id,
-            question_obj.comment_id,
-        )
+        self.insert_questions([question_obj], table_name)
 
-        self.db.execute(
+    def insert_questions(
+        self,
+        question_objs,
+        table_name="questions",
+        batch_size=INSERT_BATCH_SIZE,
+    ):
+        """
+        Insert Question objects into the database in a single transaction.
+
+        :param question_objs : iterable of Question objects from bot.question
+        :param table_name    : name of the table to store them
+        :param batch_size    : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count       : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (question_id, question, start,\
                 end, context, email_id, issue_id, comment_id) \
                 values(?, ?, ?, ?, ?, ?, ?, ?)",
-            data,
+            (_question_row(question_obj) for question_obj in question_objs),
+            batch_size,
         )
-        self.db.commit()
 
     # answers
     def create_answers_table(self, table_name="answers"):
@@ -346,34 +410,31 @@ class Database:
         :param answer_obj   : Answer object from bot.answer
         :param table_name   : name of the table to store the answer
         """
-        data = (
-            answer_obj.id,
-            answer_obj.user_question_id,
-            answer_obj.user_question,
-            answer_obj.answer,
-            answer_obj.start,
-            answer_obj.end,
-            answer_obj.confidence,
-            answer_obj.extended_answer,
-            answer_obj.extended_start,
-            answer_obj.extended_end,
-            answer_obj.model,
-            answer_obj.origin,
-            answer_obj.created_at,
-            answer_obj.label,
-            # remember json
-            json.dumps(answer_obj.metadata),
-        )
+        self.insert_answers([answer_obj], table_name)
 
-        self.db.execute(
+    def insert_answers(
+        self,
+        answer_objs,
+        table_name="answers",
+        batch_size=INSERT_BATCH_SIZE,
+    ):
+        """
+        Insert Answer objects into the database in a single transaction.
+
+        :param answer_objs : iterable of Answer objects from bot.answer
+        :param table_name  : name of the table to store them
+        :param batch_size  : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count     : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (answer_id, user_question_id, user_question, answer, start,\
                 end, confidence, extended_answer, extended_start,\
                 extended_end, model, origin, created_at, label, metadata) \
                 values(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-            data,
+            (_answer_row(answer_obj) for answer_obj in answer_objs),
+            batch_size,
         )
-        self.db.commit()
 
     def update_label(self, answer_id, label, table_name="answers"):
         """
@@ -392,6 +453,119 @@ class Database:
         )
         self.db.commit()
 
+    def update_labels(self, labels, table_name="answers"):
+        """
+        Update the labels of answers in a single transaction, in the given order.
+
+        :param labels       : iterable of (answer_id, label) tuples, label as in update_label()
+        :param table_name   : name of the table that stores our answers (default = "answers")
+        """
+        with self.db:
+            self.db.executemany(
+                f"UPDATE {table_name} SET label = ? WHERE answer_id = ?",
+                ((label, answer_id) for answer_id, label in labels),
+            )
+
+    def get_answer(self, answer_id, table_name="answers"):
+        """
+        Return a pandas DataFrame with the answer of answer_id, empty if it doesn't exist.
+
+        :param answer_id    : id of the answer
+        :param table_name   : name of the table that stores our answers (default = "answers")
+        """
+        return pd.read_sql_query(
+            f"SELECT * FROM {table_name} WHERE answer_id = ?",
+            self.db,
+            params=(answer_id,),
+        )
+
+    def get_labeled_answers(self, table_name="answers"):
+        """
+        Return a pandas DataFrame of the answers that have a label.
+
+        :param table_name   : name of the table that stores our answers (default = "answers")
+        """
+        return pd.read_sql_query(
+            f"SELECT * FROM {table_name} WHERE label IS NOT NULL", self.db
+        )
+
+    # answer cache
+    def create_answer_cache_table(self, table_name="answer_cache"):
+        """
+        Creates the table caching the Answers of the user questions,
+        unlike the other tables it's kept when it already exists.
+
+        :param table_name : name given to the table holding the cached Answers
+        """
+        self.create_table(
+            f"{table_name}",
+            {
+                "cache_key": "TEXT PRIMARY KEY",
+                "user_question_id": "TEXT",
+                "model": "TEXT",
+                "index_version": "TEXT",
+                "answers": "JSON",
+                "created_at": "REAL",
+            },
+        )
+
+    def get_cached_answers(self, cache_key, table_name="answer_cache"):
+        """
+        Returns the (answers, created_at) cached under the cache_key, None if there aren't any.
+
+        :param cache_key    : key of the cached answers, see AnswerCache
+        :param table_name   : name of the table holding the cached Answers
+        """
+        self.cursor.execute(
+            f"SELECT answers, created_at FROM {table_name} WHERE cache_key = ?",
+            (cache_key,),
+        )
+        return self.cursor.fetchone()
+
+    def insert_cached_answers(
+        self,
+        cache_key,
+        user_question_id,
+        model,
+        index_version,
+        answers,
+        created_at,
+        table_name="answer_cache",
+    ):
+        """
+        Insert (or replace) the cached answers of a user question.
+
+        :param answers      : json of the answers
+        :param created_at   : unix time the answers were cached at
+        :param table_name   : name of the table holding the cached Answers
+        """
+        self.db.execute(
+            f"INSERT OR REPLACE INTO {table_name} \
+                (cache_key, user_question_id, model, index_version, answers, created_at) \
+                values(?,?,?,?,?,?)",
+            (cache_key, user_question_id, model, index_version, answers, created_at),
+        )
+        self.db.commit()
+
+    def evict_cached_answers(self, expired_before, max_size, table_name="answer_cache"):
+        """
+        Deletes the cached answers created before expired_before and
+        the oldest ones beyond max_size entries.
+
+        :param expired_before : unix time before which cached answers are expired
+        :param max_size       : maximum number of cached entries kept
+        :param table_name     : name of the table holding the cached Answers
+        """
+        self.db.execute(
+            f"DELETE FROM {table_name} WHERE created_at < ?", (expired_before,)
+        )
+        self.db.execute(
+            f"DELETE FROM {table_name} WHERE cache_key NOT IN \
+                (SELECT cache_key FROM {table_name} ORDER BY created_at DESC LIMIT ?)",
+            (max_size,),
+        )
+        self.db.commit()
+
     # faq
     def create_faq_table(self, table_name="faq"):
         """
@@ -419,30 +593,134 @@ class Database:
         :param faq_obj    : FAQ object from bot.faq.base
         :param table_name : name of the table to store the FAQ
         """
-        # when loading from json in build_donkeybot.py -> fetch_faq_data()
-        if type(faq_obj) == dict:
-            data = (
-                faq_obj["faq_id"],
-                faq_obj["question"],
-                faq_obj["answer"],
-                faq_obj["author"],
-                faq_obj["keywords"],
-                faq_obj["created_at"],
-            )
-        else:
-            data = (
-                faq_obj.faq_id,
-                faq_obj.question,
-                faq_obj.answer,
-                faq_obj.author,
-                faq_obj.keywords,
-                faq_obj.created_at,
-            )
+        self.insert_faqs([faq_obj], table_name)
 
-        self.db.execute(
+    def insert_faqs(self, faq_objs, table_name="faq", batch_size=INSERT_BATCH_SIZE):
+        """
+        Insert FAQ objects into the database in a single transaction.
+
+        :param faq_objs    : iterable of FAQ objects from bot.faq.base
+        :param table_name  : name of the table to store them
+        :param batch_size  : number of rows per executemany() (default is INSERT_BATCH_SIZE)
+        :returns count     : number of inserted rows
+        """
+        return self._insert_many(
             f"INSERT INTO {table_name} \
                 (faq_id, question, answer, author, keywords, created_at) \
                 values(?,?,?,?,?,?)",
-            data,
+            (_faq_row(faq_obj) for faq_obj in faq_objs),
+            batch_size,
+        )
+
+
+def _email_row(email_obj):
+    """Values of the emails row of the Email object."""
+    return (
+        email_obj.id,
+        email_obj.sender,
+        email_obj.receiver,
+        email_obj.subject,
+        email_obj.body,
+        email_obj.clean_body,
+        email_obj.date,
+        email_obj.first_email,
+        email_obj.reply_email,
+        email_obj.fwd_email,
+        email_obj.conversation_id,
+    )
+
+
+def _issue_row(issue_obj):
+    """Values of the issues row of the Issue object."""
+    return (
+        issue_obj.issue_id,
+        issue_obj.title,
+        issue_obj.state,
+        issue_obj.creator,
+        issue_obj.created_at,
+        issue_obj.comments,
+        issue_obj.body,
+        issue_obj.clean_body,
+    )
+
+
+def _issue_comment_row(issue_comment_obj):
+    """Values of the comments row of the IssueComment object."""
+    return (
+        issue_comment_obj.comment_id,
+        issue_comment_obj.issue_id,
+        issue_comment_obj.creator,
+        issue_comment_obj.created_at,
+        issue_comment_obj.body,
+        issue_comment_obj.clean_body,
+    )
+
+
+def _doc_row(docs_obj):
+    """Values of the docs row of the RucioDoc object."""
+    return (
+        docs_obj.doc_id,
+        docs_obj.name,
+        docs_obj.url,
+        docs_obj.body,
+        docs_obj.doc_type,
+    )
+
+
+def _question_row(question_obj):
+    """Values of the questions row of the Question object."""
+    return (
+        question_obj.id,
+        question_obj.question,
+        question_obj.start,
+        question_obj.end,
+        question_obj.context,
+        question_obj.email_id,
+        question_obj.issue_id,
+        question_obj.comment_id,
+    )
+
+
+def _answer_row(answer_obj):
+    """Values of the answers row of the Answer object."""
+    return (
+        answer_obj.id,
+        answer_obj.user_question_id,
+        answer_obj.user_question,
+        answer_obj.answer,
+        answer_obj.start,
+        answer_obj.end,
+        answer_obj.confidence,
+        answer_obj.extended_answer,
+        answer_obj.extended_start,
+        answer_obj.extended_end,
+        answer_obj.model,
+        answer_obj.origin,
+        answer_obj.created_at,
+        answer_obj.label,
+        # remember json
+        json.dumps(answer_obj.metadata),
+    )
+
+
+def _faq_row(faq_obj):
+    """Values of the FAQ row of the FAQ object."""
+    # when loading from json in build_donkeybot.py -> fetch_faq_data()
+    if type(faq_obj) == dict:
+        return (
+            faq_obj["faq_id"],
+            faq_obj["question"],
+            faq_obj["answer"],
+            faq_obj["author"],
+            faq_obj["keywords"],
+            faq_obj["created_at"],
+        )
+    else:
+        return (
+            faq_obj.faq_id,
+            faq_obj.question,
+            faq_obj.answer,
+            faq_obj.author,
+            faq_obj.keywords,
+            faq_obj.created_at,
         )
-        self.db.commit()
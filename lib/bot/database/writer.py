@@ -0,0 +1,285 @@
+# bot modules
+from bot.database.connections import ConnectionManager
+
+# general python
+import threading
+import logging
+import queue
+import time
+import sys
+
+logger = logging.getLogger(__name__)
+
+# put on the queue by close() to stop the writer
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Writes Answers and their labels to the db in a background thread"""
+
+    def __init__(
+        self,
+        connections=ConnectionManager,
+        table_name="answers",
+        max_queue_size=1000,
+        batch_size=100,
+        flush_interval=0.5,
+        on_label=None,
+    ):
+        """
+        Answers and label updates are put on a bounded queue and return right away,
+        a single writer thread writes them in the order they were put, grouping
+        everything queued within flush_interval seconds of the first item (or
+        batch_size items) into one insert_answers() and one update_labels()
+        transaction.
+
+        When the queue is full the put_*() calls wait for the writer (backpressure),
+        writer_info() reports how often and how long they waited.
+
+        When a transaction fails its items are written one by one. Answers that still
+        fail are logged and counted as failed_answers, label updates that still fail
+        are kept and retried (in order) every flush_interval seconds until they are
+        written, those left when the writer is closed are logged. A flush that fails
+        as a whole (eg. the connection can't be opened) keeps all its answers and
+        labels for the next one, it is counted as a failed_flush.
+
+        <!> Note: The writes are only in the db after they are flushed, call
+                  .flush() to wait for them and .close() when shutting down,
+                  which writes everything still queued.
+
+        :param connections    : ConnectionManager of the db, the writer thread uses its own connection
+        :param table_name     : name of the table holding the Answers (default is answers)
+        :param max_queue_size : maximum number of queued answers and labels (default is 1000)
+        :param batch_size     : maximum number of items written per flush (default is 100)
+        :param flush_interval : seconds items wait for more to be written with them (default is 0.5)
+        :param on_label       : called with (answer_id, label) after a label is written,
+                                eg. VerifiedAnswerIndex.update_label (optional)
+        """
+        try:
+            assert type(connections) == ConnectionManager
+        except AssertionError as _e:
+            sys.exit(
+                "Error: Wrong connections type. Make sure to use DonkeyBot's ConnectionManager."
+            )
+        self.connections = connections
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_label = on_label
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        # Answers and (answer_id, label) updates to write again, because
+        # their flush or update failed, only used by the writer thread
+        self._pending_answers = []
+        self._pending_labels = []
+        self._metrics = {
+            "answers_written": 0,
+            "labels_written": 0,
+            "transactions": 0,
+            "errors": 0,
+            "failed_answers": 0,
+            "failed_flushes": 0,
+            "peak_queue_size": 0,
+            "blocked_puts": 0,
+            "blocked_seconds": 0.0,
+            "last_flush_seconds": 0.0,
+        }
+        self._thread = threading.Thread(
+            target=self._run, name="donkeybot-writer", daemon=True
+        )
+        self._thread.start()
+
+    def put_answers(self, answers):
+        """
+        Queues the Answers to be inserted.
+
+        :param answers : list of Answer objects
+        """
+        for answer in answers:
+            self._put(("answer", answer))
+
+    def put_label(self, answer_id, label):
+        """
+        Queues a label update of an answer.
+
+        :param answer_id : id of the answer
+        :param label     : 0 (wrong), 1 (correct) or None
+        """
+        self._put(("label", (answer_id, label)))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # backpressure, wait for the writer to make room
+            start = time.perf_counter()
+            self._queue.put(item)
+            with self._lock:
+                self._metrics["blocked_puts"] += 1
+                self._metrics["blocked_seconds"] += time.perf_counter() - start
+        with self._lock:
+            self._metrics["peak_queue_size"] = max(
+                self._metrics["peak_queue_size"], self._queue.qsize()
+            )
+
+    def flush(self):
+        """Waits until everything queued so far is written, or failed (see writer_info())."""
+        self._queue.join()
+
+    def close(self):
+        """Writes everything still queued and stops the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                # wakes up to retry the failed writes
+                pending = self._pending_answers or self._pending_labels
+                timeout = self.flush_interval if pending else None
+                items = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                items = []
+            stop = bool(items) and items[0] is _STOP
+            deadline = time.monotonic() + self.flush_interval
+            while items and not stop and len(items) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                items.append(item)
+                stop = item is _STOP
+            try:
+                self._write([item for item in items if item is not _STOP])
+            except Exception as _e:
+                # kept for the next flush, the writer keeps running
+                logger.exception(f"Failed to flush the answers and labels: {_e}")
+                with self._lock:
+                    self._metrics["failed_flushes"] += 1
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                for answer in self._pending_answers:
+                    logger.error(
+                        f"Answer {answer.id} wasn't stored before closing the writer."
+                    )
+                for answer_id, label in self._pending_labels:
+                    logger.error(
+                        f"Label {label} of answer {answer_id} wasn't stored before closing the writer."
+                    )
+                return
+
+    def _write(self, items):
+        # the answers and labels that failed before go first, they were put first
+        answers = self._pending_answers + [
+            data for kind, data in items if kind == "answer"
+        ]
+        labels = self._pending_labels + [
+            data for kind, data in items if kind == "label"
+        ]
+        # until they are written, eg. if the connection can't be opened
+        self._pending_answers = answers
+        self._pending_labels = labels
+        if not answers and not labels:
+            return
+        start = time.perf_counter()
+        data_storage = self.connections.database()
+        # answers first, their labels can be in the same flush
+        answers_written = self._write_batch(
+            answers,
+            lambda batch: data_storage.insert_answers(
+                batch, table_name=self.table_name
+            ),
+            "answers",
+        )
+        labels_written = self._write_batch(
+            labels,
+            lambda batch: data_storage.update_labels(batch, table_name=self.table_name),
+            "labels",
+            # a label must not be overwritten by the older one that failed
+            key=lambda label: label[0],
+        )
+        for answer, written in zip(answers, answers_written):
+            if not written:
+                logger.error(f"Answer {answer.id} couldn't be stored, it is dropped.")
+        # kept, in order, for the next flush
+        self._pending_answers = []
+        self._pending_labels = [
+            label for label, written in zip(labels, labels_written) if not written
+        ]
+        with self._lock:
+            self._metrics["answers_written"] += sum(answers_written)
+            self._metrics["labels_written"] += sum(labels_written)
+            self._metrics["failed_answers"] += len(answers) - sum(answers_written)
+            self._metrics["last_flush_seconds"] = time.perf_counter() - start
+        if self.on_label is not None:
+            for (answer_id, label), written in zip(labels, labels_written):
+                if not written:
+                    continue
+                try:
+                    self.on_label(answer_id, label)
+                except Exception as _e:
+                    logger.exception(
+                        f"Failed to apply the label of answer {answer_id}: {_e}"
+                    )
+
+    def _write_batch(self, batch, write, name, key=None):
+        """
+        Writes the batch in one transaction, or item by item when it fails.
+
+        :param batch    : list of items
+        :param write    : writes a list of items in one transaction
+        :param name     : name of the items for the logs
+        :param key      : when an item fails, the later items with the same key
+                          aren't written either (optional)
+        :returns written: list with whether each item of the batch was written
+        """
+        if not batch:
+            return []
+        try:
+            write(batch)
+            with self._lock:
+                self._metrics["transactions"] += 1
+            return [True] * len(batch)
+        except Exception as _e:
+            logger.warning(
+                f"Failed to write {len(batch)} {name}, writing them one by one: {_e}"
+            )
+            with self._lock:
+                self._metrics["errors"] += 1
+        written = []
+        failed_keys = set()
+        for item in batch:
+            if key is not None and key(item) in failed_keys:
+                written.append(False)
+                continue
+            try:
+                write([item])
+            except Exception as _e:
+                logger.warning(f"Failed to write one of the {name}: {_e}")
+                with self._lock:
+                    self._metrics["errors"] += 1
+                written.append(False)
+                if key is not None:
+                    failed_keys.add(key(item))
+                continue
+            written.append(True)
+            with self._lock:
+                self._metrics["transactions"] += 1
+        return written
+
+    def writer_info(self):
+        """Returns the number of queued items, what was written and the backpressure metrics."""
+        with self._lock:
+            return dict(
+                self._metrics,
+                pending_answers=len(self._pending_answers),
+                pending_labels=len(self._pending_labels),
+                queue_size=self._queue.qsize(),
+                max_queue_size=self._queue.maxsize,
+            )
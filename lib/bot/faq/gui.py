@@ -297,12 +297,24 @@ class QAPairWindow(Window):
         if faq_table_name not in tables_in_db:
             print(f"Creating '{faq_table_name}' table in {db_name}.db")
             data_storage.create_faq_table(table_name=f"{faq_table_name}")
+        if f"{faq_table_name}_doc_term_matrix" in tables_in_db:
+            # load the index before inserting so that it matches the FAQ table
+            faq_se = FAQSearchEngine()
+            faq_se.load_index(
+                db=data_storage,
+                table_name=f"{faq_table_name}_doc_term_matrix",
+                original_table=faq_table_name,
+            )
         # insert row
         faq_obj = FAQ(
             question=question, answer=answer, author=author, keywords=keywords
         )
         data_storage.insert_faq(faq_obj, table_name=faq_table_name)
         print(f"FAQ object inserted in '{faq_table_name}' table on {db_name}.db!")
+        # add the FAQ to an existing index instead of re-indexing all of them
+        if f"{faq_table_name}_doc_term_matrix" in tables_in_db:
+            faq_se.add_document(vars(faq_obj))
+            print(f"FAQ object indexed in '{faq_table_name}_doc_term_matrix' table.")
         data_storage.close_connection()
 
 
@@ -44,6 +44,16 @@ class IssueCommentParser(IParser):
         :param issue_comments_table  : in case we need use a different table name (default 'issue_comments')
         :returns issue_comment       : IssueComment object
         """
+        issue_comment = self._create_issue_comment(
+            issue_id, comment_id, creator, created_at, body
+        )
+
+        db.insert_issue_comment(issue_comment, table_name=issue_comments_table)
+        return issue_comment
+
+    @staticmethod
+    def _create_issue_comment(issue_id, comment_id, creator, created_at, body):
+        """Returns the IssueComment object of the raw issue comment's attributes."""
         # The date format returned from the GitHub API is in the ISO 8601 format: "%Y-%m-%dT%H:%M:%SZ"
         issue_comment_created_at = utils.convert_to_utc(
             created_at, "%Y-%m-%dT%H:%M:%SZ"
@@ -51,7 +61,7 @@ class IssueCommentParser(IParser):
         issue_comment_clean_body = utils.pre_process_text(
             body, fix_url=True, remove_newline=True
         )
-        issue_comment = IssueComment(
+        return IssueComment(
             issue_id=issue_id,
             comment_id=comment_id,
             creator=creator,
@@ -60,9 +70,6 @@ class IssueCommentParser(IParser):
             clean_body=issue_comment_clean_body,
         )
 
-        db.insert_issue_comment(issue_comment, table_name=issue_comments_table)
-        return issue_comment
-
     def parse_dataframe(
         self,
         comments_df=pd.DataFrame,
@@ -83,17 +90,16 @@ class IssueCommentParser(IParser):
         issue_comments = []
         print("Parsing issue comments...")
         for i in tqdm(range(len(comments_df.index))):
-            issue_comment = self.parse(
+            issue_comment = self._create_issue_comment(
                 issue_id=comments_df.issue_id.values[i],
                 comment_id=comments_df.comment_id.values[i],
                 creator=comments_df.creator.values[i],
                 created_at=comments_df.created_at.values[i],
                 body=comments_df.body.values[i],
-                db=db,
-                issue_comments_table=issue_comments_table,
             )
-            if return_comments:
-                issue_comments.append(issue_comment)
-            else:
-                continue
-        return issue_comments
+            issue_comments.append(issue_comment)
+        # all the comments are inserted in one transaction
+        db.insert_issue_comments(issue_comments, table_name=issue_comments_table)
+        if return_comments:
+            return issue_comments
+        return []
@@ -36,11 +36,7 @@ class RucioDocsParser(IParser):
         :param docs_table_name        : in case we need use a different table name (default 'docs')
         :returns doc                  : RucioDoc object
         """
-        # remove extra spaces
-        clean_body = re.sub(" +", " ", body).strip(" ")
-        doc = RucioDoc(
-            doc_id=doc_id, name=name, url=url, body=clean_body, doc_type=doc_type
-        )
+        doc = self._create_doc(doc_id, name, url, body, doc_type)
 
         # only insert relevant documentation to db
         if len(doc.body) < 50:
@@ -49,6 +45,15 @@ class RucioDocsParser(IParser):
             db.insert_doc(doc, table_name=docs_table_name)
         return doc
 
+    @staticmethod
+    def _create_doc(doc_id, name, url, body, doc_type):
+        """Returns the RucioDoc object of the raw documentation attributes."""
+        # remove extra spaces
+        clean_body = re.sub(" +", " ", body).strip(" ")
+        return RucioDoc(
+            doc_id=doc_id, name=name, url=url, body=clean_body, doc_type=doc_type
+        )
+
     def parse_dataframe(
         self, docs_df, db=Database, docs_table_name="docs", return_docs=False
     ):
@@ -65,17 +70,18 @@ class RucioDocsParser(IParser):
         docs = []
         print("Parsing Rucio Documentation...")
         for i in tqdm(range(len(docs_df.index))):
-            doc = self.parse(
+            doc = self._create_doc(
                 doc_id=docs_df.doc_id.values[i],
                 name=docs_df.name.values[i],
                 url=docs_df.url.values[i],
                 body=docs_df.body.values[i],
                 doc_type=docs_df.doc_type.values[i],
-                db=db,
-                docs_table_name=docs_table_name,
             )
-            if return_docs:
-                docs.append(doc)
-            else:
-                continue
-        return docs
+            docs.append(doc)
+        # only insert relevant documentation to db, all of it in one transaction
+        db.insert_docs(
+            [doc for doc in docs if len(doc.body) >= 50], table_name=docs_table_name
+        )
+        if return_docs:
+            return docs
+        return []
@@ -107,11 +107,29 @@ class EmailParser(IParser):
         :param emails_table_name  : in case we need use a different table name (default 'emails')
         :returns email            : Email object
         """
+        email = self._create_email(
+            email_id=self._next_email_id(db, emails_table_name),
+            sender=sender,
+            receiver=receiver,
+            subject=subject,
+            body=body,
+            date=date,
+        )
+
+        db.insert_email(email, table_name=emails_table_name)
+        return email
+
+    @staticmethod
+    def _next_email_id(db, emails_table_name):
+        """Returns the id of the next email inserted in the emails table."""
         # new id is num of emails in our database incremented by one. (works for the first inserted email as well)
-        email_id = (
+        return (
             int(db.query(f"""SELECT COUNT(email_id) FROM {emails_table_name}""")[0][0])
             + 1
         )
+
+    def _create_email(self, email_id, sender, receiver, subject, body, date):
+        """Returns the Email object of the raw email attributes."""
         email_sender = list(re.findall("<(.*?)>", sender))
         email_receiver = ", ".join(list(re.findall("<(.*?)>", receiver)))
         # '%a, %d %b %Y %H:%M:%S %z' is the date format we find in Rucio Emails
@@ -120,7 +138,7 @@ class EmailParser(IParser):
         email_clean_body = self.clean_body(body)
         email_conversation_id = self.find_conversation(subject)
 
-        email = Email(
+        return Email(
             email_id=email_id,
             sender=email_sender,
             receiver=email_receiver,
@@ -134,9 +152,6 @@ class EmailParser(IParser):
             conversation_id=email_conversation_id,
         )
 
-        db.insert_email(email, table_name=emails_table_name)
-        return email
-
     def parse_dataframe(
         self,
         emails_df=pd.DataFrame,
@@ -159,21 +174,22 @@ class EmailParser(IParser):
 
         print("Parsing emails...")
         emails = []
+        first_email_id = self._next_email_id(db, emails_table_name)
         for i in tqdm(range(len(emails_df.index))):
-            email = self.parse(
+            email = self._create_email(
+                email_id=first_email_id + i,
                 sender=emails_df.sender.values[i],
                 receiver=emails_df.receiver.values[i],
                 subject=emails_df.subject.values[i],
                 body=emails_df.body.values[i],
                 date=emails_df.date.values[i],
-                db=db,
-                emails_table_name=emails_table_name,
             )
-            if return_emails:
-                emails.append(email)
-            else:
-                continue
-        return emails
+            emails.append(email)
+        # all the emails are inserted in one transaction
+        db.insert_emails(emails, table_name=emails_table_name)
+        if return_emails:
+            return emails
+        return []
 
     @staticmethod
     def clean_subject(subject):
@@ -55,12 +55,25 @@ class IssueParser(IParser):
         :param issues_table_name  : in case we need use a different table name (default 'issues')
         :returns issue            : an <Issue object> created by the IssueParser
         """
+        issue = self._create_issue(
+            issue_id, title, state, creator, created_at, comments, body
+        )
+
+        # no comments -> no context,  only insert relevant data to db
+        if issue.comments > 0:
+            db.insert_issue(issue, table_name=issues_table_name)
+        return issue
+
+    def _create_issue(
+        self, issue_id, title, state, creator, created_at, comments, body
+    ):
+        """Returns the <Issue object> of the raw issue attributes."""
         # The date format returned from the GitHub API is in the ISO 8601 format: "%Y-%m-%dT%H:%M:%SZ"
         issue_created_at = utils.convert_to_utc(created_at, "%Y-%m-%dT%H:%M:%SZ")
         issue_clean_body = utils.pre_process_text(
             self.clean_issue_body(body), fix_url=True
         )
-        issue = Issue(
+        return Issue(
             issue_id=issue_id,
             title=title,
             state=state,
@@ -71,11 +84,6 @@ class IssueParser(IParser):
             clean_body=issue_clean_body,
         )
 
-        # no comments -> no context,  only insert relevant data to db
-        if issue.comments > 0:
-            db.insert_issue(issue, table_name=issues_table_name)
-        return issue
-
     def parse_dataframe(
         self,
         issues_df=pd.DataFrame,
@@ -97,7 +105,7 @@ class IssueParser(IParser):
         issues = []
         print("Parsing issues...")
         for i in tqdm(range(len(issues_df.index))):
-            issue = self.parse(
+            issue = self._create_issue(
                 issue_id=issues_df.issue_id.values[i],
                 title=issues_df.title.values[i],
                 state=issues_df.state.values[i],
@@ -105,14 +113,16 @@ class IssueParser(IParser):
                 created_at=issues_df.created_at.values[i],
                 comments=issues_df.comments.values[i],
                 body=issues_df.body.values[i],
-                db=db,
-                issues_table_name=issues_table_name,
             )
-            if return_issues:
-                issues.append(issue)
-            else:
-                continue
-        return issues
+            issues.append(issue)
+        # no comments -> no context,  only insert relevant data to db, in one transaction
+        db.insert_issues(
+            [issue for issue in issues if issue.comments > 0],
+            table_name=issues_table_name,
+        )
+        if return_issues:
+            return issues
+        return []
 
     @staticmethod
     def clean_issue_body(body):
@@ -0,0 +1,157 @@
+# general python
+import pandas as pd
+import numpy as np
+
+# document attributes the Search Engines can filter on and how they are indexed
+#   'category' : one bitmap of the documents per value
+#   'range'    : (utc) dates sorted along with the rows of their documents
+FILTER_ATTRIBUTES = {
+    "doc_type": "category",
+    "state": "category",
+    "created_at": "range",
+}
+
+
+class AttributeIndex:
+    """Per-document attributes used to filter the candidates of a Search Engine"""
+
+    def __init__(self, attributes):
+        """
+        Indexes the attributes of every document (row) of the corpus so that
+        filters are turned into a mask of the allowed rows without
+        looking at the corpus.
+
+        Filters are given as a dict of attribute -> expression:
+            {
+                'doc_type'   : 'daemon' or ['daemon', 'client'] (any of the values)
+                'state'      : 'open'
+                'created_at' : ('2020-01-01', None) (from, to) both included, None for no limit
+            }
+        Attributes of different filters must all match.
+
+        :param attributes : pandas DataFrame with the attribute columns (see FILTER_ATTRIBUTES),
+                            one row per document in corpus order
+        """
+        self.size = len(attributes)
+        # attribute -> {value: bitmap of the documents with that value}
+        self.categories = {}
+        # attribute -> (sorted dates as int64 nanoseconds, rows of the dates)
+        self.ranges = {}
+        for name, values in attributes.items():
+            if FILTER_ATTRIBUTES[name] == "category":
+                bitmaps = {}
+                for row, value in enumerate(values.tolist()):
+                    value = _category(value)
+                    if value not in bitmaps:
+                        bitmaps[value] = np.zeros(self.size, dtype=bool)
+                    bitmaps[value][row] = True
+                self.categories[name] = bitmaps
+            else:
+                dates = _to_dates(values)
+                rows = np.flatnonzero(dates != _NO_DATE)
+                order = np.argsort(dates[rows], kind="stable")
+                self.ranges[name] = (dates[rows][order], rows[order])
+
+    @property
+    def names(self):
+        """Names of the indexed attributes."""
+        return list(self.categories) + list(self.ranges)
+
+    def mask(self, filters):
+        """
+        Returns the boolean mask of the rows matching all the filters.
+
+        :param filters : dict of attribute -> filter expression
+        :returns mask  : numpy boolean array of size self.size
+        :raises InvalidFilterError : for attributes that aren't indexed
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for name, expression in filters.items():
+            if name in self.categories:
+                values = [expression] if type(expression) == str else expression
+                matches = np.zeros(self.size, dtype=bool)
+                for value in values:
+                    if value in self.categories[name]:
+                        matches |= self.categories[name][value]
+            elif name in self.ranges:
+                start, end = expression
+                dates, rows = self.ranges[name]
+                first = 0 if start is None else np.searchsorted(dates, _to_date(start))
+                last = (
+                    len(dates)
+                    if end is None
+                    else np.searchsorted(dates, _to_date(end), side="right")
+                )
+                matches = np.zeros(self.size, dtype=bool)
+                matches[rows[first:last]] = True
+            else:
+                raise InvalidFilterError(
+                    f"Can't filter on '{name}', the indexed attributes are {self.names}"
+                )
+            mask &= matches
+        return mask
+
+    def set_row(self, row, attributes):
+        """
+        Sets the attributes of the document in row, row == size adds a new document.
+
+        :param row        : row of the document
+        :param attributes : dict of attribute -> value
+        """
+        if row == self.size:
+            self.size += 1
+            for bitmaps in self.categories.values():
+                for value in bitmaps:
+                    bitmaps[value] = np.append(bitmaps[value], False)
+        for name, bitmaps in self.categories.items():
+            for value in bitmaps:
+                bitmaps[value][row] = False
+            value = _category(attributes.get(name))
+            if value not in bitmaps:
+                bitmaps[value] = np.zeros(self.size, dtype=bool)
+            bitmaps[value][row] = True
+        for name, (dates, rows) in self.ranges.items():
+            keep = rows != row
+            dates, rows = dates[keep], rows[keep]
+            date = _to_date(attributes.get(name))
+            if date != _NO_DATE:
+                position = np.searchsorted(dates, date, side="right")
+                dates = np.insert(dates, position, date)
+                rows = np.insert(rows, position, row)
+            self.ranges[name] = (dates, rows)
+
+    def cache_key(self, filters):
+        """Returns a hashable key of the filters, eg. for result caches."""
+        if not filters:
+            return None
+        return tuple(
+            sorted(
+                (name, expression if type(expression) == str else tuple(expression))
+                for name, expression in filters.items()
+            )
+        )
+
+
+# dates that are missing or can't be parsed
+_NO_DATE = np.iinfo(np.int64).min
+
+
+def _category(value):
+    """Missing values (None or NaN) are all the None category."""
+    return None if pd.isna(value) else value
+
+
+def _to_dates(values):
+    """Converts the dates (strings) to utc int64 nanoseconds, _NO_DATE when missing."""
+    dates = pd.to_datetime(pd.Series(values), utc=True, errors="coerce")
+    return dates.dt.tz_convert(None).to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+
+def _to_date(value):
+    return _to_dates([value])[0]
+
+
+class InvalidFilterError(Exception):
+    """Raised when filtering on attributes the Search Engine hasn't indexed."""
+
+    pass
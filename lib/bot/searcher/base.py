@@ -1,19 +1,45 @@
 # bot modules
+import bot.config as config
 import bot.utils as utils
 from bot.database.sqlite import Database
+from bot.searcher.bm25 import (
+    InvertedIndexBM25,
+    IndexFormatError,
+    count_terms,
+    content_version,
+    _ids_array,
+)
+from bot.searcher.attributes import AttributeIndex, FILTER_ATTRIBUTES
 
 # general python
 import pandas as pd
 import numpy as np
 from rank_bm25 import BM25Okapi
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+import threading
 import string
+import shutil
+import os.path
 import sys
 
+# number of corpus chunks given to each worker when indexing in parallel
+CHUNKS_PER_WORKER = 4
+# the index is compacted once the documents updated since the last build
+# are more than this fraction of the corpus
+COMPACTION_RATIO = 0.1
+
 
 class SearchEngine:
     """Search Engine for Documents"""
 
-    def __init__(self, index=["doc_type", "body"], ids="doc_id"):
+    def __init__(
+        self,
+        index=["doc_type", "body"],
+        ids="doc_id",
+        backend="max_score",
+        cache_size=1024,
+    ):
         """
         The job of the SearchEngine is to retrieve the most similar
         document from the created document-term matrix (index).
@@ -23,10 +49,27 @@ class SearchEngine:
 
         :param index : Name of column(s) that will be indexed. (default is ['doc_type', 'body'])
         :param ids   : id of the document we are indexing (default is doc_id)
+        :param backend : BM25 implementation used for scoring, one of
+                         'max_score'      : inverted index with dynamic pruning of the documents
+                                            that can't make it into the top_n results
+                         'inverted_index' : only scores documents that share terms with the query
+                         'rank_bm25'      : exhaustive scoring, kept as the reference implementation
+                         (default is max_score)
+        :param cache_size : maximum number of cached query results, 0 disables the cache (default is 1024)
         :type index  : list
         """
+        assert backend in ["max_score", "inverted_index", "rank_bm25"]
         self.type = "Document Search Engine"
         self.document_ids_name = ids
+        self.backend = backend
+        self.analyzer = utils.Analyzer()
+        # LRU cache of (query terms, top_n, index version) -> top_n rows and scores
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # the Slack handlers search from different threads
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
         # I think doc_type is also usefull to exist in the text that we index
         # since it describes the documentation type. For now at least until options
         # for specific keyword searching are added (eg. search on doc_type == 'release_notes')
@@ -36,27 +79,34 @@ class SearchEngine:
         else:
             self.column_to_index = index
 
-    def search(self, query, top_n):
+    def search(self, query, top_n, filters=None):
         """
         Return at most the `top_n` results most similar to
         the input `query` based on BM25.
 
+        Filters restrict the documents searched, they are applied to the
+        candidate documents before ranking so up to `top_n` matching documents
+        are still returned. eg.
+            filters={'doc_type': ['daemon', 'client'], 'created_at': ('2020-01-01', None)}
+        See AttributeIndex for the filter expressions.
+
         :param top_n    : the maximum number of results that are returned
         :type top_n     : int
         :param query    : User's question/query
+        :param filters  : dict of attribute -> filter expression on the
+                          doc_type, state and created_at attributes (optional)
         :return results : pd.DataFrame object of the results
         """
         try:
             assert top_n > 0
-            if hasattr(self, "index"):
-                search_terms = self.preprocess(query)
-                doc_scores = self.bm25.get_scores(search_terms)
-                # sort results
-                ind = np.argsort(doc_scores)[::-1][:top_n]
+            if hasattr(self, "bm25"):
+                # sorted so that queries with the same terms share cached results
+                search_terms = sorted(self.preprocess(query))
+                ind, doc_scores = self._cached_top_n(search_terms, top_n, filters)
                 # results dataframe
                 results = self.corpus.iloc[ind][self.columns]
-                results["bm25_score"] = doc_scores[ind]
-                self._attach_qa_data(results, query)
+                results["bm25_score"] = doc_scores
+                self._attach_qa_data(results, query, ind)
                 results = results[results.bm25_score > 0]
                 return results.reset_index(drop=True)
             else:
@@ -68,7 +118,136 @@ class SearchEngine:
         except MissingDocumentTermMatrixError as _e:
             sys.exit(_e)
 
-    def _attach_qa_data(self, results, query):
+    def search_batch(self, queries, top_n, filters=None):
+        """
+        Returns the ids and BM25 scores of at most the `top_n` results
+        of every query, without building a DataFrame per query.
+
+        The queries are analyzed together and scored with one sparse matrix
+        product (see InvertedIndexBM25.get_top_n_batch()), the results are
+        the same as the ones of .search() for each query.
+
+        :param queries  : list of User's questions/queries
+        :param top_n    : the maximum number of results per query
+        :param filters  : filters applied to all the queries, see .search() (optional)
+        :returns ids    : ids of the retrieved documents, the results of all the queries concatenated
+        :returns scores : BM25 scores of the retrieved documents
+        :returns offsets: results of query i are ids[offsets[i]:offsets[i + 1]]
+        """
+        try:
+            assert top_n > 0
+            if not hasattr(self, "bm25"):
+                raise MissingDocumentTermMatrixError(
+                    f"\nError: The document term matrix was not found. Please create \
+                                                        it using the create_index() method,\
+                                                        or load it from memory with the load_index() method."
+                )
+        except MissingDocumentTermMatrixError as _e:
+            sys.exit(_e)
+        if not queries:
+            ids = self.corpus[self.document_ids_name].to_numpy()[:0]
+            return ids, np.array([], dtype=np.float64), np.array([0])
+        search_terms = [sorted(self.preprocess(query)) for query in queries]
+        allowed = self.attributes.mask(filters) if filters else None
+        if self.backend == "rank_bm25":
+            results = [self._get_top_n(terms, top_n, allowed) for terms in search_terms]
+            rows = np.concatenate([ind for ind, _ in results]).astype(np.int64)
+            scores = np.concatenate([doc_scores for _, doc_scores in results])
+            offsets = np.cumsum([0] + [len(ind) for ind, _ in results])
+        else:
+            rows, scores, offsets = self.bm25.get_top_n_batch(
+                search_terms, top_n, allowed
+            )
+        # same as the bm25_score > 0 filter of .search()
+        positive = scores > 0
+        offsets = np.concatenate([[0], np.cumsum(positive)])[offsets]
+        ids = self.corpus[self.document_ids_name].to_numpy()[rows[positive]]
+        return ids, scores[positive], offsets
+
+    def _cached_top_n(self, search_terms, top_n, filters=None):
+        """
+        Returns the rows and BM25 scores of the top_n documents from the
+        result cache, scoring the corpus on a miss. Entries are keyed on the
+        index version too, so they are never used after the index changes.
+        """
+        key = (
+            tuple(search_terms),
+            top_n,
+            self.attributes.cache_key(filters),
+            self.index_version,
+        )
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                return result
+            self.cache_misses += 1
+        # scored outside the lock, the other threads' searches don't wait for it
+        allowed = self.attributes.mask(filters) if filters else None
+        result = self._get_top_n(search_terms, top_n, allowed)
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    # least recently used entry
+                    self._cache.popitem(last=False)
+        return result
+
+    def cache_info(self):
+        """Returns the hits, misses and size of the query result cache."""
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+            }
+
+    @property
+    def index_version(self):
+        """Version stamp of the index, changes when the index is created, loaded or updated."""
+        return self.bm25.version
+
+    def _get_top_n(self, search_terms, top_n, allowed=None):
+        """
+        Scores the corpus and returns the rows and BM25 scores
+        of the top_n documents.
+
+        :param search_terms : preprocessed query terms
+        :param top_n        : the maximum number of results that are returned
+        :param allowed      : boolean mask of the rows that can be returned (optional)
+        :returns ind        : rows of the top_n documents in the corpus
+        :returns doc_scores : their BM25 scores
+        """
+        if self.backend == "rank_bm25":
+            doc_scores = self.bm25.get_scores(search_terms)
+            if allowed is not None:
+                doc_scores = np.where(allowed, doc_scores, -np.inf)
+            # sort results
+            ind = np.argsort(doc_scores)[::-1][:top_n]
+            return ind, doc_scores[ind]
+        if self.backend == "max_score":
+            return self.bm25.get_top_n_pruned(search_terms, top_n, allowed)
+        return self.bm25.get_top_n(search_terms, top_n, allowed)
+
+    def _create_bm25(self, terms, term_counts=None):
+        """
+        Creates the BM25 model of the selected backend from the tokenized documents.
+
+        :param terms       : list of tokenized documents
+        :param term_counts : term statistics of the corpus chunks if already counted (optional)
+        """
+        if self.backend == "rank_bm25":
+            bm25 = BM25Okapi(terms)
+            # BM25Okapi has no version stamp of its own
+            bm25.version = content_version("rank_bm25", terms)
+            return bm25
+        if term_counts is not None:
+            return InvertedIndexBM25.from_term_counts(term_counts, documents=terms)
+        return InvertedIndexBM25(terms)
+
+    def _attach_qa_data(self, results, query, rows):
         """
         Attach the columns needed to transform the results
         DataFrame into SQuAD like data.
@@ -80,10 +259,37 @@ class SearchEngine:
 
         For regular documents user's "query" is added and
         and the "context" will be the document info
-        we have previously indexed.
+        we have previously indexed, looked up in the document store
+        only for the retrieved rows.
+
+        :param rows : rows of the results in the corpus
         """
         results["query"] = query
-        results["context"] = self._get_documents().to_frame()
+        results["context"] = self.documents[rows]
+
+    def _create_document_store(self):
+        """
+        Keeps the concatenated text of every indexed document, addressed by
+        its row in the corpus, so that searching doesn't rebuild it.
+        """
+        self.documents = self._get_documents().to_numpy()
+
+    def _create_attribute_index(self):
+        """
+        Indexes the attributes of the corpus documents that can be used
+        as filters in .search(), see AttributeIndex.
+        """
+        self.attributes = AttributeIndex(self._get_attributes(self.corpus))
+
+    def _get_attributes(self, corpus):
+        """
+        Returns the filter attributes (see FILTER_ATTRIBUTES) of the documents,
+        for regular documents the ones that are columns of the corpus.
+
+        :param corpus       : pandas DataFrame of the documents
+        :returns attributes : pandas DataFrame with one column per attribute
+        """
+        return corpus[[name for name in FILTER_ATTRIBUTES if name in corpus.columns]]
 
     def _get_documents(self):
         """
@@ -103,42 +309,86 @@ class SearchEngine:
     def preprocess(self, text):
         """
         Preprocesses/prepares text for the Search Engine.
+        Same as utils.pre_process_text() with lower_text, remove_numbers,
+        remove_punctuation, remove_stop_words, stem and tokenize_text
+        but through the engine's (memoizing) Analyzer.
         """
-        words = utils.pre_process_text(
-            text,
-            lower_text=True,
-            remove_numbers=True,
-            numbers_replacement=" ",
-            remove_punctuation=True,
-            punctuation_replacement=" ",
-            remove_stop_words=True,
-            stem=True,
-            tokenize_text=True,
-        )
-        return list(set([word for word in words if len(word) > 2]))
+        words = self.analyzer.analyze(text)
+        # unique words in order of appearance so that indexes are reproducible
+        return list(dict.fromkeys([word for word in words if len(word) > 2]))
 
     def create_index(
-        self, corpus=pd.DataFrame, db=Database, table_name="doc_term_matrix"
+        self,
+        corpus=pd.DataFrame,
+        db=Database,
+        table_name="doc_term_matrix",
+        workers=1,
+        executor=None,
     ):
         """
         Takes a pandas DataFrame as input and create the SearchEngine's document-term matrix(index).
 
+        With workers > 1 the corpus is split in chunks that are analyzed in parallel
+        processes, their term statistics are merged in corpus order so the index
+        is identical to the one of a serial build.
+
         : param corpus     : pandas DataFrame object
         : param db         : <bot.database.sqlite Database object> where the index will be stored
         : param table_name : Name of the doc term matrix table to be saved on the db ( default = doc_term_matrix)
+        : param workers    : number of processes analyzing the corpus (default is 1)
+        : param executor   : concurrent.futures executor to run the chunks on instead of
+                             creating a new process pool, eg. shared between indexes (optional)
         """
         self.corpus = corpus
         self.columns = self.corpus.columns
+        self.db = db
+        self.table_name = table_name
+        self._create_document_store()
+        self._create_attribute_index()
         documents = self._get_documents()
         # create doc-term matrix
-        self.index = documents.apply(lambda x: self.preprocess(x)).to_frame()
-        self.index.columns = ["terms"]
+        terms, term_counts = self._analyze_documents(
+            documents.tolist(), workers=workers, executor=executor
+        )
+        self.index = pd.DataFrame({"terms": terms})
         self.index.index = self.corpus[self.document_ids_name]
-        self.bm25 = BM25Okapi(self.index.terms.tolist())
+        self.bm25 = self._create_bm25(terms, term_counts)
+        if self.backend != "rank_bm25":
+            self.bm25.save(
+                self._index_path(db, table_name), doc_ids=self.index.index.tolist()
+            )
         self.index.terms = self.index.terms.apply(lambda x: ", ".join(x))
         # save to db
         self.index.to_sql(table_name, con=db.db, if_exists="replace", index=True)
 
+    def _analyze_documents(self, documents, workers=1, executor=None):
+        """
+        Preprocesses the documents, in chunks on parallel processes when
+        workers > 1 or an executor is given.
+
+        :param documents    : list of document texts
+        :returns terms      : list of the terms of every document
+        :returns term_counts: term statistics of every chunk (see bm25.count_terms)
+        """
+        if workers == 1 and executor is None:
+            terms = [self.preprocess(document) for document in documents]
+            return terms, [count_terms(terms)]
+        chunk_size = max(1, -(-len(documents) // (workers * CHUNKS_PER_WORKER)))
+        first_rows = list(range(0, len(documents), chunk_size))
+        chunks = [documents[row : row + chunk_size] for row in first_rows]
+        engine_classes = [type(self)] * len(chunks)
+        if executor is None:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(_analyze_chunk, engine_classes, chunks, first_rows)
+                )
+        else:
+            results = list(
+                executor.map(_analyze_chunk, engine_classes, chunks, first_rows)
+            )
+        terms = [document for chunk_terms, _ in results for document in chunk_terms]
+        return terms, [chunk_counts for _, chunk_counts in results]
+
     def load_index(
         self, db=Database, table_name="rucio_doc_term_matrix", original_table="docs"
     ):
@@ -146,6 +396,10 @@ class SearchEngine:
         Loads the document-term matrix and the original table we indexed to prepare
         the Search Engine for use.
 
+        <!> Note: The binary index saved by create_index() (or convert_index())
+                  is memory-mapped when it exists, otherwise the BM25 index
+                  is rebuilt from the document-term matrix table.
+
         :param table_name     : document term matrix table name
         :param original_table : original table we indexed
         :param db             : <bot.database.sqlite Database object> where the index will be stored
@@ -159,14 +413,237 @@ class SearchEngine:
             ):  # for us this is rucio documentation
                 self.corpus = self.corpus[self.corpus["doc_type"] != "release_notes"]
             self.columns = self.corpus.columns
-            self.index = db.get_dataframe(f"{table_name}").set_index(
-                self.document_ids_name, drop=True
-            )
-            self.index.terms = self.index.terms.apply(lambda x: x.split(", "))
-            self.bm25 = BM25Okapi(self.index.terms.tolist())
+            self.db = db
+            self.table_name = table_name
+            self._create_document_store()
+            self._create_attribute_index()
+            if self.backend != "rank_bm25" and self._load_binary_index(db, table_name):
+                return
+            self.index = self._corpus_index(db.get_dataframe(f"{table_name}"))
+            self.bm25 = self._create_bm25(self.index.terms.tolist())
         except Exception as _e:
             print(_e)
 
+    def _load_binary_index(self, db, table_name):
+        """
+        Memory-maps the binary index of table_name.
+
+        :returns loaded : True if the index was loaded, False if it has to be rebuilt
+        """
+        try:
+            bm25 = InvertedIndexBM25.load(self._index_path(db, table_name))
+        except IndexFormatError as _e:
+            if os.path.isdir(self._index_path(db, table_name)):
+                print(_e)
+            return False
+        if bm25.corpus_size != len(self.corpus):
+            print(
+                f"Binary index of {table_name} has {bm25.corpus_size} documents but "
+                f"the corpus has {len(self.corpus)}, rebuilding it from the table."
+            )
+            return False
+        # same length but eg. a re-fetched or reordered corpus, the scores
+        # of the rows would belong to other documents
+        corpus_ids = _ids_array(
+            self.corpus[self.document_ids_name].tolist(), len(self.corpus)
+        )
+        if not np.array_equal(bm25.doc_ids.astype(str), corpus_ids.astype(str)):
+            print(
+                f"Binary index of {table_name} doesn't have the documents of the "
+                f"corpus in the same order, rebuilding it from the table."
+            )
+            return False
+        self.bm25 = bm25
+        return True
+
+    def convert_index(self, db=Database, table_name="rucio_doc_term_matrix"):
+        """
+        Converts an existing document-term matrix table (comma-joined terms)
+        to the binary index format so that load_index() can memory-map it.
+
+        :param db         : <bot.database.sqlite Database object> where the table is stored
+        :param table_name : document term matrix table name
+        """
+        index = db.get_dataframe(f"{table_name}")
+        # documents without terms are saved as empty strings
+        terms = index.terms.apply(lambda x: x.split(", ") if x else []).tolist()
+        InvertedIndexBM25(terms).save(
+            self._index_path(db, table_name),
+            doc_ids=index[self.document_ids_name].tolist(),
+        )
+
+    def add_document(self, document):
+        """
+        Indexes a new document without re-indexing the corpus.
+
+        The postings of the document are added to the index (see
+        InvertedIndexBM25.add_document()) and its terms to the document-term
+        matrix table. The index is compacted once enough documents changed.
+
+        <!> Note: Only the index is updated, the document itself has to be
+                  inserted in the original table (eg. with Database.insert_faq())
+                  so that the index is aligned with it when loaded again.
+
+        :param document : dict (or pandas Series) with the columns of the corpus
+        """
+        bm25 = self._updatable_bm25()
+        text = " ".join(document[column] for column in self.column_to_index)
+        terms = self.preprocess(text)
+        row = bm25.add_document(terms)
+        new_document = pd.DataFrame([document], columns=self.columns)
+        self.corpus = pd.concat([self.corpus, new_document], ignore_index=True)
+        self._update_document_store(row, text)
+        self.attributes.set_row(row, self._get_attributes(new_document).iloc[0])
+        self._update_table(
+            f"INSERT INTO {self.table_name} ({self.document_ids_name}, terms) VALUES (?, ?)",
+            (_sql_value(document[self.document_ids_name]), ", ".join(terms)),
+        )
+
+    def update_document(self, document):
+        """
+        Re-indexes an already indexed document, found by its id.
+        The document keeps its position in the corpus.
+
+        :param document : dict (or pandas Series) with the columns of the corpus
+        """
+        bm25 = self._updatable_bm25()
+        row = self._row(document[self.document_ids_name])
+        text = " ".join(document[column] for column in self.column_to_index)
+        terms = self.preprocess(text)
+        bm25.update_document(row, terms)
+        self.corpus.iloc[row] = [document[column] for column in self.columns]
+        self._update_document_store(row, text)
+        self.attributes.set_row(
+            row,
+            self._get_attributes(pd.DataFrame([document], columns=self.columns)).iloc[0],
+        )
+        self._update_table(
+            f"UPDATE {self.table_name} SET terms = ? WHERE {self.document_ids_name} = ?",
+            (", ".join(terms), _sql_value(document[self.document_ids_name])),
+        )
+
+    def delete_document(self, doc_id):
+        """
+        Removes a document, found by its id, from the index.
+
+        <!> Note: Only the index is updated, the document itself has to be
+                  deleted from the original table (eg. the faq table) as well.
+                  If it isn't, load_index() keeps it in the corpus but without
+                  any terms, so it is never retrieved.
+
+        :param doc_id : id of the document
+        """
+        bm25 = self._updatable_bm25()
+        bm25.delete_document(self._row(doc_id))
+        self._update_table(
+            f"DELETE FROM {self.table_name} WHERE {self.document_ids_name} = ?",
+            (_sql_value(doc_id),),
+        )
+
+    def compact(self):
+        """
+        Compacts the index after incremental updates, restoring the layout of
+        a fresh build (and the score upper bounds used by the max_score backend),
+        dropping the deleted documents from the corpus and saving the binary index.
+        """
+        if self.bm25.documents is None:
+            # memory-mapped, the binary index was saved compacted and hasn't been updated
+            return
+        rows = self.bm25.compact()
+        self.corpus = self.corpus.iloc[rows]
+        self._create_document_store()
+        self._create_attribute_index()
+        self.bm25.save(
+            self._index_path(self.db, self.table_name),
+            doc_ids=self.corpus[self.document_ids_name].tolist(),
+        )
+
+    def _updatable_bm25(self):
+        """
+        Returns the BM25 index to update. A memory-mapped index can't be updated
+        so it is rebuilt (in memory) from the terms of the document-term matrix table.
+        """
+        assert self.backend != "rank_bm25", "rank_bm25 indexes can't be updated"
+        if self.bm25.documents is None:
+            index = self._corpus_index(self.db.get_dataframe(f"{self.table_name}"))
+            self.bm25 = InvertedIndexBM25(index.terms.tolist())
+        return self.bm25
+
+    def _corpus_index(self, index):
+        """
+        Returns the rows of the document-term matrix table in the order of the
+        corpus, matched on the document ids, with the terms as lists. Documents
+        of the corpus missing from the table (eg. deleted from the index but not
+        from the original table) have no terms, so they are never retrieved.
+
+        :param index : pandas DataFrame of the document-term matrix table
+        """
+        index = index.set_index(self.document_ids_name, drop=True)
+        if index.index.is_unique:
+            index = index.reindex(self.corpus[self.document_ids_name])
+        # documents without terms are saved as empty strings
+        index["terms"] = [
+            terms.split(", ") if type(terms) == str and terms else []
+            for terms in index.terms
+        ]
+        return index
+
+    def _row(self, doc_id):
+        """Returns the row of the (not deleted) document with doc_id in the corpus."""
+        for row in np.flatnonzero(self.corpus[self.document_ids_name].to_numpy() == doc_id):
+            if self.bm25.documents[row] is not None:
+                return row
+        raise KeyError(doc_id)
+
+    def _update_document_store(self, row, text):
+        """Adds (or replaces) the text of the document in row to the document store."""
+        if row == len(self.documents):
+            self.documents = np.append(self.documents, text)
+        else:
+            self.documents[row] = text
+
+    def _update_table(self, query, parameters):
+        """
+        Applies an update to the document-term matrix table. The binary index is
+        outdated after the first update, it is removed (so that load_index() uses
+        the table) until the index is compacted. Compacts the index when needed.
+        """
+        self.db.db.execute(query, parameters)
+        self.db.db.commit()
+        if self.bm25.pending_updates == 1:
+            shutil.rmtree(self._index_path(self.db, self.table_name), ignore_errors=True)
+        if self.bm25.pending_updates > COMPACTION_RATIO * self.bm25.corpus_size:
+            self.compact()
+
+    @staticmethod
+    def _index_path(db, table_name):
+        """Returns the directory of the binary index for the table of the db."""
+        db_name = os.path.splitext(os.path.basename(db.db_name))[0]
+        return os.path.join(config.INDEXES_DIR, db_name, table_name)
+
+
+# search engine of each worker process, per search engine class
+_worker_engines = {}
+
+
+def _analyze_chunk(engine_class, documents, first_row):
+    """
+    Preprocesses a chunk of documents in a worker process and counts its terms.
+    The engine (and its Analyzer memo) is kept for the next chunks of the process.
+    """
+    if engine_class not in _worker_engines:
+        _worker_engines[engine_class] = engine_class()
+    engine = _worker_engines[engine_class]
+    terms = [engine.preprocess(document) for document in documents]
+    return terms, count_terms(terms, first_row)
+
+
+def _sql_value(value):
+    """Converts numpy scalars (eg. ids read with pandas) to python values for sqlite3."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
 
 class MissingDocumentTermMatrixError(Exception):
     """Raised when we have missing attributes for our SearchEngine"""
@@ -0,0 +1,840 @@
+# general python
+import numpy as np
+import scipy.sparse
+import hashlib
+import bisect
+import json
+import math
+import os
+import shutil
+
+# number of postings summarized by one block-max score
+BLOCK_SIZE = 64
+# relative slack added to the score upper bounds during pruning
+PRUNING_TOLERANCE = 1e-9
+# below this number of postings exhaustive scoring is faster than pruning
+MIN_POSTINGS_TO_PRUNE = 8192
+# version of the on-disk index format, bump when the arrays saved change
+INDEX_FORMAT_VERSION = 1
+# arrays of the on-disk index, each one saved as <name>.npy
+INDEX_ARRAYS = [
+    "term_bytes",
+    "term_offsets",
+    "offsets",
+    "postings",
+    "frequencies",
+    "doc_len",
+    "norm",
+    "idf",
+    "max_scores",
+    "block_offsets",
+    "block_max_scores",
+    "doc_ids",
+]
+
+
+class InvertedIndexBM25:
+    """BM25 (Okapi) on top of an inverted index"""
+
+    def __init__(self, corpus, k1=1.5, b=0.75, epsilon=0.25):
+        """
+        Creates per-term posting lists from the tokenized corpus so that
+        a query only touches the documents containing at least one of its terms.
+
+        The scoring function is the same as rank_bm25.BM25Okapi,
+        (including the epsilon floor for negative idf values) so the
+        scores are identical to the ones of the exhaustive implementation.
+
+        :param corpus  : list of tokenized documents (list of lists of terms)
+        :param k1      : term frequency saturation parameter (default is 1.5)
+        :param b       : document length normalization parameter (default is 0.75)
+        :param epsilon : floor for negative idf values as a fraction of the average idf (default is 0.25)
+        """
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self._build([count_terms(corpus)], corpus)
+
+    @classmethod
+    def from_term_counts(
+        cls, term_counts, documents=None, k1=1.5, b=0.75, epsilon=0.25
+    ):
+        """
+        Creates the index from the term statistics of consecutive chunks
+        of the corpus, eg. computed in parallel with count_terms().
+        The chunks are merged in order so the index is the same as
+        the one created from the whole corpus.
+
+        :param term_counts : list of count_terms() outputs, in corpus order
+        :param documents   : the tokenized corpus, needed to update the index (optional)
+        :returns bm25      : InvertedIndexBM25 object
+        """
+        bm25 = cls.__new__(cls)
+        bm25.k1 = k1
+        bm25.b = b
+        bm25.epsilon = epsilon
+        bm25._build(term_counts, documents)
+        return bm25
+
+    def _build(self, term_counts, documents=None):
+        """Creates the term dictionary, the postings and the document statistics."""
+        # term -> (rows of the documents containing the term, term frequencies)
+        postings = {}
+        doc_len = []
+        for chunk_postings, chunk_doc_len in term_counts:
+            for word, (rows, freqs) in chunk_postings.items():
+                if word not in postings:
+                    postings[word] = ([], [])
+                postings[word][0].extend(rows)
+                postings[word][1].extend(freqs)
+            doc_len.extend(chunk_doc_len)
+
+        self.corpus_size = len(doc_len)
+        self.doc_len = np.array(doc_len, dtype=np.int64)
+        self.avgdl = sum(doc_len) / self.corpus_size
+        # terms keep their first-occurrence order, same as rank_bm25
+        self.terms = list(postings.keys())
+        self.vocabulary = {term: term_id for term_id, term in enumerate(self.terms)}
+        lengths = [len(rows) for rows, _ in postings.values()]
+        self.offsets = _offsets(lengths)
+        self.postings = np.array(
+            [row for rows, _ in postings.values() for row in rows], dtype=np.int32
+        )
+        self.frequencies = np.array(
+            [freq for _, freqs in postings.values() for freq in freqs], dtype=np.int32
+        )
+        self.idf = self._calc_idf(lengths)
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)
+        self._calc_upper_bounds()
+        # forward index (terms of every row), kept to update the index
+        self.documents = None if documents is None else list(documents)
+        self.pending_updates = 0
+        self._outdated_statistics = False
+        self._impacts = None
+        # stamp of the index contents, changes with every build or update
+        self.version = content_version(
+            self.k1,
+            self.b,
+            self.epsilon,
+            self.terms,
+            self.postings.tobytes(),
+            self.frequencies.tobytes(),
+            self.doc_len.tobytes(),
+        )
+
+    def _calc_idf(self, document_frequencies, term_ids=None):
+        """
+        Calculates the idf of every term. Terms with negative idf
+        get a floor of epsilon * average_idf.
+        The summation order is kept so that the values match rank_bm25 exactly.
+
+        :param term_ids : terms in first-occurrence order, terms left out get no idf
+                          (default is all the terms, in term id order)
+        """
+        if term_ids is None:
+            term_ids = range(len(document_frequencies))
+        idf = np.zeros(len(document_frequencies), dtype=np.float64)
+        idf_sum = 0
+        negative_idfs = []
+        for term_id in term_ids:
+            freq = document_frequencies[term_id]
+            term_idf = math.log(self.corpus_size - freq + 0.5) - math.log(freq + 0.5)
+            idf[term_id] = term_idf
+            idf_sum += term_idf
+            if term_idf < 0:
+                negative_idfs.append(term_id)
+        self.average_idf = idf_sum / len(term_ids)
+        idf[negative_idfs] = self.epsilon * self.average_idf
+        return idf
+
+    def _calc_upper_bounds(self):
+        """
+        Calculates the maximum score each term can contribute to a document,
+        for the whole posting list (max_scores) and for every block of
+        BLOCK_SIZE postings (block_max_scores). Used to skip documents
+        during top-k retrieval.
+        """
+        contributions = self.idf[
+            np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+        ] * (
+            self.frequencies
+            * (self.k1 + 1)
+            / (self.frequencies + self._norm[self.postings])
+        )
+        self.max_scores = np.maximum.reduceat(contributions, self.offsets[:-1])
+        # blocks never span two posting lists
+        self.block_offsets = _offsets(-(-np.diff(self.offsets) // BLOCK_SIZE))
+        block_starts = np.concatenate(
+            [
+                np.arange(self.offsets[t], self.offsets[t + 1], BLOCK_SIZE)
+                for t in range(len(self.terms))
+            ]
+        )
+        self.block_max_scores = np.maximum.reduceat(contributions, block_starts)
+
+    def _term_ids(self, query):
+        """Returns the ids of the query terms that exist in the index."""
+        return [self.vocabulary[q] for q in query if q in self.vocabulary]
+
+    def _score_candidates(self, query, allowed=None):
+        """
+        Scores only the documents that contain at least one query term.
+
+        :param query        : list of (preprocessed) query terms
+        :param allowed      : boolean mask of the rows that can be returned (optional)
+        :returns candidates : sorted rows of the matching documents
+        :returns scores     : BM25 score of each candidate
+        """
+        if self._outdated_statistics:
+            self._refresh_statistics()
+        term_ids = self._term_ids(query)
+        if not term_ids:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float64)
+        postings = [self._postings(t, allowed) for t in term_ids]
+        candidates = np.unique(np.concatenate([rows for rows, _ in postings]))
+        scores = np.zeros(len(candidates), dtype=np.float64)
+        for t, (rows, tf) in zip(term_ids, postings):
+            scores[np.searchsorted(candidates, rows)] += self.idf[t] * (
+                tf * (self.k1 + 1) / (tf + self._norm[rows])
+            )
+        return candidates, scores
+
+    def get_scores(self, query):
+        """
+        Returns the BM25 scores of all the documents for the query.
+        Same output as rank_bm25.BM25Okapi.get_scores()
+
+        :param query   : list of (preprocessed) query terms
+        :returns score : numpy array with the score of every row
+                         (deleted rows score 0 until the index is compacted)
+        """
+        score = np.zeros(len(self.doc_len))
+        candidates, scores = self._score_candidates(query)
+        score[candidates] = scores
+        return score
+
+    def get_top_n(self, query, n, allowed=None):
+        """
+        Returns the rows and scores of the n best matching documents.
+        Documents with the same score are returned later row first.
+
+        <!> Note: Only documents sharing at least one term with the query
+                  are returned so there can be less than n results.
+
+        :param query   : list of (preprocessed) query terms
+        :param n       : maximum number of results
+        :param allowed : boolean mask of the rows that can be returned, rows left
+                         out are dropped from the postings before scoring (optional)
+        :returns rows  : rows of the documents in the corpus
+        :returns scores: BM25 scores of the documents
+        """
+        candidates, scores = self._score_candidates(query, allowed)
+        order = np.lexsort((-candidates.astype(np.int64), -scores))[:n]
+        return candidates[order], scores[order]
+
+    def get_top_n_batch(self, queries, n, allowed=None):
+        """
+        Returns the top n rows and scores of many queries at once.
+
+        The queries are scored together as a sparse matrix product of their
+        term counts with the term-document impact matrix (see _impact_matrix()).
+        Contributions are added in query term order so the scores are
+        the same as the ones of get_top_n(), except that documents scoring
+        exactly 0 are left out.
+
+        :param queries  : list of (preprocessed) queries
+        :param n        : maximum number of results per query
+        :param allowed  : boolean mask of the rows that can be returned (optional)
+        :returns rows   : rows of the documents, the results of all the queries concatenated
+        :returns scores : BM25 scores of the documents
+        :returns offsets: results of query i are rows[offsets[i]:offsets[i + 1]]
+        """
+        if self._outdated_statistics:
+            self._refresh_statistics()
+        if self._impacts is None:
+            self._impacts = self._impact_matrix()
+        # look up every distinct term once for all the queries
+        vocabulary = {}
+        for query in queries:
+            for q in query:
+                if q not in vocabulary:
+                    vocabulary[q] = self.vocabulary.get(q)
+        term_ids = [
+            [vocabulary[q] for q in query if vocabulary[q] is not None]
+            for query in queries
+        ]
+        query_terms = scipy.sparse.csr_matrix(
+            (
+                np.ones(sum(len(ids) for ids in term_ids)),
+                np.array([t for ids in term_ids for t in ids], dtype=np.int64),
+                _offsets([len(ids) for ids in term_ids]),
+            ),
+            shape=(len(queries), self._impacts.shape[0]),
+        )
+        scores = query_terms @ self._impacts
+        top_rows, top_scores = [], []
+        for i in range(len(queries)):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            rows = scores.indices[start:end].astype(np.int64)
+            query_scores = scores.data[start:end]
+            if allowed is not None:
+                keep = allowed[rows]
+                rows, query_scores = rows[keep], query_scores[keep]
+            if len(rows) > n:
+                # keep the documents scoring at least the n-th best score (ties included)
+                threshold = np.partition(query_scores, len(rows) - n)[len(rows) - n]
+                keep = query_scores >= threshold
+                rows, query_scores = rows[keep], query_scores[keep]
+            order = np.lexsort((-rows, -query_scores))[:n]
+            top_rows.append(rows[order])
+            top_scores.append(query_scores[order])
+        offsets = _offsets([len(rows) for rows in top_rows])
+        if not top_rows:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float64), offsets
+        return (
+            np.concatenate(top_rows).astype(np.int32),
+            np.concatenate(top_scores),
+            offsets,
+        )
+
+    def _impact_matrix(self):
+        """
+        Returns the sparse (terms x rows) matrix of the score contribution
+        idf * tf * (k1 + 1) / (tf + norm) of every posting, including the updates
+        since the last build.
+        """
+        if self.pending_updates:
+            postings = [self._postings(t) for t in range(len(self.terms))]
+            lengths = [len(rows) for rows, _ in postings]
+            rows = np.concatenate([rows for rows, _ in postings])
+            tf = np.concatenate([tf for _, tf in postings])
+            offsets = _offsets(lengths)
+        else:
+            lengths = np.diff(self.offsets)
+            rows, tf, offsets = self.postings, self.frequencies, self.offsets
+        contributions = np.repeat(self.idf, lengths) * (
+            tf * (self.k1 + 1) / (tf + self._norm[rows])
+        )
+        return scipy.sparse.csr_matrix(
+            (contributions, rows, offsets), shape=(len(lengths), len(self.doc_len))
+        )
+
+    def get_top_n_pruned(self, query, n, allowed=None):
+        """
+        Returns the same rows and scores as get_top_n() but uses
+        dynamic pruning (MaxScore with block-max scores) to skip the documents
+        that can't make it into the top n.
+
+        Query terms are visited in decreasing order of their maximum score.
+        After each term the documents found so far are scored exactly and the
+        n-th best score becomes the threshold. Once the maximum scores of the
+        terms left can't add up to the threshold, the documents that only
+        appear in those terms are never looked at. Blocks of postings whose
+        block-max score can't reach the threshold are skipped as well.
+        Documents are only skipped when their bound is strictly lower than
+        the threshold so ties are kept and the result is exact.
+        Rows that aren't allowed are never candidates, the upper bounds
+        still hold so the threshold only comes from allowed documents.
+
+        <!> Note: The score upper bounds are only valid for the layout
+                  created by the last build, so an index with pending
+                  updates is scored exhaustively until it is compacted.
+
+        :param query   : list of (preprocessed) query terms
+        :param n       : maximum number of results
+        :param allowed : boolean mask of the rows that can be returned (optional)
+        :returns rows  : rows of the documents in the corpus
+        :returns scores: BM25 scores of the documents
+        """
+        if self.pending_updates:
+            return self.get_top_n(query, n, allowed)
+        term_ids = self._term_ids(query)
+        num_postings = sum(self.offsets[t + 1] - self.offsets[t] for t in term_ids)
+        if num_postings < MIN_POSTINGS_TO_PRUNE:
+            return self.get_top_n(query, n, allowed)
+        candidates = np.array([], dtype=np.int32)
+        scores = np.array([], dtype=np.float64)
+        upper_bounds = np.maximum(self.max_scores[term_ids], 0)
+        order = np.argsort(-upper_bounds, kind="stable")
+        # bounds_left[i] : max score a document can get from the i-th term (in order) onwards
+        bounds_left = np.append(np.cumsum(upper_bounds[order][::-1])[::-1], 0)
+        # slack so that float rounding in the bounds never prunes a tie
+        bounds_left = bounds_left * (1 + PRUNING_TOLERANCE) + PRUNING_TOLERANCE
+        threshold = -np.inf
+        for i, position in enumerate(order):
+            if bounds_left[i] < threshold:
+                # documents not seen yet can't reach the top n
+                break
+            new_rows = self._new_candidates(
+                term_ids[position], candidates, threshold - bounds_left[i + 1], allowed
+            )
+            if len(new_rows):
+                candidates = np.concatenate([candidates, new_rows])
+                scores = np.concatenate(
+                    [scores, self._exact_scores(term_ids, new_rows)]
+                )
+                if len(candidates) >= n:
+                    threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+        top = np.lexsort((-candidates.astype(np.int64), -scores))[:n]
+        return candidates[top], scores[top]
+
+    def _new_candidates(self, term_id, seen, min_block_score, allowed=None):
+        """
+        Returns the (allowed) rows of the postings of term_id that haven't been
+        scored yet, skipping the blocks whose block-max score is lower than min_block_score.
+        """
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        rows = self.postings[start:end]
+        block_max = self.block_max_scores[
+            self.block_offsets[term_id] : self.block_offsets[term_id + 1]
+        ]
+        if np.isfinite(min_block_score):
+            keep = np.repeat(block_max >= min_block_score, BLOCK_SIZE)[: len(rows)]
+            rows = rows[keep]
+        if allowed is not None:
+            rows = rows[allowed[rows]]
+        return rows[~np.isin(rows, seen)]
+
+    def _exact_scores(self, term_ids, rows):
+        """
+        Scores the rows over all the query terms by looking them up
+        in the sorted posting lists. Terms are added in query order
+        so that the scores are identical to _score_candidates().
+        """
+        scores = np.zeros(len(rows), dtype=np.float64)
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            postings = self.postings[start:end]
+            found = np.minimum(np.searchsorted(postings, rows), len(postings) - 1)
+            match = postings[found] == rows
+            tf = self.frequencies[start:end][found[match]]
+            scores[match] += self.idf[t] * (
+                tf * (self.k1 + 1) / (tf + self._norm[rows[match]])
+            )
+        return scores
+
+    def save(self, path, doc_ids=None):
+        """
+        Saves the index in the binary on-disk format under the path directory.
+
+        The format is a header.json (format version and BM25 parameters)
+        plus one .npy file per array (see INDEX_ARRAYS). Terms are saved
+        sorted by their utf-8 bytes so that a loaded index can find them
+        with a binary search instead of rebuilding a dictionary.
+        The new index is written next to the old one and then moved in place,
+        processes that have the old files mapped keep reading them.
+
+        :param path    : directory of the index
+        :param doc_ids : ids of the indexed documents, in corpus order (optional)
+        """
+        assert not self.pending_updates, "compact() the index before saving it"
+        terms = [term.encode("utf-8") for term in self._term_list()]
+        order = sorted(range(len(terms)), key=lambda term_id: terms[term_id])
+        lengths = np.diff(self.offsets)[order]
+        block_lengths = np.diff(self.block_offsets)[order]
+        arrays = {
+            "term_bytes": np.frombuffer(b"".join(terms[t] for t in order), np.uint8),
+            "term_offsets": _offsets([len(terms[t]) for t in order]),
+            "offsets": _offsets(lengths),
+            "postings": self.postings[_ranges(self.offsets, order)],
+            "frequencies": self.frequencies[_ranges(self.offsets, order)],
+            "doc_len": self.doc_len,
+            "norm": self._norm,
+            "idf": self.idf[order],
+            "max_scores": self.max_scores[order],
+            "block_offsets": _offsets(block_lengths),
+            "block_max_scores": self.block_max_scores[
+                _ranges(self.block_offsets, order)
+            ],
+            "doc_ids": _ids_array(doc_ids, self.corpus_size),
+        }
+        header = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "epsilon": self.epsilon,
+            "block_size": BLOCK_SIZE,
+            "corpus_size": self.corpus_size,
+            "avgdl": self.avgdl,
+            "average_idf": self.average_idf,
+            "version": self.version,
+        }
+        path = path.rstrip("/")
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp_path, "header.json"), "w") as f:
+            json.dump(header, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads an index saved with save().
+        With mmap=True the arrays are memory-mapped (read-only) so opening
+        the index doesn't depend on its size and processes loading the same
+        index share the pages.
+
+        :param path     : directory of the index
+        :param mmap     : memory-map the arrays instead of reading them (default is True)
+        :returns bm25   : InvertedIndexBM25 object
+        :raises IndexFormatError : when the index is missing or of another format version
+        """
+        try:
+            with open(os.path.join(path, "header.json")) as f:
+                header = json.load(f)
+        except (OSError, ValueError) as _e:
+            raise IndexFormatError(f"No index found under {path}") from _e
+        if header.get("format_version") != INDEX_FORMAT_VERSION:
+            raise IndexFormatError(
+                f"Index under {path} has format version {header.get('format_version')}, "
+                f"expected {INDEX_FORMAT_VERSION}. Please recreate the index."
+            )
+        if header["block_size"] != BLOCK_SIZE:
+            raise IndexFormatError(
+                f"Index under {path} uses blocks of {header['block_size']} postings, "
+                f"expected {BLOCK_SIZE}. Please recreate the index."
+            )
+        arrays = {
+            name: np.load(
+                os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None
+            )
+            for name in INDEX_ARRAYS
+        }
+        bm25 = cls.__new__(cls)
+        bm25.k1 = header["k1"]
+        bm25.b = header["b"]
+        bm25.epsilon = header["epsilon"]
+        bm25.corpus_size = header["corpus_size"]
+        bm25.avgdl = header["avgdl"]
+        bm25.average_idf = header["average_idf"]
+        bm25.vocabulary = MappedVocabulary(arrays["term_bytes"], arrays["term_offsets"])
+        bm25.offsets = arrays["offsets"]
+        bm25.postings = arrays["postings"]
+        bm25.frequencies = arrays["frequencies"]
+        bm25.doc_len = arrays["doc_len"]
+        bm25._norm = arrays["norm"]
+        bm25.idf = arrays["idf"]
+        bm25.max_scores = arrays["max_scores"]
+        bm25.block_offsets = arrays["block_offsets"]
+        bm25.block_max_scores = arrays["block_max_scores"]
+        bm25.doc_ids = arrays["doc_ids"]
+        bm25.documents = None
+        bm25.pending_updates = 0
+        bm25._outdated_statistics = False
+        bm25._impacts = None
+        # indexes saved before version stamps existed get one from their postings
+        bm25.version = header.get("version") or content_version(
+            header, bm25.postings.tobytes(), bm25.frequencies.tobytes()
+        )
+        return bm25
+
+    def add_document(self, document):
+        """
+        Adds a document as the last row of the index.
+
+        Only the postings of the document's terms are touched, the
+        statistics depending on the whole corpus (idf, average document length)
+        are recalculated with the next query.
+
+        :param document : list of (preprocessed) terms
+        :returns row    : row of the new document
+        """
+        self._start_updates()
+        row = len(self.doc_len)
+        self.doc_len = np.append(self.doc_len, len(document))
+        self._stale = np.append(self._stale, False)
+        self.documents.append(document)
+        self._insert(row, document)
+        self.corpus_size += 1
+        self._total_len += len(document)
+        self._end_update("add", row, document)
+        return row
+
+    def update_document(self, row, document):
+        """
+        Replaces the terms of the document in row, the document keeps its row.
+
+        :param row      : row of the document
+        :param document : list of (preprocessed) terms
+        """
+        self._start_updates()
+        self._remove(row)
+        self._total_len += len(document) - int(self.doc_len[row])
+        self.doc_len[row] = len(document)
+        self.documents[row] = document
+        self._insert(row, document)
+        self._end_update("update", row, document)
+
+    def delete_document(self, row):
+        """
+        Deletes the document in row. The row stays empty (and is never
+        returned) until the index is compacted.
+
+        :param row : row of the document
+        """
+        self._start_updates()
+        self._remove(row)
+        self.documents[row] = None
+        self.corpus_size -= 1
+        self._total_len -= int(self.doc_len[row])
+        self._end_update("delete", row)
+
+    def compact(self):
+        """
+        Rebuilds the index from the documents left, merging the postings of
+        the updates into the posting lists, dropping the deleted rows and
+        recalculating the score upper bounds used for pruning.
+
+        :returns rows : rows (before compaction) of the documents kept, in their new order
+        """
+        assert self.documents is not None, "the index has no forward index to compact"
+        rows = [row for row, document in enumerate(self.documents) if document is not None]
+        documents = [self.documents[row] for row in rows]
+        self._build([count_terms(documents)], documents)
+        return rows
+
+    def _start_updates(self):
+        """
+        Prepares the structures holding the updates since the last build:
+        document frequencies, first occurrence (row, position) of every term,
+        rows whose postings were replaced and postings of the updated rows.
+        """
+        assert self.documents is not None, "the index has no forward index to update"
+        if self.pending_updates:
+            return
+        self.doc_len = np.array(self.doc_len)
+        self._total_len = int(self.doc_len.sum())
+        self._df = np.diff(self.offsets).tolist()
+        self._stale = np.zeros(len(self.doc_len), dtype=bool)
+        # term id -> {row: term frequency}
+        self._delta = {}
+        self._first = [None] * len(self.terms)
+        for row, document in enumerate(self.documents):
+            for position, term in enumerate(dict.fromkeys(document)):
+                term_id = self.vocabulary[term]
+                if self._first[term_id] is None:
+                    self._first[term_id] = (row, position)
+
+    def _end_update(self, *change):
+        self.pending_updates += 1
+        self._outdated_statistics = True
+        self._impacts = None
+        self.version = content_version(self.version, *change)
+
+    def _insert(self, row, document):
+        """Adds the postings of the document in row."""
+        frequencies = {}
+        for word in document:
+            frequencies[word] = frequencies.get(word, 0) + 1
+        for position, (word, freq) in enumerate(frequencies.items()):
+            if word not in self.vocabulary:
+                self.vocabulary[word] = len(self.terms)
+                self.terms.append(word)
+                self._df.append(0)
+                self._first.append(None)
+            term_id = self.vocabulary[word]
+            self._delta.setdefault(term_id, {})[row] = freq
+            self._df[term_id] += 1
+            if self._first[term_id] is None or (row, position) < self._first[term_id]:
+                self._first[term_id] = (row, position)
+
+    def _remove(self, row):
+        """Removes the postings of the document in row."""
+        self._stale[row] = True
+        words = list(dict.fromkeys(self.documents[row]))
+        for word in words:
+            term_id = self.vocabulary[word]
+            self._df[term_id] -= 1
+            self._delta.get(term_id, {}).pop(row, None)
+        for word in words:
+            term_id = self.vocabulary[word]
+            if self._first[term_id][0] == row:
+                rows, _ = self._postings(term_id)
+                if len(rows):
+                    first_row = int(rows[0])
+                    position = list(dict.fromkeys(self.documents[first_row])).index(word)
+                    self._first[term_id] = (first_row, position)
+                else:
+                    self._first[term_id] = None
+
+    def _postings(self, term_id, allowed=None):
+        """
+        Returns the posting list of the term (rows sorted) and the term frequencies,
+        including the updates since the last build and only the allowed rows if given.
+        """
+        if term_id < len(self.offsets) - 1:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            rows, tf = self.postings[start:end], self.frequencies[start:end]
+        else:
+            rows, tf = self.postings[:0], self.frequencies[:0]
+        if allowed is not None:
+            keep = allowed[rows]
+            rows, tf = rows[keep], tf[keep]
+        if not self.pending_updates:
+            return rows, tf
+        keep = ~self._stale[rows]
+        rows, tf = rows[keep], tf[keep]
+        delta = self._delta.get(term_id)
+        if delta:
+            delta_rows = np.fromiter(delta.keys(), np.int32, len(delta))
+            delta_tf = np.fromiter(delta.values(), np.int32, len(delta))
+            if allowed is not None:
+                keep = allowed[delta_rows]
+                delta_rows, delta_tf = delta_rows[keep], delta_tf[keep]
+            rows = np.concatenate([rows, delta_rows])
+            tf = np.concatenate([tf, delta_tf])
+            order = np.argsort(rows, kind="stable")
+            rows, tf = rows[order], tf[order]
+        return rows, tf
+
+    def _refresh_statistics(self):
+        """
+        Recalculates the idf and the document length normalization after updates.
+        Terms are summed in first-occurrence order of the documents left and terms
+        no document contains anymore are left out, so the values are the same
+        as the ones of an index built from scratch.
+        """
+        first_occurrences = sorted(
+            (first, term_id)
+            for term_id, first in enumerate(self._first)
+            if first is not None
+        )
+        self.idf = self._calc_idf(self._df, [term_id for _, term_id in first_occurrences])
+        self.avgdl = self._total_len / self.corpus_size
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)
+        self._outdated_statistics = False
+
+    def _term_list(self):
+        """Returns the terms ordered by their term id."""
+        if hasattr(self, "terms"):
+            return self.terms
+        return list(self.vocabulary)
+
+
+def count_terms(corpus, first_row=0):
+    """
+    Term statistics of a (chunk of the) tokenized corpus.
+
+    :param corpus     : list of tokenized documents
+    :param first_row  : row of the first document in the whole corpus (default is 0)
+    :returns postings : dict of term -> (rows, term frequencies), terms in first-occurrence order
+    :returns doc_len  : list with the number of terms of every document
+    """
+    postings = {}
+    doc_len = []
+    for row, document in enumerate(corpus, start=first_row):
+        doc_len.append(len(document))
+        frequencies = {}
+        for word in document:
+            frequencies[word] = frequencies.get(word, 0) + 1
+        for word, freq in frequencies.items():
+            if word not in postings:
+                postings[word] = ([], [])
+            postings[word][0].append(row)
+            postings[word][1].append(freq)
+    return postings, doc_len
+
+
+def content_version(*contents):
+    """
+    Returns a version stamp (sha1 hex digest) of the index contents,
+    the same contents always get the same stamp.
+
+    :param contents : bytes or objects with a deterministic repr()
+    """
+    digest = hashlib.sha1()
+    for content in contents:
+        digest.update(content if type(content) == bytes else repr(content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MappedVocabulary:
+    """Read-only term dictionary on top of the sorted term bytes of an on-disk index"""
+
+    def __init__(self, term_bytes, term_offsets):
+        """
+        :param term_bytes   : utf-8 bytes of all the terms, sorted and concatenated
+        :param term_offsets : start of every term in term_bytes (+ the total length)
+        """
+        # plain array views of the mapped files are faster to slice than np.memmap
+        self.term_bytes = term_bytes.view(np.ndarray)
+        self.term_offsets = term_offsets.view(np.ndarray)
+
+    def _term_bytes(self, term_id):
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return self.term_bytes[start:end].tobytes()
+
+    def _find(self, term):
+        """Binary search for the term, returns its term id or None."""
+        encoded = term.encode("utf-8")
+        term_id = bisect.bisect_left(_TermsView(self), encoded)
+        if term_id < len(self) and self._term_bytes(term_id) == encoded:
+            return term_id
+        return None
+
+    def __len__(self):
+        return len(self.term_offsets) - 1
+
+    def __contains__(self, term):
+        return self._find(term) is not None
+
+    def __getitem__(self, term):
+        term_id = self._find(term)
+        if term_id is None:
+            raise KeyError(term)
+        return term_id
+
+    def get(self, term, default=None):
+        term_id = self._find(term)
+        return default if term_id is None else term_id
+
+    def __iter__(self):
+        for term_id in range(len(self)):
+            yield self._term_bytes(term_id).decode("utf-8")
+
+
+class _TermsView:
+    """Sequence of the term bytes of a MappedVocabulary, used for bisect."""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __getitem__(self, term_id):
+        return self.vocabulary._term_bytes(term_id)
+
+
+class IndexFormatError(Exception):
+    """Raised when an on-disk index is missing or can't be read by this version."""
+
+    pass
+
+
+def _offsets(lengths):
+    """Returns the offsets (starting with 0) of consecutive chunks with the given lengths."""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    return offsets
+
+
+def _ranges(offsets, order):
+    """Returns the positions of the chunks in offsets, concatenated in the given order."""
+    if len(order) == 0:
+        return np.array([], dtype=np.int64)
+    return np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in order])
+
+
+def _ids_array(doc_ids, corpus_size):
+    """Returns the document ids as an array that can be memory-mapped."""
+    if doc_ids is None:
+        return np.arange(corpus_size)
+    doc_ids = np.asarray(doc_ids)
+    if doc_ids.dtype == object:
+        doc_ids = doc_ids.astype(str)
+    return doc_ids
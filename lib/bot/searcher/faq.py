@@ -9,7 +9,13 @@ import pandas as pd
 class FAQSearchEngine(SearchEngine):
     """FAQ Search Engine"""
 
-    def __init__(self, ids="faq_id", index=["keywords", "question"]):
+    def __init__(
+        self,
+        ids="faq_id",
+        index=["keywords", "question"],
+        backend="max_score",
+        cache_size=1024,
+    ):
         """
         Creates the FAQ Search Engine.
 
@@ -18,12 +24,16 @@ class FAQSearchEngine(SearchEngine):
 
         :param ids    : id of the document we are indexing (default is faq_id)
         :param index  : Name of column(s) that will be indexed. (default is ["keywords", "question"])
+        :param backend : BM25 implementation used for scoring (default is max_score)
+        :param cache_size : maximum number of cached query results (default is 1024)
         :type index   : list
         """
-        super().__init__(index=index, ids=ids)
+        super().__init__(
+            index=index, ids=ids, backend=backend, cache_size=cache_size
+        )
         self.type = "FAQ Search Engine"
 
-    def _attach_qa_data(self, results, query):
+    def _attach_qa_data(self, results, query, rows):
         """
         Attach the columns needed to transform the results
         DataFrame into SQuAD like data.
@@ -39,10 +49,29 @@ class FAQSearchEngine(SearchEngine):
         results["query"] = query
         results["context"] = results["answer"]
 
+    def _create_document_store(self):
+        """No document store is needed since the "context" is the "answer" column of the corpus."""
+        pass
+
+    def _update_document_store(self, row, text):
+        """No document store to update, see _create_document_store()."""
+        pass
+
     def create_index(
-        self, corpus=pd.DataFrame, db=Database, table_name="faq_doc_term_matrix"
+        self,
+        corpus=pd.DataFrame,
+        db=Database,
+        table_name="faq_doc_term_matrix",
+        workers=1,
+        executor=None,
     ):
-        super().create_index(corpus=corpus, db=db, table_name=table_name)
+        super().create_index(
+            corpus=corpus,
+            db=db,
+            table_name=table_name,
+            workers=workers,
+            executor=executor,
+        )
 
     def load_index(
         self,
@@ -9,7 +9,13 @@ import pandas as pd
 class QuestionSearchEngine(SearchEngine):
     """Question Search Engine"""
 
-    def __init__(self, ids="question_id", index=["question"]):
+    def __init__(
+        self,
+        ids="question_id",
+        index=["question"],
+        backend="max_score",
+        cache_size=1024,
+    ):
         """
         Creates the Question Search Engine.
 
@@ -22,12 +28,16 @@ class QuestionSearchEngine(SearchEngine):
 
         :param ids    : id of the document we are indexing (default is question_id)
         :param index  : Name of column(s) that will be indexed. (default is ['question'])
+        :param backend : BM25 implementation used for scoring (default is max_score)
+        :param cache_size : maximum number of cached query results (default is 1024)
         :type index   : list
         """
-        super().__init__(index=index, ids=ids)
+        super().__init__(
+            index=index, ids=ids, backend=backend, cache_size=cache_size
+        )
         self.type = "Question Search Engine"
 
-    def _attach_qa_data(self, results, query):
+    def _attach_qa_data(self, results, query, rows):
         """
         Attach the columns needed to transform the results
         DataFrame into SQuAD like data.
@@ -42,10 +52,54 @@ class QuestionSearchEngine(SearchEngine):
         """
         results["query"] = query
 
+    def _create_document_store(self):
+        """No document store is needed since "context" already exists as a column of the corpus."""
+        pass
+
+    def _get_attributes(self, corpus):
+        """
+        Returns the filter attributes of the questions, they come from
+        where the question was asked:
+            'state'      : state of the GitHub issue
+            'created_at' : creation date of the GitHub issue or date of the email
+
+        :param corpus       : pandas DataFrame of the questions
+        :returns attributes : pandas DataFrame with the state and created_at columns
+        """
+        attributes = pd.DataFrame(index=corpus.index, columns=["state", "created_at"])
+        tables = [table[0] for table in self.db.get_tables()]
+        if "issues" in tables and "issue_id" in corpus.columns:
+            issues = self.db.get_dataframe("issues").set_index("issue_id")
+            issue_ids = pd.to_numeric(corpus["issue_id"], errors="coerce")
+            attributes["state"] = issue_ids.map(issues["state"])
+            attributes["created_at"] = issue_ids.map(issues["created_at"])
+        if "emails" in tables and "email_id" in corpus.columns:
+            emails = self.db.get_dataframe("emails").set_index("email_id")
+            email_ids = pd.to_numeric(corpus["email_id"], errors="coerce")
+            attributes["created_at"] = attributes["created_at"].fillna(
+                email_ids.map(emails["email_date"])
+            )
+        return attributes
+
+    def _update_document_store(self, row, text):
+        """No document store to update, see _create_document_store()."""
+        pass
+
     def create_index(
-        self, corpus=pd.DataFrame, db=Database, table_name="question_doc_term_matrix"
+        self,
+        corpus=pd.DataFrame,
+        db=Database,
+        table_name="question_doc_term_matrix",
+        workers=1,
+        executor=None,
     ):
-        super().create_index(corpus=corpus, db=db, table_name=table_name)
+        super().create_index(
+            corpus=corpus,
+            db=db,
+            table_name=table_name,
+            workers=workers,
+            executor=executor,
+        )
 
     def load_index(
         self,
@@ -0,0 +1,83 @@
+# general python
+import numpy as np
+
+
+class CandidateSelector:
+    """Prunes the retrieved documents before they are read by the AnswerDetector"""
+
+    def __init__(self, min_score_fraction=0.0, max_tokens=None, min_candidates=1):
+        """
+        The documents retrieved by a Search Engine are kept in their ranking order while:
+            - their bm25_score is at least min_score_fraction of the best bm25_score,
+              eg. with 0.5 documents scoring less than half of the top hit are dropped
+            - the tokens of their contexts fit in max_tokens
+        The first min_candidates documents are always kept.
+
+        <!> Note: tokens are estimated as the whitespace separated words of the
+                  contexts, the reader's subword tokens are usually a few more.
+
+        :param min_score_fraction : fraction of the best bm25_score a document needs (default is 0.0, no pruning)
+        :param max_tokens         : maximum number of context tokens read per request (default is None, no budget)
+        :param min_candidates     : number of top documents always kept (default is 1)
+        """
+        self.min_score_fraction = min_score_fraction
+        self.max_tokens = max_tokens
+        self.min_candidates = min_candidates
+
+    def select(self, results, max_tokens=None):
+        """
+        Returns the results that are read by the AnswerDetector.
+
+        :param results    : pandas DataFrame returned by the Search Engine's .search()
+        :param max_tokens : token budget of this request, the smallest of it and
+                            the selector's max_tokens is used (default is None)
+        :returns results  : the selected rows of the results, in the same order
+        """
+        if results.empty:
+            return results
+        keep = np.ones(len(results), dtype=bool)
+        if self.min_score_fraction and "bm25_score" in results.columns:
+            scores = results["bm25_score"].to_numpy(dtype=float)
+            keep &= scores >= self.min_score_fraction * scores.max()
+        budgets = [b for b in (self.max_tokens, max_tokens) if b is not None]
+        if budgets:
+            tokens = results["context"].map(count_tokens).to_numpy()
+            keep &= np.cumsum(np.where(keep, tokens, 0)) <= min(budgets)
+        keep[: self.min_candidates] = True
+        return results[keep]
+
+
+def select_within_budget(results, max_tokens):
+    """
+    Keeps the results of several Search Engines within one token budget.
+
+    Results of different engines are interleaved by their bm25_score relative
+    to the best score of their engine and kept while their tokens fit in the
+    budget, the best result overall is always kept.
+
+    :param results    : list of pandas DataFrames returned by the Search Engines
+    :param max_tokens : token budget of the request
+    :returns results  : list with the selected rows of each DataFrame
+    """
+    candidates = []
+    for i, frame in enumerate(results):
+        if frame.empty:
+            continue
+        scores = frame["bm25_score"].to_numpy(dtype=float)
+        best = scores.max() if scores.max() > 0 else 1.0
+        for row, (score, context) in enumerate(zip(scores, frame["context"])):
+            candidates.append((score / best, i, row, count_tokens(context)))
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    selected = [[] for _ in results]
+    used_tokens = 0
+    for n, (_, i, row, tokens) in enumerate(candidates):
+        if n > 0 and used_tokens + tokens > max_tokens:
+            break
+        used_tokens += tokens
+        selected[i].append(row)
+    return [frame.iloc[sorted(rows)] for frame, rows in zip(results, selected)]
+
+
+def count_tokens(context):
+    """Estimated number of tokens of a context."""
+    return len(str(context).split())
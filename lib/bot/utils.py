@@ -8,7 +8,9 @@ import json
 import pickle
 import string
 from argparse import ArgumentTypeError
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 import pytz
 
 # nltk text processing
@@ -229,6 +231,67 @@ def pre_process_text(
         return text
 
 
+class Analyzer:
+    """Text analyzer of the Search Engines"""
+
+    def __init__(self, cache_size=65536):
+        """
+        Produces the same words as
+            pre_process_text(
+                text,
+                lower_text=True,
+                remove_numbers=True,
+                numbers_replacement=" ",
+                remove_punctuation=True,
+                punctuation_replacement=" ",
+                remove_stop_words=True,
+                stem=True,
+                tokenize_text=True,
+            )
+        but loads the stopwords and the stemmer once and memoizes
+        the analysis of every whitespace separated chunk of text.
+
+        <!> Note: Once punctuation is replaced no sentence boundaries are left
+                  and every step of the pipeline only looks at one chunk at a time,
+                  so the text is split only once and each chunk is tokenized
+                  the first time it is seen.
+
+        :param cache_size : maximum number of memoized chunks (default is 65536)
+        """
+        self.stop_words = set(stopwords.words("english"))
+        self.stemmer = nltk.stem.porter.PorterStemmer()
+        self.translation = dict(
+            (ord(char), ord(" ")) for char in string.punctuation + string.digits
+        )
+        self._analyze_chunk = lru_cache(maxsize=cache_size)(self._analyze_chunk)
+
+    def analyze(self, text):
+        """
+        Returns the list of words of the text.
+
+        :param text     : String to analyze
+        :returns words  : list of all words in text after processing
+        """
+        words = []
+        for chunk in text.lower().translate(self.translation).split():
+            words.extend(self._analyze_chunk(chunk))
+        return words
+
+    def _analyze_chunk(self, chunk):
+        """Stopword removal and stemming of one chunk, same steps as pre_process_text()."""
+        words = []
+        for token in nltk.word_tokenize(chunk):
+            if token.lower() in self.stop_words:
+                continue
+            for word in nltk.word_tokenize(token):
+                words.extend(nltk.word_tokenize(self.stemmer.stem(word)))
+        return tuple(words)
+
+    def cache_info(self):
+        """Returns the hits, misses and size of the chunk memo."""
+        return self._analyze_chunk.cache_info()
+
+
 def remove_URL(text):
     """Removes URLs from the text"""
     return re.sub(config.URL_REGEX, "", text)
@@ -306,3 +369,18 @@ def decontract(phrase):
     phrase = re.sub(r"\'ve", " have", phrase)
     phrase = re.sub(r"\'m", " am", phrase)
     return phrase
+
+
+def answer_f1(prediction, reference):
+    """
+    SQuAD like token overlap F1 between a predicted and a reference answer,
+    on their lower cased tokens without punctuation.
+    """
+    prediction_tokens = re.sub(r"[^\w\s]", " ", str(prediction).lower()).split()
+    reference_tokens = re.sub(r"[^\w\s]", " ", str(reference).lower()).split()
+    common = sum((Counter(prediction_tokens) & Counter(reference_tokens)).values())
+    if common == 0:
+        return 0.0
+    precision = common / len(prediction_tokens)
+    recall = common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
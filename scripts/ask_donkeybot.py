@@ -9,6 +9,9 @@ from bot.searcher.base import SearchEngine
 from bot.searcher.question import QuestionSearchEngine
 from bot.searcher.faq import FAQSearchEngine
 from bot.answer.detector import AnswerDetector
+from bot.answer.cascade import CascadeAnswerDetector
+from bot.searcher.selector import CandidateSelector
+from bot.answer.contexts import load_context_store
 from bot.database.sqlite import Database
 from bot.utils import check_positive, str2bool
 from bot.config import MODELS_DIR
@@ -106,6 +109,39 @@ def main():
         default="answers",
         help="Name of the answers table. (default is 'answers')",
     )
+    optional.add_argument(
+        "-q",
+        "--quantize",
+        type=str2bool,
+        nargs="?",
+        const=True,
+        default=False,
+        help="Use the int8 quantized model when running on cpu. (default is False)",
+    )
+    optional.add_argument(
+        "--cascade_model",
+        default=None,
+        help="Larger BERT model the questions are escalated to when the answers of --model aren't confident enough. (default is None)",
+    )
+    optional.add_argument(
+        "--cascade_threshold",
+        type=float,
+        default=0.5,
+        help="Confidence of the best answer of --model under which the question is escalated to --cascade_model. (default is 0.5)",
+    )
+
+    optional.add_argument(
+        "--min_score_fraction",
+        type=float,
+        default=0.0,
+        help="Retrieved questions and docs scoring less than this fraction of the top hit's bm25_score aren't read. (default is 0.0)",
+    )
+    optional.add_argument(
+        "--latency_budget",
+        type=float,
+        default=None,
+        help="Seconds the AnswerDetector may spend reading the retrieved questions and docs. (default is None)",
+    )
 
     args = parser.parse_args()
     db_name = args.db_name
@@ -115,6 +151,8 @@ def main():
     num_answers_inf = int(args.num_answers_predicted_per_document)
 
     check_model_availability(model)
+    if args.cascade_model:
+        check_model_availability(args.cascade_model)
 
     # deprecation warning
     warnings.filterwarnings("ignore")
@@ -131,8 +169,24 @@ def main():
     print("Loading AnswerDetector...")
     gpu = 0 if torch.cuda.is_available() else -1
     answer_detector = AnswerDetector(
-        model=model, device=gpu, num_answers_to_predict=num_answers_inf
+        model=model,
+        device=gpu,
+        num_answers_to_predict=num_answers_inf,
+        quantize=args.quantize and gpu < 0,
+        context_store=load_context_store(db_name, model),
     )
+    if args.cascade_model:
+        answer_detector = CascadeAnswerDetector(
+            small_detector=answer_detector,
+            large_detector=AnswerDetector(
+                model=args.cascade_model,
+                device=gpu,
+                num_answers_to_predict=num_answers_inf,
+                quantize=args.quantize and gpu < 0,
+                context_store=load_context_store(db_name, args.cascade_model),
+            ),
+            confidence_threshold=args.cascade_threshold,
+        )
 
     # load search engines
     faq_se, docs_se, question_se = setup_search_engines(db=data_storage)
@@ -143,6 +197,8 @@ def main():
         question_engine=question_se,
         faq_engine=faq_se,
         docs_engine=docs_se,
+        question_selector=CandidateSelector(min_score_fraction=args.min_score_fraction),
+        docs_selector=CandidateSelector(min_score_fraction=args.min_score_fraction),
     )
 
     # Main Loop
@@ -155,16 +211,17 @@ def main():
             search_faq = int(input("search faqs (1/0): "))
             assert search_faq in (0,1)
             start_time = time.time()
-            answers = qa_interface.get_answers(query, top_k=top_k)
+            answers = qa_interface.get_answers(
+                query, top_k=top_k, latency_budget=args.latency_budget
+            )
             faq_answers = qa_interface.get_faq_answers(query, num_faqs=top_k)
             print(f"Total inference time: {round(time.time() - start_time, 2)} seconds")
             print_answers(answers)
             print_answers(faq_answers)
             if store_answers:
-                for answer in answers:
-                    data_storage.insert_answer(answer, table_name=f"{answers_table}")
-                for answer in faq_answers:
-                    data_storage.insert_answer(answer, table_name=f"{answers_table}")
+                data_storage.insert_answers(
+                    answers + faq_answers, table_name=f"{answers_table}"
+                )
     except KeyboardInterrupt:
         data_storage.close_connection()
         sys.exit("\nExiting...")
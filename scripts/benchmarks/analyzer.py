@@ -0,0 +1,74 @@
+# This script benchmarks the text analysis of the Search Engines.
+# It compares utils.pre_process_text() with the memoizing utils.Analyzer
+# on the documentation, questions and FAQ tables and reports tokens per second.
+
+# bot modules
+import bot.utils as utils
+from bot.database.sqlite import Database
+
+# general python
+import argparse
+import time
+
+
+def pre_process_text(text):
+    """The text pre-processing of the Search Engines before the Analyzer."""
+    return utils.pre_process_text(
+        text,
+        lower_text=True,
+        remove_numbers=True,
+        numbers_replacement=" ",
+        remove_punctuation=True,
+        punctuation_replacement=" ",
+        remove_stop_words=True,
+        stem=True,
+        tokenize_text=True,
+    )
+
+
+def tokens_per_second(method, texts):
+    """Returns the tokens per second and the output of the method for the texts."""
+    start = time.perf_counter()
+    outputs = [method(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    return sum(len(output) for output in outputs) / elapsed, outputs
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark utils.pre_process_text() vs utils.Analyzer in tokens per second."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Database name of our storage. (default is data_storage)",
+    )
+
+    args = parser.parse_args()
+    data_storage = Database(f"{args.db_name}.db")
+    corpora = {
+        "docs": data_storage.get_dataframe("docs")["body"].tolist(),
+        "questions": data_storage.get_dataframe("questions")["question"].tolist(),
+        "faq": data_storage.get_dataframe("faq")["question"].tolist(),
+    }
+    data_storage.close_connection()
+
+    print(
+        f"{'table':<10} {'texts':>7} {'pre_process_text (tok/s)':>25} {'Analyzer (tok/s)':>17} {'speedup':>8}"
+    )
+    for name, texts in corpora.items():
+        texts = [text for text in texts if text]
+        before, expected = tokens_per_second(pre_process_text, texts)
+        # a new Analyzer so that the memo starts empty
+        after, outputs = tokens_per_second(utils.Analyzer().analyze, texts)
+        assert outputs == expected
+        print(
+            f"{name:<10} {len(texts):>7} {before:>25.0f} {after:>17.0f} {after / before:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# This script benchmarks the CPU latency of the AnswerDetector.
+# It compares predicting with one pipeline call per document against the batched
+# predict path, where the features of all the documents are passed through the model together,
+# with every feature padded to max_seq_len or with dynamic (length bucketed) padding.
+# The padding efficiency (real tokens / padded tokens) is reported to tune max_seq_len and doc_stride.
+# Run it with --backend pytorch and --backend onnx to compare the latency and peak memory of the backends.
+# Past questions are used as the queries, their contexts are the documents retrieved
+# by the questions and documentation Search Engines (as in QAInterface.get_answers).
+
+# bot modules
+from bot.searcher.base import SearchEngine
+from bot.searcher.question import QuestionSearchEngine
+from bot.answer.detector import AnswerDetector
+from bot.database.sqlite import Database
+from bot.utils import check_positive
+
+# general python
+import numpy as np
+import argparse
+import resource
+import warnings
+import time
+
+
+def time_predict(detector, queries, documents):
+    """Returns the answers and the average latency (in ms) per query."""
+    answers = []
+    start = time.perf_counter()
+    for query, query_documents in zip(queries, documents):
+        for docs in query_documents:
+            answers.append(detector.predict(query, docs, top_k=100))
+    return answers, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def check_same_answers(answers, other_answers):
+    """Asserts that both paths predict the same answers with the same confidence."""
+    for answer_list, other_answer_list in zip(answers, other_answers):
+        assert [a.answer for a in answer_list] == [a.answer for a in other_answer_list]
+        assert [(a.start, a.end) for a in answer_list] == [
+            (a.start, a.end) for a in other_answer_list
+        ]
+        assert np.allclose(
+            [a.confidence for a in answer_list],
+            [a.confidence for a in other_answer_list],
+            rtol=1e-4,
+        )
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark per document vs batched predictions of the AnswerDetector on CPU."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "-m",
+        "--model",
+        default="distilbert-base-cased-distilled-squad",
+        help="BERT/DistilBERT model used to inference answers. (default is distilbert-base-cased-distilled-squad)",
+    )
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Name of database where indexes are stored. (default is data_storage)",
+    )
+    optional.add_argument(
+        "--num_queries",
+        type=check_positive,
+        default=10,
+        help="Number of queries. (default is 10)",
+    )
+    optional.add_argument(
+        "--num_docs",
+        type=check_positive,
+        default=10,
+        help="Number of questions and of documentation docs retrieved per query. (default is 10)",
+    )
+    optional.add_argument(
+        "--batch_sizes",
+        type=check_positive,
+        nargs="+",
+        default=[1, 8, 16, 32],
+        help="Batch sizes of the batched predictions. (default is 1 8 16 32)",
+    )
+    optional.add_argument(
+        "--max_seq_len",
+        type=check_positive,
+        default=256,
+        help="Maximum length of one input sequence. (default is 256)",
+    )
+    optional.add_argument(
+        "--doc_stride",
+        type=check_positive,
+        default=128,
+        help="Length of the split in the sliding window of long documents. (default is 128)",
+    )
+    optional.add_argument(
+        "--backend",
+        choices=["pytorch", "onnx"],
+        default="pytorch",
+        help="Backend running the model. (default is pytorch)",
+    )
+    optional.add_argument(
+        "--num_threads",
+        type=check_positive,
+        default=None,
+        help="Number of threads used by the onnx backend. (default is onnxruntime's default)",
+    )
+
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    data_storage = Database(f"{args.db_name}.db")
+    queries = data_storage.get_dataframe("questions")["question"].tolist()
+    queries = queries[: args.num_queries]
+
+    docs_se = SearchEngine()
+    docs_se.load_index(db=data_storage, table_name="rucio_doc_term_matrix")
+    question_se = QuestionSearchEngine()
+    question_se.load_index(db=data_storage, table_name="questions_doc_term_matrix")
+    documents = [
+        (question_se.search(query, args.num_docs), docs_se.search(query, args.num_docs))
+        for query in queries
+    ]
+    data_storage.close_connection()
+
+    detector = AnswerDetector(
+        model=args.model,
+        device=-1,
+        batch_size=None,
+        max_seq_len=args.max_seq_len,
+        doc_stride=args.doc_stride,
+        backend=args.backend,
+        num_threads=args.num_threads,
+    )
+    # warm up the model so that all paths are timed the same way
+    detector.predict(queries[0], documents[0][0])
+    answers, per_document = time_predict(detector, queries, documents)
+    print(f"{len(queries)} queries, {2 * args.num_docs} documents per query")
+    print(f"backend={args.backend}, max_seq_len={args.max_seq_len}, doc_stride={args.doc_stride}")
+    print(f"{'predict':<16} {'padding':<8} {'latency (ms)':>13} {'speedup':>8} {'padding efficiency':>19}")
+    print(f"{'per document':<16} {'fixed':<8} {per_document:>13.0f} {1:>7.1f}x")
+    for batch_size in args.batch_sizes:
+        for dynamic_padding in (False, True):
+            detector.batch_size = batch_size
+            detector.dynamic_padding = dynamic_padding
+            detector.real_tokens = detector.padded_tokens = 0
+            batched_answers, batched = time_predict(detector, queries, documents)
+            check_same_answers(answers, batched_answers)
+            name = f"batch_size={batch_size}"
+            padding = "dynamic" if dynamic_padding else "fixed"
+            efficiency = detector.padding_info()["padding_efficiency"]
+            print(
+                f"{name:<16} {padding:<8} {batched:>13.0f} {per_document / batched:>7.1f}x {efficiency:>19.2f}"
+            )
+    # kilobytes on linux
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak memory: {peak_memory:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
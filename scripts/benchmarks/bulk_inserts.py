@@ -0,0 +1,186 @@
+# This script benchmarks the bulk insert_* methods of the Database.
+# For every table it inserts the same synthetic objects one by one (one commit per row,
+# as the parsers and question detection scripts used to) and in a single transaction
+# with executemany(), and reports the rows inserted per second.
+# The tables are created in a separate benchmark db which is removed at the end.
+
+# bot modules
+from bot.database.sqlite import Database, INSERT_BATCH_SIZE
+from bot.parser.emails import Email
+from bot.parser.issues import Issue
+from bot.parser.comments import IssueComment
+from bot.parser.docs import RucioDoc
+from bot.question.emails import EmailQuestion
+from bot.answer.base import Answer
+from bot.faq.base import FAQ
+from bot.utils import check_positive
+import bot.config as config
+
+# general python
+import argparse
+import time
+import os
+
+BODY = (
+    "Rucio is a software framework that provides functionality to organize, manage, and access large volumes of scientific data. "
+    * 8
+)
+
+
+def create_objects(table, num_rows):
+    """Returns num_rows synthetic objects of the table."""
+    if table == "emails":
+        return [
+            Email(
+                i,
+                [f"<user{i}@cern.ch>"],
+                "<rucio-users@cern.ch>",
+                "Re: rule stuck",
+                BODY,
+                "2020-06-01 12:00:00+00:00",
+                0,
+                1,
+                0,
+                BODY,
+                f"conv_{i % 100}",
+            )
+            for i in range(num_rows)
+        ]
+    if table == "issues":
+        return [
+            Issue(
+                i,
+                "Rule stuck",
+                "closed",
+                "user",
+                "2020-06-01 12:00:00+00:00",
+                3,
+                BODY,
+                BODY,
+            )
+            for i in range(num_rows)
+        ]
+    if table == "issue_comments":
+        return [
+            IssueComment(i % 100, i, "user", "2020-06-01 12:00:00+00:00", BODY, BODY)
+            for i in range(num_rows)
+        ]
+    if table == "docs":
+        return [
+            RucioDoc(i, f"doc_{i}.md", "https://rucio.readthedocs.io", BODY, "general")
+            for i in range(num_rows)
+        ]
+    if table == "questions":
+        questions = []
+        for i in range(num_rows):
+            question = EmailQuestion("How do I upload files to an RSE?", 0, 32)
+            question.set_origin_id(i)
+            question.set_context(BODY)
+            questions.append(question)
+        return questions
+    if table == "answers":
+        return [
+            Answer(
+                "How do I upload files?",
+                "rucio upload",
+                "distilbert",
+                0,
+                12,
+                0.9,
+                BODY[:300],
+                0,
+                300,
+                metadata={"question_id": str(i), "context": BODY},
+            )
+            for i in range(num_rows)
+        ]
+    return [
+        FAQ("How do I upload files?", BODY[:200], "user", "upload, rse")
+        for i in range(num_rows)
+    ]
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark inserting rows one by one vs the bulk insert_* methods of the Database."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "--num_rows",
+        type=check_positive,
+        default=2000,
+        help="Number of rows inserted in every table. (default is 2000)",
+    )
+    optional.add_argument(
+        "--batch_size",
+        type=check_positive,
+        default=INSERT_BATCH_SIZE,
+        help=f"Rows per executemany() of the bulk inserts. (default is {INSERT_BATCH_SIZE})",
+    )
+    args = parser.parse_args()
+
+    db_name = "bulk_inserts_benchmark"
+    data_storage = Database(f"{db_name}.db")
+    # table -> (create table, insert one, insert many)
+    tables = {
+        "emails": (
+            data_storage.create_emails_table,
+            data_storage.insert_email,
+            data_storage.insert_emails,
+        ),
+        "issues": (
+            data_storage.create_issues_table,
+            data_storage.insert_issue,
+            data_storage.insert_issues,
+        ),
+        "issue_comments": (
+            data_storage.create_issue_comments_table,
+            data_storage.insert_issue_comment,
+            data_storage.insert_issue_comments,
+        ),
+        "docs": (
+            data_storage.create_docs_table,
+            data_storage.insert_doc,
+            data_storage.insert_docs,
+        ),
+        "questions": (
+            data_storage.create_question_table,
+            data_storage.insert_question,
+            data_storage.insert_questions,
+        ),
+        "answers": (
+            data_storage.create_answers_table,
+            data_storage.insert_answer,
+            data_storage.insert_answers,
+        ),
+        "faq": (
+            data_storage.create_faq_table,
+            data_storage.insert_faq,
+            data_storage.insert_faqs,
+        ),
+    }
+    print(f"{args.num_rows} rows per table, batch_size={args.batch_size}")
+    print(
+        f"{'table':<15} {'one by one (rows/s)':>20} {'bulk (rows/s)':>14} {'speedup':>8}"
+    )
+    for table, (create_table, insert_one, insert_many) in tables.items():
+        objects = create_objects(table, args.num_rows)
+        create_table(table_name=table)
+        start = time.perf_counter()
+        for obj in objects:
+            insert_one(obj, table_name=table)
+        one_by_one = len(objects) / (time.perf_counter() - start)
+        create_table(table_name=table)
+        start = time.perf_counter()
+        insert_many(objects, table_name=table, batch_size=args.batch_size)
+        bulk = len(objects) / (time.perf_counter() - start)
+        print(
+            f"{table:<15} {one_by_one:>20.0f} {bulk:>14.0f} {bulk / one_by_one:>7.0f}x"
+        )
+    data_storage.close_connection()
+    os.remove(config.DATA_DIR + f"{db_name}.db")
+
+
+if __name__ == "__main__":
+    main()
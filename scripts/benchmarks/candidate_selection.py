@@ -0,0 +1,116 @@
+# This script benchmarks the adaptive pruning of the retrieved candidates before the reader.
+# Past questions are used as the queries, as in QAInterface.get_answers the AnswerDetector
+# reads the retrieved questions and documentation, either all of them or only the
+# candidates scoring at least --fractions of the top hit's bm25_score.
+# The reader time, the candidates read and the share of top answers that are the same
+# as without pruning are reported, to pick the fraction of each engine.
+
+# bot modules
+from bot.brain import QAInterface
+from bot.searcher.base import SearchEngine
+from bot.searcher.question import QuestionSearchEngine
+from bot.searcher.faq import FAQSearchEngine
+from bot.searcher.selector import CandidateSelector
+from bot.answer.detector import AnswerDetector
+from bot.database.sqlite import Database
+from bot.utils import check_positive
+
+# general python
+import argparse
+import warnings
+
+
+def top_answers(qa_interface, queries, num_docs):
+    """Returns the top answer (text) of each query."""
+    answers = []
+    for query in queries:
+        predicted = qa_interface.get_answers(
+            query, top_k=1, num_questions=num_docs, num_docs=num_docs
+        )
+        answers.append(predicted[0].answer if predicted else "")
+    return answers
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark the pruning of the retrieved candidates before the AnswerDetector."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "-m",
+        "--model",
+        default="distilbert-base-cased-distilled-squad",
+        help="BERT/DistilBERT model used to inference answers. (default is distilbert-base-cased-distilled-squad)",
+    )
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Name of database where indexes are stored. (default is data_storage)",
+    )
+    optional.add_argument(
+        "--num_queries",
+        type=check_positive,
+        default=10,
+        help="Number of queries. (default is 10)",
+    )
+    optional.add_argument(
+        "--num_docs",
+        type=check_positive,
+        default=10,
+        help="Number of questions and of documentation docs retrieved per query. (default is 10)",
+    )
+    optional.add_argument(
+        "--fractions",
+        type=float,
+        nargs="+",
+        default=[0.3, 0.5, 0.7],
+        help="Fractions of the top hit's bm25_score the candidates need. (default is 0.3 0.5 0.7)",
+    )
+
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    data_storage = Database(f"{args.db_name}.db")
+    queries = data_storage.get_dataframe("questions")["question"].tolist()
+    queries = queries[: args.num_queries]
+    docs_se = SearchEngine()
+    docs_se.load_index(db=data_storage, table_name="rucio_doc_term_matrix")
+    question_se = QuestionSearchEngine()
+    question_se.load_index(db=data_storage, table_name="questions_doc_term_matrix")
+    faq_se = FAQSearchEngine()
+    faq_se.load_index(db=data_storage, table_name="faq_doc_term_matrix")
+    data_storage.close_connection()
+    detector = AnswerDetector(model=args.model, device=-1)
+    # warm up the model so that all fractions are timed the same way
+    detector.predict(queries[0], question_se.search(queries[0], 1))
+
+    print(f"{len(queries)} queries, {2 * args.num_docs} documents retrieved per query")
+    print(
+        f"{'fraction':<9} {'read':>6} {'tokens read':>12} {'reader (ms)':>12} {'saved (ms)':>11} {'same top answer':>16}"
+    )
+    answers = None
+    for fraction in [0.0] + args.fractions:
+        qa_interface = QAInterface(
+            detector=detector,
+            question_engine=question_se,
+            faq_engine=faq_se,
+            docs_engine=docs_se,
+            question_selector=CandidateSelector(min_score_fraction=fraction),
+            docs_selector=CandidateSelector(min_score_fraction=fraction),
+        )
+        pruned_answers = top_answers(qa_interface, queries, args.num_docs)
+        answers = answers or pruned_answers
+        same = sum(a == b for a, b in zip(answers, pruned_answers)) / len(queries)
+        info = qa_interface.selection_info()
+        read = info["selected"] / info["candidates"]
+        tokens = info["selected_tokens"] / info["candidate_tokens"]
+        reader = info["reader_time"] / len(queries) * 1000
+        saved = info["saved_time"] / len(queries) * 1000
+        print(
+            f"{fraction:<9} {read:>6.2f} {tokens:>12.2f} {reader:>12.0f} {saved:>11.0f} {same:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# This script benchmarks the connections of concurrent Slack handlers to the db.
+# Every handler thread stores answers and reads answers back by id, either opening
+# a new Database connection for every call (as the Donkeybot wrapper used to) or with
+# the thread-local WAL connections of a ConnectionManager, and reports the requests
+# per second and the latency of the reads.
+# The answers table is created in a separate benchmark db which is removed at the end.
+
+# bot modules
+from bot.database.sqlite import Database
+from bot.database.connections import ConnectionManager
+from bot.answer.base import Answer
+from bot.utils import check_positive
+import bot.config as config
+
+# general python
+import threading
+import argparse
+import time
+import os
+
+
+def create_answers(num_answers):
+    return [
+        Answer(
+            "How do I upload files?",
+            "rucio upload",
+            "distilbert",
+            0,
+            12,
+            0.9,
+            "rucio upload " * 20,
+            0,
+            260,
+            metadata={"doc_id": i, "context": "rucio upload " * 50},
+        )
+        for i in range(num_answers)
+    ]
+
+
+def run(get_database, release_database, num_threads, num_requests):
+    """Returns the requests per second and the mean and max read latency (ms)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def handler():
+        answers = create_answers(num_requests)
+        thread_latencies = []
+        for answer in answers:
+            data_storage = get_database()
+            data_storage.insert_answers([answer])
+            release_database(data_storage)
+            start = time.perf_counter()
+            data_storage = get_database()
+            data_storage.get_answer(answer.id)
+            release_database(data_storage)
+            thread_latencies.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(thread_latencies)
+
+    threads = [threading.Thread(target=handler) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return (
+        num_threads * num_requests / elapsed,
+        1000 * sum(latencies) / len(latencies),
+        1000 * max(latencies),
+    )
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark a new Database connection per call vs the thread-local connections of a ConnectionManager."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "--num_threads",
+        type=check_positive,
+        default=8,
+        help="Number of concurrent handler threads. (default is 8)",
+    )
+    optional.add_argument(
+        "--num_requests",
+        type=check_positive,
+        default=200,
+        help="Answers stored and read by every thread. (default is 200)",
+    )
+    args = parser.parse_args()
+
+    db_name = "connections_benchmark.db"
+    data_storage = Database(db_name)
+    data_storage.create_answers_table()
+    data_storage.close_connection()
+    print(f"{args.num_threads} threads, {args.num_requests} requests per thread")
+    print(
+        f"{'connections':<20} {'requests/s':>10} {'read mean (ms)':>15} {'read max (ms)':>14}"
+    )
+
+    results = run(
+        lambda: Database(db_name),
+        lambda data_storage: data_storage.close_connection(),
+        args.num_threads,
+        args.num_requests,
+    )
+    print(
+        f"{'new per call':<20} {results[0]:>10.0f} {results[1]:>15.2f} {results[2]:>14.2f}"
+    )
+
+    connections = ConnectionManager(db_name)
+    results = run(
+        connections.database,
+        lambda data_storage: None,
+        args.num_threads,
+        args.num_requests,
+    )
+    print(
+        f"{'ConnectionManager':<20} {results[0]:>10.0f} {results[1]:>15.2f} {results[2]:>14.2f}"
+    )
+    connections.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(config.DATA_DIR + db_name + suffix):
+            os.remove(config.DATA_DIR + db_name + suffix)
+
+
+if __name__ == "__main__":
+    main()
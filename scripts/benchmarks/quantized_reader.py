@@ -0,0 +1,106 @@
+# This script compares the accuracy and CPU latency of the fp32 and the dynamically
+# quantized (int8) versions of a QA model.
+# The FAQ are used as held-out questions: each FAQ question is answered by Donkeybot
+# from the retrieved questions and documentation (as in QAInterface.get_answers) and
+# the predicted answer is compared with the FAQ answer written by the Rucio experts.
+# The answers of the int8 model are also compared with the answers of the fp32 model.
+
+# bot modules
+from bot.brain import QAInterface
+from bot.searcher.base import SearchEngine
+from bot.searcher.question import QuestionSearchEngine
+from bot.searcher.faq import FAQSearchEngine
+from bot.answer.detector import AnswerDetector
+from bot.database.sqlite import Database
+from bot.utils import check_positive, answer_f1
+
+# general python
+import argparse
+import warnings
+import time
+
+
+def answer_faq(qa_interface, faq, num_docs):
+    """Returns the top answer (text) for each FAQ question and the average latency (in ms)."""
+    answers = []
+    start = time.perf_counter()
+    for question in faq["question"]:
+        predicted = qa_interface.get_answers(
+            question, top_k=1, num_questions=num_docs, num_docs=num_docs
+        )
+        answers.append(predicted[0].answer if predicted else "")
+    return answers, (time.perf_counter() - start) / len(faq) * 1000
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Compare accuracy and latency of the fp32 and int8 quantized QA model on the FAQ."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "-m",
+        "--model",
+        default="distilbert-base-cased-distilled-squad",
+        help="BERT/DistilBERT model used to inference answers. (default is distilbert-base-cased-distilled-squad)",
+    )
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Name of database where the FAQ and indexes are stored. (default is data_storage)",
+    )
+    optional.add_argument(
+        "--num_faq",
+        type=check_positive,
+        default=100,
+        help="Maximum number of FAQ questions asked. (default is 100)",
+    )
+    optional.add_argument(
+        "--num_docs",
+        type=check_positive,
+        default=10,
+        help="Number of questions and of documentation docs retrieved per question. (default is 10)",
+    )
+
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    data_storage = Database(f"{args.db_name}.db")
+    faq = data_storage.get_dataframe("faq").head(args.num_faq)
+    docs_se = SearchEngine()
+    docs_se.load_index(db=data_storage, table_name="rucio_doc_term_matrix")
+    question_se = QuestionSearchEngine()
+    question_se.load_index(db=data_storage, table_name="questions_doc_term_matrix")
+    faq_se = FAQSearchEngine()
+    faq_se.load_index(db=data_storage, table_name="faq_doc_term_matrix")
+    data_storage.close_connection()
+
+    results = {}
+    for name, quantize in (("fp32", False), ("int8", True)):
+        qa_interface = QAInterface(
+            detector=AnswerDetector(model=args.model, device=-1, quantize=quantize),
+            question_engine=question_se,
+            faq_engine=faq_se,
+            docs_engine=docs_se,
+        )
+        # warm up the model
+        answer_faq(qa_interface, faq.head(1), args.num_docs)
+        results[name] = answer_faq(qa_interface, faq, args.num_docs)
+
+    fp32_answers = results["fp32"][0]
+    print(f"{args.model}, {len(faq)} FAQ questions, {2 * args.num_docs} documents per question")
+    print(
+        f"{'model':<6} {'latency (ms)':>13} {'speedup':>8} {'F1 vs FAQ':>10} {'EM vs fp32':>11} {'F1 vs fp32':>11}"
+    )
+    for name, (answers, latency) in results.items():
+        faq_f1 = sum(map(answer_f1, answers, faq["answer"])) / len(faq)
+        fp32_em = sum(a == b for a, b in zip(answers, fp32_answers)) / len(faq)
+        fp32_f1 = sum(map(answer_f1, answers, fp32_answers)) / len(faq)
+        speedup = results["fp32"][1] / latency
+        print(
+            f"{name:<6} {latency:>13.0f} {speedup:>7.1f}x {faq_f1:>10.3f} {fp32_em:>11.3f} {fp32_f1:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
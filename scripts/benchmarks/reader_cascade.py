@@ -0,0 +1,142 @@
+# This script compares the accuracy and CPU latency of the small (DistilBERT) reader,
+# the large (BERT large) reader and their cascade, where only the questions the small
+# reader isn't confident about are escalated to the large reader.
+# The FAQ are used as held-out questions: each FAQ question is answered by Donkeybot
+# from the retrieved questions and documentation (as in QAInterface.get_answers) and
+# the predicted answer is compared with the FAQ answer written by the Rucio experts.
+# Run it with a few --thresholds to pick the confidence threshold of the cascade.
+
+# bot modules
+from bot.brain import QAInterface
+from bot.searcher.base import SearchEngine
+from bot.searcher.question import QuestionSearchEngine
+from bot.searcher.faq import FAQSearchEngine
+from bot.answer.detector import AnswerDetector
+from bot.answer.cascade import CascadeAnswerDetector
+from bot.database.sqlite import Database
+from bot.utils import check_positive, answer_f1
+
+# general python
+import argparse
+import warnings
+import time
+
+
+def answer_faq(qa_interface, faq, num_docs):
+    """Returns the top answer (text) for each FAQ question and the average latency (in ms)."""
+    answers = []
+    start = time.perf_counter()
+    for question in faq["question"]:
+        predicted = qa_interface.get_answers(
+            question, top_k=1, num_questions=num_docs, num_docs=num_docs
+        )
+        answers.append(predicted[0].answer if predicted else "")
+    return answers, (time.perf_counter() - start) / len(faq) * 1000
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Compare accuracy and latency of the small, large and cascaded readers on the FAQ."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "--small_model",
+        default="distilbert-base-cased-distilled-squad",
+        help="Model answering all the questions. (default is distilbert-base-cased-distilled-squad)",
+    )
+    optional.add_argument(
+        "--large_model",
+        default="bert-large-cased-whole-word-masking-finetuned-squad",
+        help="Model the questions are escalated to. (default is bert-large-cased-whole-word-masking-finetuned-squad)",
+    )
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Name of database where the FAQ and indexes are stored. (default is data_storage)",
+    )
+    optional.add_argument(
+        "--num_faq",
+        type=check_positive,
+        default=100,
+        help="Maximum number of FAQ questions asked. (default is 100)",
+    )
+    optional.add_argument(
+        "--num_docs",
+        type=check_positive,
+        default=10,
+        help="Number of questions and of documentation docs retrieved per question. (default is 10)",
+    )
+    optional.add_argument(
+        "--num_escalated_documents",
+        type=check_positive,
+        default=3,
+        help="Number of documents the large model predicts from. (default is 3)",
+    )
+    optional.add_argument(
+        "--thresholds",
+        type=float,
+        nargs="+",
+        default=[0.3, 0.5, 0.7],
+        help="Confidence thresholds of the cascade. (default is 0.3 0.5 0.7)",
+    )
+
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    data_storage = Database(f"{args.db_name}.db")
+    faq = data_storage.get_dataframe("faq").head(args.num_faq)
+    docs_se = SearchEngine()
+    docs_se.load_index(db=data_storage, table_name="rucio_doc_term_matrix")
+    question_se = QuestionSearchEngine()
+    question_se.load_index(db=data_storage, table_name="questions_doc_term_matrix")
+    faq_se = FAQSearchEngine()
+    faq_se.load_index(db=data_storage, table_name="faq_doc_term_matrix")
+    data_storage.close_connection()
+
+    small_detector = AnswerDetector(model=args.small_model, device=-1)
+    large_detector = AnswerDetector(model=args.large_model, device=-1)
+    detectors = {"small": small_detector, "large": large_detector}
+    for threshold in args.thresholds:
+        detectors[f"cascade@{threshold}"] = CascadeAnswerDetector(
+            small_detector=small_detector,
+            large_detector=large_detector,
+            confidence_threshold=threshold,
+            num_escalated_documents=args.num_escalated_documents,
+        )
+
+    print(f"{len(faq)} FAQ questions, {2 * args.num_docs} documents per question")
+    print(f"small={args.small_model}, large={args.large_model}")
+    print(
+        f"{'reader':<14} {'latency (ms)':>13} {'F1 vs FAQ':>10} {'escalated':>10} {'small (ms)':>11} {'large (ms)':>11}"
+    )
+    for name, detector in detectors.items():
+        qa_interface = QAInterface(
+            detector=detector,
+            question_engine=question_se,
+            faq_engine=faq_se,
+            docs_engine=docs_se,
+        )
+        # warm up the models
+        answer_faq(qa_interface, faq.head(1), args.num_docs)
+        if isinstance(detector, CascadeAnswerDetector):
+            detector.num_questions = detector.num_escalations = 0
+            detector.small_latency = detector.large_latency = 0.0
+        answers, latency = answer_faq(qa_interface, faq, args.num_docs)
+        f1 = sum(map(answer_f1, answers, faq["answer"])) / len(faq)
+        if isinstance(detector, CascadeAnswerDetector):
+            info = detector.cascade_info()
+            escalated = f"{info['escalation_rate']:.2f}"
+            small = f"{info['small_latency'] * 1000:.0f}"
+            large = (
+                f"{info['large_latency'] * 1000:.0f}" if info["large_latency"] is not None else "-"
+            )
+        else:
+            escalated = small = large = "-"
+        print(
+            f"{name:<14} {latency:>13.0f} {f1:>10.3f} {escalated:>10} {small:>11} {large:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# This script benchmarks the batch search of the Search Engines.
+# It compares the throughput of a loop over .search() with .search_batch()
+# on the documentation, questions and FAQ indexes.
+# Past questions and FAQ are used as the queries, repeated up to the number of queries asked.
+
+# bot modules
+from bot.searcher.base import SearchEngine
+from bot.searcher.question import QuestionSearchEngine
+from bot.searcher.faq import FAQSearchEngine
+from bot.database.sqlite import Database
+from bot.utils import check_positive
+
+# general python
+import argparse
+import time
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark a loop over search() vs search_batch() for the Search Engines."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Name of database where indexes are stored. (default is data_storage)",
+    )
+    optional.add_argument(
+        "-n",
+        "--top_n",
+        type=check_positive,
+        default=10,
+        help="Number of documents retrieved per query. (default is 10)",
+    )
+    optional.add_argument(
+        "--num_queries",
+        type=check_positive,
+        default=2000,
+        help="Number of queries. (default is 2000)",
+    )
+
+    args = parser.parse_args()
+    data_storage = Database(f"{args.db_name}.db")
+    queries = data_storage.get_dataframe("questions")["question"].tolist()
+    queries += data_storage.get_dataframe("faq")["question"].tolist()
+    queries = (queries * (args.num_queries // len(queries) + 1))[: args.num_queries]
+
+    engines = {
+        "docs": (SearchEngine(), "rucio_doc_term_matrix"),
+        "questions": (QuestionSearchEngine(), "questions_doc_term_matrix"),
+        "faq": (FAQSearchEngine(), "faq_doc_term_matrix"),
+    }
+    print(f"{len(queries)} queries, top_n={args.top_n}")
+    print(f"{'index':<10} {'search (q/s)':>13} {'search_batch (q/s)':>19} {'speedup':>8}")
+    for name, (engine, table_name) in engines.items():
+        engine.load_index(db=data_storage, table_name=table_name)
+        # warm up the analyzer so both methods find the same memoized terms
+        engine.search_batch(queries, args.top_n)
+        start = time.perf_counter()
+        for query in queries:
+            engine.search(query, args.top_n)
+        loop = len(queries) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        engine.search_batch(queries, args.top_n)
+        batch = len(queries) / (time.perf_counter() - start)
+        print(f"{name:<10} {loop:>13.0f} {batch:>19.0f} {batch / loop:>7.1f}x")
+    data_storage.close_connection()
+
+
+if __name__ == "__main__":
+    main()
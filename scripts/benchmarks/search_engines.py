@@ -0,0 +1,104 @@
+# This script benchmarks the top-n retrieval of the Search Engines.
+# It compares the exhaustive inverted index scoring with the dynamic pruning (MaxScore)
+# retrieval on the documentation, questions and FAQ indexes at 1x, 10x and 100x their size.
+# Larger corpora are simulated by replicating the indexed documents.
+
+# bot modules
+from bot.searcher.base import SearchEngine
+from bot.searcher.bm25 import InvertedIndexBM25
+from bot.database.sqlite import Database
+from bot.utils import check_positive
+
+# general python
+import numpy as np
+import argparse
+import time
+
+
+def time_queries(method, queries, top_n):
+    """Returns the average time (in ms) per query of the retrieval method."""
+    start = time.perf_counter()
+    for query in queries:
+        method(query, top_n)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def check_same_results(bm25, queries, top_n):
+    """Asserts that pruning returns exactly the same top_n as exhaustive scoring."""
+    for query in queries:
+        rows, scores = bm25.get_top_n(query, top_n)
+        pruned_rows, pruned_scores = bm25.get_top_n_pruned(query, top_n)
+        assert np.array_equal(rows, pruned_rows)
+        assert np.array_equal(scores, pruned_scores)
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark exhaustive vs dynamic pruning top-n retrieval for the Search Engines."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Name of database where indexes are stored. (default is data_storage)",
+    )
+    optional.add_argument(
+        "-n",
+        "--top_n",
+        type=check_positive,
+        default=10,
+        help="Number of documents retrieved per query. (default is 10)",
+    )
+    optional.add_argument(
+        "--num_queries",
+        type=check_positive,
+        default=500,
+        help="Maximum number of queries used. (default is 500)",
+    )
+    optional.add_argument(
+        "--scales",
+        type=check_positive,
+        nargs="+",
+        default=[1, 10, 100],
+        help="Corpus size multipliers. (default is 1 10 100)",
+    )
+
+    args = parser.parse_args()
+    data_storage = Database(f"{args.db_name}.db")
+
+    tables = {
+        "docs": "rucio_doc_term_matrix",
+        "questions": "questions_doc_term_matrix",
+        "faq": "faq_doc_term_matrix",
+    }
+    terms = {}
+    for name, table_name in tables.items():
+        index = data_storage.get_dataframe(table_name)
+        terms[name] = index.terms.apply(lambda x: x.split(", ") if x else []).tolist()
+
+    # past questions and FAQ are used as the user queries
+    queries = data_storage.get_dataframe("questions")["question"].tolist()
+    queries += data_storage.get_dataframe("faq")["question"].tolist()
+    queries = [SearchEngine().preprocess(query) for query in queries]
+    queries = [query for query in queries if query][: args.num_queries]
+    data_storage.close_connection()
+
+    print(f"{len(queries)} queries, top_n={args.top_n}")
+    print(
+        f"{'index':<10} {'scale':>6} {'documents':>10} {'exhaustive (ms)':>16} {'pruned (ms)':>12} {'speedup':>8}"
+    )
+    for name in tables:
+        for scale in args.scales:
+            bm25 = InvertedIndexBM25(terms[name] * scale)
+            check_same_results(bm25, queries, args.top_n)
+            exhaustive = time_queries(bm25.get_top_n, queries, args.top_n)
+            pruned = time_queries(bm25.get_top_n_pruned, queries, args.top_n)
+            print(
+                f"{name:<10} {scale:>5}x {bm25.corpus_size:>10} {exhaustive:>16.3f} {pruned:>12.3f} {exhaustive / pruned:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
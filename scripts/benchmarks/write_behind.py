@@ -0,0 +1,151 @@
+# This script benchmarks the latency the Slack handlers see when storing answers and labels.
+# Every handler thread stores the answers of its requests and labels them, either writing
+# them to the db before returning (as the Donkeybot wrapper used to) or queueing them on
+# a BackgroundWriter, waiting request_interval seconds between requests, and reports the
+# mean and p99 latency of the calls, the time until everything is in the db and the
+# writer's metrics.
+# The answers table is created in a separate benchmark db which is removed at the end.
+
+# bot modules
+from bot.database.connections import ConnectionManager
+from bot.database.writer import BackgroundWriter
+from bot.answer.base import Answer
+from bot.utils import check_positive
+import bot.config as config
+
+# general python
+import threading
+import argparse
+import time
+import os
+
+
+def create_answers(num_answers):
+    return [
+        Answer(
+            "How do I upload files?",
+            "rucio upload",
+            "distilbert",
+            0,
+            12,
+            0.9,
+            "rucio upload " * 20,
+            0,
+            260,
+            metadata={"doc_id": i, "context": "rucio upload " * 50},
+        )
+        for i in range(num_answers)
+    ]
+
+
+def run(store_answers, update_label, num_threads, num_requests, request_interval):
+    """Returns the mean and p99 latency (ms) of the calls and the elapsed seconds."""
+    latencies = []
+    lock = threading.Lock()
+
+    def handler():
+        thread_latencies = []
+        for _ in range(num_requests):
+            answers = create_answers(3)
+            start = time.perf_counter()
+            store_answers(answers)
+            thread_latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            update_label(answers[0].id, 1)
+            thread_latencies.append(time.perf_counter() - start)
+            # answering the next question
+            time.sleep(request_interval)
+        with lock:
+            latencies.extend(thread_latencies)
+
+    threads = [threading.Thread(target=handler) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (
+        1000 * sum(latencies) / len(latencies),
+        1000 * latencies[int(0.99 * (len(latencies) - 1))],
+        elapsed,
+    )
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""Benchmark storing answers and labels synchronously vs with a BackgroundWriter."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+    optional.add_argument(
+        "--num_threads",
+        type=check_positive,
+        default=8,
+        help="Number of concurrent handler threads. (default is 8)",
+    )
+    optional.add_argument(
+        "--num_requests",
+        type=check_positive,
+        default=200,
+        help="Requests answered and labeled by every thread. (default is 200)",
+    )
+    optional.add_argument(
+        "--max_queue_size",
+        type=check_positive,
+        default=1000,
+        help="Maximum number of items queued on the BackgroundWriter. (default is 1000)",
+    )
+    optional.add_argument(
+        "--request_interval",
+        type=float,
+        default=0.01,
+        help="Seconds between the requests of a thread, 0 for back-to-back requests. (default is 0.01)",
+    )
+    args = parser.parse_args()
+
+    db_name = "write_behind_benchmark.db"
+    connections = ConnectionManager(db_name)
+    connections.database().create_answers_table()
+    print(f"{args.num_threads} threads, {args.num_requests} requests per thread")
+    print(
+        f"{'writes':<15} {'call mean (ms)':>14} {'call p99 (ms)':>14} {'all stored (s)':>15}"
+    )
+
+    results = run(
+        lambda answers: connections.database().insert_answers(answers),
+        lambda answer_id, label: connections.database().update_label(answer_id, label),
+        args.num_threads,
+        args.num_requests,
+        args.request_interval,
+    )
+    print(
+        f"{'synchronous':<15} {results[0]:>14.3f} {results[1]:>14.3f} {results[2]:>15.2f}"
+    )
+
+    writer = BackgroundWriter(
+        connections=connections, max_queue_size=args.max_queue_size
+    )
+    start = time.perf_counter()
+    results = run(
+        writer.put_answers,
+        writer.put_label,
+        args.num_threads,
+        args.num_requests,
+        args.request_interval,
+    )
+    writer.close()
+    stored = time.perf_counter() - start
+    print(
+        f"{'write-behind':<15} {results[0]:>14.3f} {results[1]:>14.3f} {stored:>15.2f}"
+    )
+    print(writer.writer_info())
+    connections.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(config.DATA_DIR + db_name + suffix):
+            os.remove(config.DATA_DIR + db_name + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 from bot.config import MODELS_DIR, DATA_DIR
 from bot.utils import str2bool
 from bot.database.sqlite import Database
+from bot.answer.detector import quantize_model
 
 # general python
 import subprocess
@@ -40,6 +41,13 @@ def download_and_save_BERT_model(name):
     return
 
 
+def quantize_and_save_model(name):
+    """Quantize (int8) the transformer model and save it next to the model in MODELS_DIR"""
+    print(f"Quantizing: {name}")
+    quantize_model(name)
+    return
+
+
 def fetch_faq_data():
     """Creates FAQ table and populates it with data in faq.json"""
     # create faq table
@@ -51,8 +59,7 @@ def fetch_faq_data():
         data = json.load(json_file)
     # insert data to db
     print(f"Inserting data from faq.json file...")
-    for faq in data:
-        data_storage.insert_faq(faq)
+    data_storage.insert_faqs(data)
     data_storage.close_connection()
 
 
@@ -87,9 +94,18 @@ def main():
         default=False,
         help="If True then also parse emails_input_data from /data folder. (default is False)",
     )
+    optional.add_argument(
+        "--quantize",
+        type=str2bool,
+        nargs="?",  # 0 or 1 argument,
+        const=True,
+        default=False,
+        help="If True then also save dynamically quantized (int8) versions of the models for cpu inference. (default is False)",
+    )
     args = parser.parse_args()
     api_token = args.token
     download_all_models = args.all_models
+    quantize = args.quantize
     include_emails = args.include_emails
 
     # Fetch FAQ data from faq.json
@@ -135,12 +151,8 @@ def main():
             f"python -m scripts.detect_email_questions -db data_storage --emails_table emails --questions_table questions",
             shell=True,
         )
-    # create search engine for documents questions and faq
-    subprocess.run(
-        f"python -m scripts.create_se_indexes",
-        shell=True,
-    )
     # download and cache Question Answering models
+    models = ["distilbert-base-cased-distilled-squad"]
     download_and_save_DistilBERT_model("distilbert-base-cased-distilled-squad")
     if download_all_models:
         download_and_save_DistilBERT_model("distilbert-base-uncased-distilled-squad")
@@ -150,6 +162,20 @@ def main():
         download_and_save_BERT_model(
             "bert-large-uncased-whole-word-masking-finetuned-squad"
         )
+        models += [
+            "distilbert-base-uncased-distilled-squad",
+            "bert-large-cased-whole-word-masking-finetuned-squad",
+            "bert-large-uncased-whole-word-masking-finetuned-squad",
+        ]
+    if quantize:
+        for model in models:
+            quantize_and_save_model(model)
+    # create search engine for documents questions and faq
+    # and pre-tokenize their contexts for the models
+    subprocess.run(
+        f"python -m scripts.create_se_indexes --reader_models {' '.join(models)}",
+        shell=True,
+    )
     print("Done!")
 
 
@@ -0,0 +1,56 @@
+# bot modules
+from bot.searcher.base import SearchEngine
+from bot.searcher.question import QuestionSearchEngine
+from bot.searcher.faq import FAQSearchEngine
+from bot.database.sqlite import Database
+
+# general python
+import argparse
+
+
+def main():
+    # Parse cli arguments
+    parser = argparse.ArgumentParser(
+        description="""This script converts the existing document-term matrix tables of the Search Engines
+        to the binary (memory-mapped) index format, without re-indexing the data."""
+    )
+    optional = parser.add_argument_group("optional arguments")
+
+    optional.add_argument(
+        "-db",
+        "--db_name",
+        default="data_storage",
+        help="Database name of our storage. (default is data_storage)",
+    )
+    optional.add_argument(
+        "--docs_index",
+        default="rucio_doc_term_matrix",
+        help="Name of the documentation index table. (default is rucio_doc_term_matrix)",
+    )
+    optional.add_argument(
+        "--question_index",
+        default="questions_doc_term_matrix",
+        help="Name of the questions index table. (default is questions_doc_term_matrix)",
+    )
+    optional.add_argument(
+        "--faq_index",
+        default="faq_doc_term_matrix",
+        help="Name of the FAQ index table. (default is faq_doc_term_matrix)",
+    )
+
+    args = parser.parse_args()
+    data_storage = Database(f"{args.db_name}.db")
+
+    engines = [
+        (SearchEngine(), args.docs_index),
+        (QuestionSearchEngine(), args.question_index),
+        (FAQSearchEngine(), args.faq_index),
+    ]
+    for engine, table_name in engines:
+        print(f"Converting {table_name} for the {engine.type}...")
+        engine.convert_index(db=data_storage, table_name=table_name)
+    data_storage.close_connection()
+
+
+if __name__ == "__main__":
+    main()
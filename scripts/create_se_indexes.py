@@ -2,12 +2,100 @@
 from bot.searcher.base import SearchEngine
 from bot.searcher.question import QuestionSearchEngine
 from bot.searcher.faq import FAQSearchEngine
+from bot.answer.contexts import ContextStore, context_key
 from bot.database.sqlite import Database
+from bot.utils import check_positive
+from bot.config import MODELS_DIR
 
 # general python
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from transformers import AutoTokenizer
 import argparse
 
 
+def index_docs(db_name, docs_table, workers=1, executor=None):
+    """Creates the documentation index of the SearchEngine."""
+    data_storage = Database(f"{db_name}.db")
+    docs_se = SearchEngine()
+    docs_df = data_storage.get_dataframe(docs_table)
+    # let's not index the release-notes in this version of the bot
+    # this code also exists is load_index() for rucio documents
+    docs_df = docs_df[docs_df["doc_type"] != "release_notes"]
+    print("Indexing Rucio documentation for the SearchEngine...")
+    docs_se.create_index(
+        corpus=docs_df,
+        db=data_storage,
+        table_name="rucio_doc_term_matrix",
+        workers=workers,
+        executor=executor,
+    )
+    data_storage.close_connection()
+
+
+def index_questions(db_name, questions_table, workers=1, executor=None):
+    """Creates the questions index of the QuestionSearchEngine."""
+    data_storage = Database(f"{db_name}.db")
+    questions_se = QuestionSearchEngine()
+    questions_df = data_storage.get_dataframe(questions_table)
+    print("Indexing Questions for the QuestionSearchEngine...")
+    questions_se.create_index(
+        corpus=questions_df,
+        db=data_storage,
+        table_name=f"{questions_table}_doc_term_matrix",
+        workers=workers,
+        executor=executor,
+    )
+    data_storage.close_connection()
+
+
+def index_faq(db_name, faq_table, workers=1, executor=None):
+    """Creates the FAQ index of the FAQSearchEngine."""
+    data_storage = Database(f"{db_name}.db")
+    faq_se = FAQSearchEngine()
+    faq_df = data_storage.get_dataframe(faq_table)
+    print("Indexing FAQ for the FAQSearchEngine...")
+    faq_se.create_index(
+        corpus=faq_df,
+        db=data_storage,
+        table_name=f"{faq_table}_doc_term_matrix",
+        workers=workers,
+        executor=executor,
+    )
+    data_storage.close_connection()
+
+
+def tokenize_contexts(db_name, docs_table, questions_table, models):
+    """
+    Creates the context stores of the documentation and question contexts,
+    pre-tokenized for the AnswerDetector of each model.
+    """
+    if not models:
+        return
+    data_storage = Database(f"{db_name}.db")
+    docs_se = SearchEngine()
+    docs_se.load_index(
+        db=data_storage, table_name="rucio_doc_term_matrix", original_table=docs_table
+    )
+    questions_df = data_storage.get_dataframe(questions_table)
+    data_storage.close_connection()
+    # the contexts are the ones the search engines attach to their results
+    docs_df = docs_se.corpus.assign(context=docs_se.documents)
+    keys, contexts = [], []
+    for df in (docs_df, questions_df):
+        keys += [context_key(doc) for _, doc in df.iterrows()]
+        contexts += df["context"].tolist()
+    for model in models:
+        print(f"Tokenizing contexts for {model}...")
+        tokenizer = AutoTokenizer.from_pretrained(MODELS_DIR + model)
+        ContextStore.build(
+            ContextStore.default_path(db_name, model),
+            keys,
+            contexts,
+            tokenizer,
+            model,
+        )
+
+
 def main():
     # Parse cli arguments
     parser = argparse.ArgumentParser(
@@ -36,43 +124,50 @@ def main():
         default="faq",
         help="Name given to the table holding the FAQ. (default is faq)",
     )
+    optional.add_argument(
+        "-w",
+        "--workers",
+        type=check_positive,
+        default=1,
+        help="Number of processes used for indexing. With more than 1 worker the three indexes are built concurrently. (default is 1)",
+    )
+
+    optional.add_argument(
+        "--reader_models",
+        nargs="*",
+        default=[],
+        help="QA models (in MODELS_DIR) whose tokenizer pre-tokenizes the documentation and question contexts. (default is none)",
+    )
 
     args = parser.parse_args()
     db_name = args.db_name
     docs_table = args.documentation_table
     questions_table = args.questions_table
     faq_table = args.faq_table
+    workers = args.workers
 
-    data_storage = Database(f"{db_name}.db")
+    if workers == 1:
+        index_docs(db_name, docs_table)
+        index_questions(db_name, questions_table)
+        index_faq(db_name, faq_table)
+        tokenize_contexts(db_name, docs_table, questions_table, args.reader_models)
+        return
 
-    # Documentation SearchEngine
-    docs_se = SearchEngine()
-    docs_df = data_storage.get_dataframe(docs_table)
-    # let's not index the release-notes in this version of the bot
-    # this code also exists is load_index() for rucio documents
-    docs_df = docs_df[docs_df["doc_type"] != "release_notes"]
-    print("Indexing Rucio documentation for the SearchEngine...")
-    docs_se.create_index(
-        corpus=docs_df, db=data_storage, table_name="rucio_doc_term_matrix"
-    )
-
-    # QuestionSearchEngine
-    questions_se = QuestionSearchEngine()
-    questions_df = data_storage.get_dataframe(questions_table)
-    print("Indexing Questions for the QuestionSearchEngine...")
-    questions_se.create_index(
-        corpus=questions_df,
-        db=data_storage,
-        table_name=f"{questions_table}_doc_term_matrix",
-    )
-
-    # FAQSearchEngine
-    faq_se = FAQSearchEngine()
-    faq_df = data_storage.get_dataframe(faq_table)
-    print("Indexing FAQ for the FAQSearchEngine...")
-    faq_se.create_index(
-        corpus=faq_df, db=data_storage, table_name=f"{faq_table}_doc_term_matrix"
-    )
+    # the corpus chunks of all three indexes share the same process pool,
+    # each index is merged and saved by its own thread (and db connection)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        with ThreadPoolExecutor(max_workers=3) as threads:
+            futures = [
+                threads.submit(index_docs, db_name, docs_table, workers, executor),
+                threads.submit(
+                    index_questions, db_name, questions_table, workers, executor
+                ),
+                threads.submit(index_faq, db_name, faq_table, workers, executor),
+            ]
+            for future in futures:
+                # raise any exception of the indexing threads
+                future.result()
+    tokenize_contexts(db_name, docs_table, questions_table, args.reader_models)
 
 
 if __name__ == "__main__":
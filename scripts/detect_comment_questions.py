@@ -47,6 +47,7 @@ def main():
     print("Detecting questions in issue comments...")
     comments_with_questions = 0
     total_questions = 0
+    questions = []
     for i in tqdm(range(len(comments_df.index))):
         text = str(comments_df.clean_body.values[i])
         comment_id = int(comments_df.comment_id.values[i])
@@ -65,7 +66,10 @@ def main():
                 if question.context == "":
                     continue
                 else:
-                    data_storage.insert_question(question, table_name=questions_table)
+                    questions.append(question)
+
+    # all the questions are inserted in one transaction
+    data_storage.insert_questions(questions, table_name=questions_table)
 
     print(f"Type of the question objects : {type(question)}")
     print(f"Total questions detected: {total_questions}")
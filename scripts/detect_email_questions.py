@@ -53,6 +53,7 @@ def main():
     print("Detecting questions in emails that are part of conversations...")
     emails_with_questions = 0
     total_questions = 0
+    questions = []
     for i in tqdm(range(len(conv_df.index))):
         text = str(conv_df.clean_body.values[i])
         email_id = int(conv_df.email_id.values[i])
@@ -69,7 +70,10 @@ def main():
                 if question.context == "":
                     continue
                 else:
-                    data_storage.insert_question(question, table_name=questions_table)
+                    questions.append(question)
+
+    # all the questions are inserted in one transaction
+    data_storage.insert_questions(questions, table_name=questions_table)
 
     print(f"Type of the question objects : {type(question)}")
     print(f"Total questions detected: {total_questions}")
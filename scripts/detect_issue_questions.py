@@ -47,6 +47,7 @@ def main():
     print("Detecting questions in issues that have comments...")
     issues_with_questions = 0
     total_questions = 0
+    questions = []
     for i in tqdm(range(len(issues_df.index))):
         text = str(issues_df.clean_body.values[i])
         issue_id = int(issues_df.issue_id.values[i])
@@ -63,7 +64,10 @@ def main():
                 if question.context == "":
                     continue
                 else:
-                    data_storage.insert_question(question, table_name=questions_table)
+                    questions.append(question)
+
+    # all the questions are inserted in one transaction
+    data_storage.insert_questions(questions, table_name=questions_table)
 
     print(f"Type of the question objects : {type(question)}")
     print(f"Total questions detected: {total_questions}")
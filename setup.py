@@ -18,6 +18,7 @@ setup(
         "numpy",
         "nltk",
         "rank_bm25",
+        "scipy",
         "requests",
         "protobuf",
         "transformers",
@@ -26,6 +27,9 @@ setup(
         "slack_bolt" # slackbot
         # for torch you need to download based on https://pytorch.org/ quickstart guide
     ], 
+    extras_require={
+        "onnx": ["onnxruntime"], # AnswerDetector(backend="onnx")
+    },
     setup_requires=['pytest-runner'],
     tests_require=['pytest'],
     classifiers=[
@@ -0,0 +1,48 @@
+# bot modules
+from bot.answer.base import Answer
+from bot.database.sqlite import Database
+import bot.config as config
+
+# general python
+import pytest
+
+
+@pytest.fixture(scope="module")
+def test_db():
+    """The db with the test data under data/"""
+    db = Database("db_for_tests.db")
+    yield db
+    db.close_connection()
+
+
+@pytest.fixture()
+def data_dir(tmp_path, monkeypatch):
+    """Points DATA_DIR (and INDEXES_DIR under it) to a temporary directory"""
+    monkeypatch.setattr(config, "DATA_DIR", str(tmp_path) + "/")
+    monkeypatch.setattr(config, "INDEXES_DIR", str(tmp_path / "indexes"))
+    return tmp_path
+
+
+@pytest.fixture()
+def make_answer():
+    """Returns a function creating Answers, the keyword arguments replace the defaults"""
+
+    def make_answer(
+        question="What is Rucio?", answer="a data management system", **kwargs
+    ):
+        fields = dict(
+            question=question,
+            answer=answer,
+            model="distilbert-base-cased-distilled-squad",
+            start=0,
+            end=len(answer),
+            confidence=0.9,
+            extended_answer=answer,
+            extended_start=0,
+            extended_end=len(answer),
+            metadata={"doc_id": 3},
+        )
+        fields.update(kwargs)
+        return Answer(**fields)
+
+    return make_answer
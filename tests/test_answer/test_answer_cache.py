@@ -0,0 +1,85 @@
+# bot modules
+from bot.answer.cache import AnswerCache
+from bot.database.sqlite import Database
+from bot.database.connections import ConnectionManager
+
+# general python
+import threading
+import numpy as np
+import pytest
+
+# as found by the AnswerDetector, with numpy values
+METADATA = {"doc_id": np.int64(3), "context": "a data management system"}
+
+
+def test_cached_answers(data_dir, make_answer):
+    cache = AnswerCache(db_name="cache")
+    answer = make_answer(metadata=METADATA)
+    assert cache.get("What is Rucio?", "model", "v1") is None
+    cache.put("What is Rucio?", [answer], "model", "v1")
+    cached = cache.get("what is rucio ??", "model", "v1")
+    assert [a.answer for a in cached] == [answer.answer]
+    assert cached[0].metadata == answer.metadata
+    assert cached[0].origin == "documentation"
+    # new answers for each request
+    assert cached[0].id != answer.id
+    assert cached[0].user_question == "what is rucio ??"
+    assert cache.get("What is Rucio?", "other model", "v1") is None
+    assert cache.get("What is Rucio?", "model", "v2") is None
+    assert cache.get("What is Rucio?", "model", "v1", request="top_k=3") is None
+    assert cache.cache_info()["hits"] == 1
+    assert cache.cache_info()["misses"] == 4
+
+
+def test_cache_is_persistent(data_dir, make_answer):
+    AnswerCache(db_name="cache").put(
+        "What is Rucio?", [make_answer(metadata=METADATA)], "model", "v1"
+    )
+    cache = AnswerCache(db_name="cache")
+    cached = cache.get("What is Rucio?", "model", "v1")
+    assert cached[0].metadata["doc_id"] == 3
+    assert cached[0].confidence == 0.9
+
+
+def test_cache_eviction(data_dir, make_answer):
+    AnswerCache(db_name="cache", ttl=-1).put(
+        "What is Rucio?", [make_answer(metadata=METADATA)], "model", "v1"
+    )
+    assert AnswerCache(db_name="cache").get("What is Rucio?", "model", "v1") is None
+
+    cache = AnswerCache(db_name="cache", max_size=2, memory_size=1)
+    for question in ("What is a DID?", "What is an RSE?", "What is a rule?"):
+        cache.put(question, [make_answer(question, metadata=METADATA)], "model", "v1")
+    data_storage = Database("cache.db")
+    assert len(data_storage.get_dataframe("answer_cache")) == 2
+    data_storage.close_connection()
+    assert cache.get("What is a DID?", "model", "v1") is None
+    assert cache.get("What is an RSE?", "model", "v1") is not None
+    assert cache.cache_info()["memory_size"] == 1
+
+
+def test_cache_threads(data_dir, make_answer):
+    connections = ConnectionManager("cache.db")
+    cache = AnswerCache(db_name="cache", memory_size=2, connections=connections)
+    questions = ["What is a DID?", "What is an RSE?", "What is a rule?"]
+    for question in questions:
+        cache.put(question, [make_answer(question, metadata=METADATA)], "model", "v1")
+    errors = []
+
+    def get(thread):
+        try:
+            for i in range(100):
+                question = questions[(thread + i) % 3]
+                assert cache.get(question, "model", "v1")[0].answer is not None
+        except Exception as _e:
+            errors.append(_e)
+
+    threads = [threading.Thread(target=get, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections.close_all()
+    assert errors == []
+    assert cache.cache_info()["hits"] == 800
+    assert cache.cache_info()["memory_size"] == 2
@@ -1,10 +1,18 @@
 # bot modules
-from bot.answer.detector import AnswerDetector
+from bot.answer.detector import (
+    AnswerDetector,
+    QUANTIZED_WEIGHTS_NAME,
+    ONNX_OPTIMIZED_MODEL_NAME,
+)
+from bot.answer.contexts import ContextStore
 from bot.answer.base import Answer
+import bot.config as config
 
 # general python
 import pandas as pd
 import pytest
+import sys
+import os
 
 
 @pytest.fixture(scope="module")
@@ -23,6 +31,23 @@ def answer_detector():
     return answer_detector
 
 
+@pytest.fixture()
+def models_dir(tmp_path, monkeypatch):
+    """MODELS_DIR with links to the model files, the cached int8 and ONNX models are written there."""
+    model = "distilbert-base-cased-distilled-squad"
+    os.makedirs(tmp_path / model)
+    for name in (
+        "config.json",
+        "pytorch_model.bin",
+        "special_tokens_map.json",
+        "tokenizer_config.json",
+        "vocab.txt",
+    ):
+        os.symlink(os.path.join(config.MODELS_DIR + model, name), tmp_path / model / name)
+    monkeypatch.setattr(config, "MODELS_DIR", str(tmp_path) + "/")
+    return str(tmp_path) + "/"
+
+
 @pytest.fixture()
 def documents():
     documents = pd.DataFrame(
@@ -65,3 +90,197 @@ def test_answer_from_predict_content(answer_detector, documents):
         print(f"answer {i+1}: {answer.answer} | confidence : {answer.confidence}")
     assert answers[0].answer == "assist the support team"
     assert answers[1].answer == "to use Natural Language Processing (NLP)"
+
+
+def test_batched_predict_same_as_per_document(answer_detector, documents):
+    question = "What is the aim of Donkeybot?"
+    # long enough for the doc_stride windows to be batched along with the other documents
+    documents = documents.append(
+        {"context": " ".join(documents.context) * 3, "col_2": "long_doc", "col_3": "data"},
+        ignore_index=True,
+    )
+    batch_size = answer_detector.batch_size
+    try:
+        answer_detector.batch_size = None
+        answers = answer_detector.predict(question, documents, top_k=10)
+        for size in (1, 2, 16):
+            answer_detector.batch_size = size
+            batched_answers = answer_detector.predict(question, documents, top_k=10)
+            assert [a.answer for a in batched_answers] == [a.answer for a in answers]
+            assert [a.start for a in batched_answers] == [a.start for a in answers]
+            assert [a.metadata for a in batched_answers] == [a.metadata for a in answers]
+            assert [a.confidence for a in batched_answers] == pytest.approx(
+                [a.confidence for a in answers], rel=1e-4
+            )
+    finally:
+        answer_detector.batch_size = batch_size
+
+
+def test_batched_predict_keeps_short_documents(answer_detector):
+    # a one word context has fewer answer spans than num_answers_to_predict,
+    # the pipeline then picks question tokens and drops the document (KeyError)
+    question = "What is Rucio?"
+    documents = pd.DataFrame(
+        {
+            "context": ["Rucio", "Rucio manages the data of physics experiments."],
+            "col_2": ["short_doc", "long_doc"],
+        }
+    )
+    batch_size = answer_detector.batch_size
+    try:
+        answer_detector.batch_size = None
+        pipeline_answers = answer_detector.predict(question, documents, top_k=10)
+        answer_detector.batch_size = 16
+        answers = answer_detector.predict(question, documents, top_k=10)
+    finally:
+        answer_detector.batch_size = batch_size
+    assert "short_doc" not in [a.metadata["col_2"] for a in pipeline_answers]
+    assert ("Rucio", "short_doc") in [(a.answer, a.metadata["col_2"]) for a in answers]
+    long_answers = [a for a in answers if a.metadata["col_2"] == "long_doc"]
+    assert [a.answer for a in long_answers] == [a.answer for a in pipeline_answers]
+
+
+def test_predict_from_multiple_documents(answer_detector, documents):
+    question = "What is the aim of Donkeybot?"
+    first, second = documents.iloc[:1], documents.iloc[1:]
+    answers = answer_detector.predict(question, [first, second], top_k=10)
+    separate_answers = answer_detector.predict(
+        question, first, top_k=10
+    ) + answer_detector.predict(question, second, top_k=10)
+    separate_answers = sorted(separate_answers, key=lambda k: k.confidence, reverse=True)
+    assert [a.answer for a in answers] == [a.answer for a in separate_answers]
+    assert [a.metadata for a in answers] == [a.metadata for a in separate_answers]
+    # identical contexts are only predicted once, for the first document
+    duplicate = second.assign(col_2="duplicate_doc")
+    answers = answer_detector.predict(question, [second, duplicate], top_k=10)
+    assert answers
+    assert all(a.metadata["col_2"] == "second_doc" for a in answers)
+
+
+def test_dynamic_padding_same_answers(answer_detector, documents):
+    question = "What is the aim of Donkeybot?"
+    documents = documents.append(
+        {"context": " ".join(documents.context) * 3, "col_2": "long_doc", "col_3": "data"},
+        ignore_index=True,
+    )
+    dynamic_padding, batch_size = answer_detector.dynamic_padding, answer_detector.batch_size
+    try:
+        # short documents are batched apart from the full windows of the long one
+        answer_detector.batch_size = 2
+        answer_detector.dynamic_padding = False
+        padded_tokens = answer_detector.padded_tokens
+        answers = answer_detector.predict(question, documents, top_k=10)
+        fixed_padded_tokens = answer_detector.padded_tokens - padded_tokens
+        assert fixed_padded_tokens % answer_detector.max_seq_len == 0
+
+        answer_detector.dynamic_padding = True
+        info = answer_detector.padding_info()
+        dynamic_answers = answer_detector.predict(question, documents, top_k=10)
+        dynamic_info = answer_detector.padding_info()
+        dynamic_padded_tokens = dynamic_info["padded_tokens"] - info["padded_tokens"]
+        assert dynamic_padded_tokens < fixed_padded_tokens
+        assert dynamic_info["real_tokens"] - info["real_tokens"] <= dynamic_padded_tokens
+        assert 0 < dynamic_info["padding_efficiency"] <= 1
+
+        assert [a.answer for a in dynamic_answers] == [a.answer for a in answers]
+        assert [a.start for a in dynamic_answers] == [a.start for a in answers]
+        assert [a.confidence for a in dynamic_answers] == pytest.approx(
+            [a.confidence for a in answers], rel=1e-4
+        )
+    finally:
+        answer_detector.dynamic_padding = dynamic_padding
+        answer_detector.batch_size = batch_size
+
+
+def test_quantized_answer_detector(documents, models_dir):
+    model = "distilbert-base-cased-distilled-squad"
+    answer_detector = AnswerDetector(model=model, quantize=True, max_answer_len=20)
+    # the quantized weights are cached next to the model
+    assert os.path.isfile(os.path.join(models_dir + model, QUANTIZED_WEIGHTS_NAME))
+    answers = answer_detector.predict("What is the aim of Donkeybot?", documents, top_k=2)
+    cached_answers = AnswerDetector(model=model, quantize=True, max_answer_len=20).predict(
+        "What is the aim of Donkeybot?", documents, top_k=2
+    )
+    assert [a.answer for a in answers] == [a.answer for a in cached_answers]
+    assert [a.confidence for a in answers] == [a.confidence for a in cached_answers]
+    for answer in answers:
+        assert answer.model == f"{model}-int8"
+
+
+def test_quantized_answer_detector_on_gpu():
+    with pytest.raises(SystemExit):
+        AnswerDetector(quantize=True, device=0)
+
+
+def test_onnx_backend_same_answers(answer_detector, documents, models_dir):
+    question = "What is the aim of Donkeybot?"
+    onnx_detector = AnswerDetector(
+        model="distilbert-base-cased-distilled-squad",
+        max_answer_len=20,
+        max_question_len=20,
+        backend="onnx",
+        num_threads=1,
+    )
+    model_dir = models_dir + "distilbert-base-cased-distilled-squad"
+    assert os.path.isfile(os.path.join(model_dir, ONNX_OPTIMIZED_MODEL_NAME))
+    answers = answer_detector.predict(question, documents, top_k=10)
+    for batch_size in (None, 16):
+        onnx_detector.batch_size = batch_size
+        onnx_answers = onnx_detector.predict(question, documents, top_k=10)
+        assert [a.answer for a in onnx_answers] == [a.answer for a in answers]
+        assert [a.start for a in onnx_answers] == [a.start for a in answers]
+        assert [a.confidence for a in onnx_answers] == pytest.approx(
+            [a.confidence for a in answers], rel=1e-4
+        )
+
+
+def test_onnx_backend_without_onnxruntime(monkeypatch):
+    # onnxruntime is an optional dependency
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)
+    with pytest.raises(SystemExit, match="onnxruntime"):
+        AnswerDetector(backend="onnx")
+
+
+def test_context_store_same_answers(answer_detector, documents, tmp_path):
+    question = "What is the aim of Donkeybot?"
+    model = "distilbert-base-cased-distilled-squad"
+    documents = documents.append(
+        {"context": " ".join(documents.context) * 3, "col_2": "long_doc", "col_3": "data"},
+        ignore_index=True,
+    )
+    documents["doc_id"] = [0, 1, 2]
+    store = ContextStore.build(
+        str(tmp_path / "contexts"),
+        [f"doc_id:{i}" for i in documents.doc_id],
+        documents.context,
+        answer_detector.tokenizer,
+        model,
+    )
+    answers = answer_detector.predict(question, documents, top_k=10)
+    cached_detector = AnswerDetector(
+        model=model, max_answer_len=20, max_question_len=20, context_store=store
+    )
+    cached_answers = cached_detector.predict(question, documents, top_k=10)
+    assert [a.answer for a in cached_answers] == [a.answer for a in answers]
+    assert [(a.start, a.end) for a in cached_answers] == [(a.start, a.end) for a in answers]
+    assert [a.confidence for a in cached_answers] == pytest.approx(
+        [a.confidence for a in answers], rel=1e-4
+    )
+    # contexts that changed since the store was built are tokenized again
+    documents.loc[0, "context"] = "Donkeybot answers the questions of Rucio users."
+    answers = answer_detector.predict(question, documents, top_k=10)
+    cached_answers = cached_detector.predict(question, documents, top_k=10)
+    assert [a.answer for a in cached_answers] == [a.answer for a in answers]
+
+
+def test_context_store_of_other_model(answer_detector, tmp_path):
+    store = ContextStore.build(
+        str(tmp_path / "contexts"), ["doc_id:0"], ["context"], answer_detector.tokenizer, "other"
+    )
+    with pytest.raises(SystemExit):
+        AnswerDetector(context_store=store)
+
+
+def test_unknown_backend():
+    with pytest.raises(SystemExit):
+        AnswerDetector(backend="not a backend")
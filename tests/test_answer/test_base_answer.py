@@ -3,6 +3,8 @@ from bot.answer.base import Answer
 from bot.database.sqlite import Database
 
 # general python
+import pandas as pd
+import threading
 import pytest
 
 
@@ -79,3 +81,57 @@ def test_user_question_ids_equality(db_for_tests):
     user_q_id = answers[0].user_question_id
     for answer in answers:
         assert answer.user_question_id == user_q_id
+
+
+def test_answer_from_source_row():
+    doc = pd.Series(
+        {
+            "question_id": 7,
+            "question": "How do I upload files?",
+            "context": "Use rucio upload.",
+            "query": "upload files",
+        }
+    )
+    answer = Answer(
+        question="upload?",
+        model="superman",
+        answer="rucio upload",
+        start=4,
+        end=16,
+        confidence=0.9,
+        extended_answer="Use rucio upload.",
+        extended_start=0,
+        extended_end=17,
+        source=doc,
+    )
+    assert not hasattr(answer, "__dict__")
+    assert answer.origin == "questions"
+    assert answer.context == "Use rucio upload."
+    # the id is created once
+    assert answer.id == answer.id
+    assert len(answer.created_at) == len("2020-01-01 00:00:00+00:00")
+    assert answer.metadata == {
+        "question_id": 7,
+        "most_similar_question": "How do I upload files?",
+        "context": "Use rucio upload.",
+    }
+    # the row isn't copied
+    assert answer._source is doc
+
+
+def test_answer_id_threads():
+    answers = [
+        Answer("question", "answer", "model", 0, 6, 0.9, "answer", 0, 6) for _ in range(200)
+    ]
+    ids = []
+
+    def read_ids():
+        ids.append([answer.id for answer in answers])
+
+    threads = [threading.Thread(target=read_ids) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # created once, the same for every thread
+    assert all(thread_ids == ids[0] for thread_ids in ids)
@@ -0,0 +1,81 @@
+# bot modules
+from bot.answer.cascade import CascadeAnswerDetector
+from bot.answer.detector import AnswerDetector
+
+# general python
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="module")
+def small_detector():
+    return AnswerDetector(
+        model="distilbert-base-cased-distilled-squad", max_answer_len=20, max_question_len=20
+    )
+
+
+@pytest.fixture(scope="module")
+def large_detector():
+    return AnswerDetector(
+        model="bert-large-cased-whole-word-masking-finetuned-squad",
+        max_answer_len=20,
+        max_question_len=20,
+    )
+
+
+@pytest.fixture()
+def documents():
+    questions = pd.DataFrame(
+        {
+            "question_id": ["q1"],
+            "context": ["Rucio is the data management system of the ATLAS experiment."],
+        }
+    )
+    docs = pd.DataFrame(
+        {
+            "doc_id": [1, 2],
+            "context": [
+                "Donkeybot uses Natural Language Processing to answer the questions of Rucio users.",
+                "Requests are escalated to the Rucio support when no answer is found.",
+            ],
+        }
+    )
+    return [questions, docs]
+
+
+def test_confident_answers_are_not_escalated(small_detector, large_detector, documents):
+    question = "What is Rucio?"
+    cascade = CascadeAnswerDetector(small_detector, large_detector, confidence_threshold=0.0)
+    answers = cascade.predict(question, documents, top_k=5)
+    small_answers = small_detector.predict(question, documents, top_k=5)
+    assert [a.answer for a in answers] == [a.answer for a in small_answers]
+    info = cascade.cascade_info()
+    assert info["questions"] == 1
+    assert info["escalations"] == 0
+    assert info["escalation_rate"] == 0
+    assert info["large_latency"] is None
+
+
+def test_escalated_documents(small_detector, large_detector, documents):
+    question = "What is Rucio?"
+    cascade = CascadeAnswerDetector(
+        small_detector, large_detector, confidence_threshold=1.1, num_escalated_documents=1
+    )
+    answers = cascade.predict(question, documents, top_k=None)
+    small_answers = small_detector.predict(question, documents, top_k=None)
+    escalated_context = small_answers[0].metadata["context"]
+    for answer in answers:
+        if answer.metadata["context"] == escalated_context:
+            assert answer.model == large_detector.model_name
+        else:
+            assert answer.model == small_detector.model_name
+    # origins are kept for the escalated questions and docs
+    assert {a.origin for a in answers} == {a.origin for a in small_answers}
+    info = cascade.cascade_info()
+    assert info["escalations"] == info["questions"] == 1
+    assert info["small_latency"] > 0 and info["large_latency"] > 0
+
+
+def test_cascade_of_wrong_detectors(small_detector):
+    with pytest.raises(SystemExit):
+        CascadeAnswerDetector(small_detector, "not an AnswerDetector")
@@ -0,0 +1,70 @@
+# bot modules
+from bot.answer.contexts import ContextStore, context_key
+from bot.searcher.bm25 import IndexFormatError
+
+# general python
+from transformers import AutoTokenizer
+import bot.config as config
+import pandas as pd
+import pytest
+import json
+import os
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    return AutoTokenizer.from_pretrained(
+        config.MODELS_DIR + "distilbert-base-cased-distilled-squad"
+    )
+
+
+@pytest.fixture()
+def store(tokenizer, tmp_path):
+    return ContextStore.build(
+        str(tmp_path / "contexts"),
+        ["doc_id:1", "question_id:7", None],
+        ["  Rucio manages\tdata. ", "How do I upload\nfiles?", "no key"],
+        tokenizer,
+        "distilbert-base-cased-distilled-squad",
+    )
+
+
+def test_build_and_get(store, tokenizer):
+    assert len(store) == 2
+    assert store.model == "distilbert-base-cased-distilled-squad"
+    tokenized = store.get("doc_id:1", "  Rucio manages\tdata. ")
+    words = ["Rucio", "manages", "data."]
+    expected_ids = [
+        i for word in words for i in tokenizer.convert_tokens_to_ids(tokenizer.tokenize(word))
+    ]
+    assert tokenized.token_ids.tolist() == expected_ids
+    assert tokenized.token_words[0] == 0 and tokenized.token_words[-1] == 2
+    assert [
+        tokenized.context[start:end]
+        for start, end in zip(tokenized.word_starts, tokenized.word_ends)
+    ] == words
+
+
+def test_get_missing_or_changed_context(store):
+    assert store.get("doc_id:2", "  Rucio manages\tdata. ") is None
+    assert store.get("doc_id:1", "Rucio manages data.") is None
+    assert store.get(None, "no key") is None
+
+
+def test_load_other_format_version(store, tmp_path):
+    path = str(tmp_path / "contexts")
+    with open(os.path.join(path, "header.json"), "w") as f:
+        json.dump({"format_version": 0, "model": store.model, "size": 2}, f)
+    with pytest.raises(IndexFormatError):
+        ContextStore.load(path)
+    with pytest.raises(IndexFormatError):
+        ContextStore.load(str(tmp_path / "missing"))
+
+
+def test_context_key():
+    assert context_key(pd.Series({"doc_id": 3, "context": "text"})) == "doc_id:3"
+    assert (
+        context_key(pd.Series({"doc_id": float("nan"), "question_id": 5, "context": "text"}))
+        == "question_id:5"
+    )
+    assert context_key(pd.Series({"context": "text"})) is None
@@ -0,0 +1,121 @@
+# bot modules
+from bot.answer.verified import VerifiedAnswerIndex
+from bot.searcher.question import QuestionSearchEngine
+from bot.database.sqlite import Database
+
+# general python
+import pandas as pd
+import pytest
+
+
+@pytest.fixture()
+def data_storage(data_dir):
+    db = Database("verified.db")
+    db.create_answers_table()
+    yield db
+    db.close_connection()
+
+
+@pytest.fixture()
+def question_se(data_storage):
+    questions = pd.DataFrame(
+        {
+            "question_id": ["q1", "q2", "q3", "q4"],
+            "question": [
+                "How do I upload files to an RSE?",
+                "How do I download files?",
+                "What does the reaper daemon do?",
+                "How do I add a replication rule?",
+            ],
+            "context": ["upload", "download", "reaper", "rule"],
+        }
+    )
+    question_se = QuestionSearchEngine()
+    question_se.create_index(
+        corpus=questions, db=data_storage, table_name="questions_doc_term_matrix"
+    )
+    return question_se
+
+
+@pytest.fixture()
+def store_answer(data_storage, make_answer):
+    """Returns a function storing an Answer, and its label, in the db"""
+
+    def store_answer(question, answer, label=None, **kwargs):
+        kwargs.setdefault("confidence", 0.42)
+        kwargs.setdefault("metadata", {"question_id": "q1"})
+        answer = make_answer(question, answer, **kwargs)
+        data_storage.insert_answer(answer)
+        if label is not None:
+            data_storage.update_label(answer.id, label)
+        return answer
+
+    return store_answer
+
+
+def test_verified_answers(data_storage, question_se, store_answer):
+    correct = store_answer("How do I upload files to an RSE?", "rucio upload", 1)
+    store_answer("What does the reaper daemon do?", "deletes replicas", 0)
+    store_answer("How do I add a replication rule?", "rucio add-rule")
+    index = VerifiedAnswerIndex(question_engine=question_se, db_name="verified")
+    assert len(index) == 1
+    answers = index.get("how can I upload a file to RSE")
+    assert [a.answer for a in answers] == ["rucio upload"]
+    assert answers[0].id != correct.id
+    assert answers[0].confidence == 0.42
+    assert answers[0].metadata["verified_answer_id"] == correct.id
+    assert answers[0].metadata["verified_similarity"] == 1.0
+    assert answers[0].origin == "questions"
+    # not similar enough, or labeled wrong
+    assert index.get("How do I upload files to an RSE with a lifetime?") is None
+    assert index.get("What does the reaper daemon do?") is None
+    assert index.get("How do I add a replication rule?") is None
+
+
+def test_update_label(data_storage, question_se, store_answer):
+    answer = store_answer("What does the reaper daemon do?", "deletes replicas")
+    index = VerifiedAnswerIndex(question_engine=question_se, db_name="verified")
+    assert index.get("What does the reaper daemon do?") is None
+    data_storage.update_label(answer.id, 1)
+    index.update_label(answer.id, 1)
+    verified = index.get("what does the reaper daemon do")
+    assert verified[0].answer == "deletes replicas"
+    data_storage.update_label(answer.id, 0)
+    index.update_label(answer.id, 0)
+    assert len(index) == 0
+    assert index.get("What does the reaper daemon do?") is None
+
+
+def test_verified_answer_labeled_wrong(data_storage, question_se, store_answer):
+    store_answer("How do I upload files to an RSE?", "rucio upload", 1)
+    index = VerifiedAnswerIndex(question_engine=question_se, db_name="verified")
+    question = "How to upload files to RSE?"
+    answer = index.get(question)[0]
+    data_storage.insert_answer(answer)
+    data_storage.update_label(answer.id, 0)
+    index.update_label(answer.id, 0)
+    # only for the question it was wrong for
+    assert index.get(question) is None
+    assert index.get("How do I upload files to an RSE?") is not None
+    # same after loading the index again
+    index = VerifiedAnswerIndex(question_engine=question_se, db_name="verified")
+    assert index.get(question) is None
+    assert len(index) == 1
+
+
+def test_verified_faq_answer(data_storage, question_se, store_answer):
+    # FAQ answers have no confidence
+    answer = store_answer(
+        "How do I upload files?",
+        "Use rucio upload",
+        metadata={"faq_id": 1},
+        model="FAQSearchEngine",
+        confidence=None,
+    )
+    index = VerifiedAnswerIndex(question_engine=question_se, db_name="verified")
+    data_storage.update_label(answer.id, 1)
+    index.update_label(answer.id, 1)
+    verified = index.get("How do I upload files?")
+    assert verified[0].answer == "Use rucio upload"
+    assert verified[0].confidence is None
+    assert verified[0].origin == "faq"
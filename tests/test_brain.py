@@ -4,9 +4,12 @@ from bot.searcher.question import QuestionSearchEngine
 from bot.searcher.base import SearchEngine
 from bot.searcher.faq import FAQSearchEngine
 from bot.answer.detector import AnswerDetector
+from bot.searcher.selector import CandidateSelector
+from bot.answer.cache import AnswerCache
 from bot.database.sqlite import Database
 
 # general python
+import pandas as pd
 import pytest
 
 
@@ -62,3 +65,100 @@ def test_qa_interface_check_engines_docs_se():
             faq_engine=FAQSearchEngine,
             docs_engine="not a SearchEngine",
         )
+
+
+@pytest.fixture()
+def qa_interface(data_dir):
+    db = Database("qa.db")
+    questions = pd.DataFrame(
+        {
+            "question_id": ["q1", "q2", "q3"],
+            "question": [
+                "How do I upload files to an RSE?",
+                "How do I upload a dataset?",
+                "What is a DID?",
+            ],
+            "context": [
+                "Use rucio upload to upload files to an RSE.",
+                "Upload the files and attach them to the dataset.",
+                "A DID is a data identifier.",
+            ],
+        }
+    )
+    docs = pd.DataFrame(
+        {
+            "doc_id": [1, 2],
+            "doc_type": ["client", "daemon"],
+            "body": [
+                "The upload command uploads files to an RSE and registers them.",
+                "The reaper daemon deletes replicas from an RSE.",
+            ],
+        }
+    )
+    question_se = QuestionSearchEngine()
+    question_se.create_index(corpus=questions, db=db, table_name="questions_doc_term_matrix")
+    faq = pd.DataFrame(
+        {
+            "faq_id": [1],
+            "question": ["How do I upload files?"],
+            "keywords": ["upload"],
+            "answer": ["Use rucio upload."],
+        }
+    )
+    docs_se = SearchEngine()
+    docs_se.create_index(corpus=docs, db=db, table_name="rucio_doc_term_matrix")
+    faq_se = FAQSearchEngine()
+    faq_se.create_index(corpus=faq, db=db, table_name="faq_doc_term_matrix")
+    yield QAInterface(
+        detector=AnswerDetector(model="distilbert-base-cased-distilled-squad"),
+        question_engine=question_se,
+        faq_engine=faq_se,
+        docs_engine=docs_se,
+        question_selector=CandidateSelector(min_score_fraction=0.9),
+    )
+    db.close_connection()
+
+
+def test_get_answers_prunes_candidates(qa_interface):
+    query = "How do I upload files to an RSE?"
+    qa_interface.get_answers(query, top_k=10)
+    info = qa_interface.selection_info()
+    # the other retrieved question scores far below the top hit
+    assert len(qa_interface.retrieved_questions) == 2
+    assert info["candidates"] == len(qa_interface.retrieved_questions) + len(
+        qa_interface.retrieved_docs
+    )
+    assert info["selected"] == 1 + len(qa_interface.retrieved_docs)
+    assert info["selected_tokens"] < info["candidate_tokens"]
+    assert info["saved_time"] > 0
+    assert {a.metadata.get("question_id") for a in qa_interface.question_answers} <= {"q1"}
+
+
+def test_get_answers_latency_budget(qa_interface):
+    query = "How do I upload files to an RSE?"
+    # no reading speed measured yet, the budget can't be used
+    qa_interface.get_answers(query, top_k=10, latency_budget=0.0)
+    assert qa_interface.selection_info()["selected"] == 1 + len(qa_interface.retrieved_docs)
+    selected = qa_interface.selection_info()["selected"]
+    qa_interface.get_answers(query, top_k=10, latency_budget=0.0)
+    # only the best candidate is read
+    assert qa_interface.selection_info()["selected"] == selected + 1
+
+
+def test_get_answers_cached(qa_interface):
+    qa_interface.answer_cache = AnswerCache(db_name="qa")
+    query = "How do I upload files to an RSE?"
+    answers = qa_interface.get_answers(query, top_k=3)
+    read = qa_interface.selection_info()["selected"]
+    cached = qa_interface.get_answers(query + " ?", top_k=3)
+    # answered without retrieving or reading the candidates again
+    assert qa_interface.selection_info()["selected"] == read
+    assert [a.answer for a in cached] == [a.answer for a in answers]
+    assert [a.origin for a in cached] == [a.origin for a in answers]
+    qa_interface.get_answers(query, top_k=1)
+    assert qa_interface.selection_info()["selected"] > read
+    faq_answers = qa_interface.get_faq_answers(query, num_faqs=3)
+    assert [a.answer for a in qa_interface.get_faq_answers(query, num_faqs=3)] == [
+        a.answer for a in faq_answers
+    ]
+    assert qa_interface.answer_cache.cache_info()["hits"] == 2
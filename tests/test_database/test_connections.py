@@ -0,0 +1,62 @@
+# bot modules
+from bot.database.connections import ConnectionManager
+from bot.database.sqlite import Database
+
+# general python
+import threading
+import sqlite3
+import pytest
+
+
+def test_thread_local_connections(data_dir):
+    connections = ConnectionManager("test.db")
+    data_storage = connections.database()
+    # the same connection for the thread, kept open by close_connection()
+    data_storage.close_connection()
+    assert connections.database() is data_storage
+    assert data_storage.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert data_storage.db.execute("PRAGMA synchronous").fetchone()[0] == 1
+    others = []
+    thread = threading.Thread(target=lambda: others.append(connections.connection()))
+    thread.start()
+    thread.join()
+    assert others[0] is not data_storage.db
+    assert len(connections) == 2
+    connections.close_all()
+    assert len(connections) == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        data_storage.db.execute("SELECT 1")
+
+
+def test_concurrent_writes(data_dir):
+    connections = ConnectionManager("test.db")
+    connections.database().db.execute("CREATE TABLE t (thread INTEGER, i INTEGER)")
+
+    def write(thread):
+        db = connections.connection()
+        for i in range(50):
+            with db:
+                db.execute("INSERT INTO t VALUES (?, ?)", (thread, i))
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    count = connections.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    assert count == 8 * 50
+    connections.close_all()
+
+
+def test_read_only_connections(data_dir):
+    data_storage = Database("test.db")
+    data_storage.db.execute("CREATE TABLE t (i INTEGER)")
+    data_storage.db.execute("INSERT INTO t VALUES (1)")
+    data_storage.db.commit()
+    data_storage.close_connection()
+    for immutable in (False, True):
+        connections = ConnectionManager("test.db", read_only=True, immutable=immutable)
+        assert connections.database().get_dataframe("t")["i"].tolist() == [1]
+        with pytest.raises(sqlite3.OperationalError):
+            connections.connection().execute("INSERT INTO t VALUES (2)")
+        connections.close_all()
@@ -0,0 +1,148 @@
+# bot modules
+from bot.database.connections import ConnectionManager
+from bot.database.writer import BackgroundWriter
+
+# general python
+import threading
+import sqlite3
+import pytest
+
+
+@pytest.fixture()
+def connections(data_dir):
+    connections = ConnectionManager("test.db")
+    connections.database().create_answers_table()
+    yield connections
+    connections.close_all()
+
+
+def test_answers_and_labels_written(connections, make_answer):
+    labeled = []
+    writer = BackgroundWriter(
+        connections=connections,
+        batch_size=10,
+        flush_interval=0.05,
+        on_label=lambda answer_id, label: labeled.append((answer_id, label)),
+    )
+    answers = [make_answer() for _ in range(25)]
+    writer.put_answers(answers)
+    writer.put_label(answers[0].id, 1)
+    writer.put_label(answers[0].id, 0)
+    writer.flush()
+    stored = connections.database().get_dataframe("answers").set_index("answer_id")
+    assert len(stored) == 25
+    # the last label put is the one stored
+    assert int(float(stored.loc[answers[0].id, "label"])) == 0
+    assert labeled == [(answers[0].id, 1), (answers[0].id, 0)]
+    info = writer.writer_info()
+    assert info["answers_written"] == 25
+    assert info["labels_written"] == 2
+    # at most batch_size items per flush
+    assert 3 <= info["transactions"] < 27
+    assert info["queue_size"] == 0
+    writer.close()
+
+
+def test_backpressure_and_close(connections, make_answer):
+    writer = BackgroundWriter(
+        connections=connections, max_queue_size=2, batch_size=2, flush_interval=10
+    )
+    # a slow db, the writer holds on to its first batch
+    database = connections.database
+    release = threading.Event()
+
+    def slow_database():
+        release.wait()
+        return database()
+
+    connections.database = slow_database
+    threading.Timer(0.2, release.set).start()
+    writer.put_answers([make_answer() for _ in range(6)])
+    info = writer.writer_info()
+    assert info["blocked_puts"] > 0
+    assert info["blocked_seconds"] > 0
+    assert info["peak_queue_size"] == 2
+    # writes what is still queued, without waiting for flush_interval
+    writer.close()
+    connections.database = database
+    assert len(connections.database().get_dataframe("answers")) == 6
+    assert writer.writer_info()["answers_written"] == 6
+
+
+def test_failed_writes(connections, make_answer):
+    labeled = []
+    writer = BackgroundWriter(
+        connections=connections,
+        flush_interval=0.05,
+        on_label=lambda answer_id, label: labeled.append((answer_id, label)),
+    )
+    answers = [make_answer() for _ in range(3)]
+    writer.put_answers(answers)
+    writer.flush()
+    # the db is locked for the label updates of the next flushes
+    data_storage = connections.database()
+    update_labels = data_storage.update_labels
+    failures = []
+
+    def locked_update_labels(labels, table_name="answers"):
+        if len(failures) < 4:
+            failures.append(labels)
+            raise Exception("database is locked")
+        update_labels(labels, table_name=table_name)
+
+    data_storage.update_labels = locked_update_labels
+    # an answer already stored fails, the new one is written one by one
+    new_answer = make_answer()
+    writer.put_answers([answers[0], new_answer])
+    writer.put_label(answers[1].id, 1)
+    writer.put_label(answers[2].id, 1)
+    writer.put_label(answers[1].id, 0)
+    writer.close()
+    stored = data_storage.get_dataframe("answers").set_index("answer_id")
+    assert len(stored) == 4
+    # no label is dropped and the last one put is the one stored
+    assert int(float(stored.loc[answers[1].id, "label"])) == 0
+    assert int(float(stored.loc[answers[2].id, "label"])) == 1
+    # the verified answers get the labels of each answer in order
+    labels = [label for answer_id, label in labeled if answer_id == answers[1].id]
+    assert labels == [1, 0]
+    assert (answers[2].id, 1) in labeled
+    info = writer.writer_info()
+    assert info["failed_answers"] == 1
+    assert info["answers_written"] == 4
+    assert info["labels_written"] == 3
+    assert info["pending_labels"] == 0
+    assert info["errors"] > 0
+
+
+def test_failed_flush(connections, make_answer):
+    writer = BackgroundWriter(connections=connections, flush_interval=0.05)
+    database = connections.database
+    available = threading.Event()
+
+    def unavailable_database():
+        if not available.is_set():
+            raise sqlite3.OperationalError("unable to open database file")
+        return database()
+
+    connections.database = unavailable_database
+    answer = make_answer()
+    writer.put_answers([answer])
+    writer.put_label(answer.id, 1)
+    flushed = threading.Thread(target=writer.flush)
+    flushed.start()
+    flushed.join(timeout=5)
+    # the writer keeps running and keeps what it couldn't write
+    assert not flushed.is_alive()
+    info = writer.writer_info()
+    assert info["failed_flushes"] >= 1
+    assert info["pending_answers"] == 1
+    assert info["pending_labels"] == 1
+    available.set()
+    writer.close()
+    connections.database = database
+    stored = connections.database().get_dataframe("answers")
+    assert stored.answer_id.tolist() == [answer.id]
+    assert int(float(stored.label[0])) == 1
+    info = writer.writer_info()
+    assert info["pending_answers"] == 0 and info["pending_labels"] == 0
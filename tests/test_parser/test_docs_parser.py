@@ -4,6 +4,8 @@ from bot.parser.docs import RucioDocsParser, RucioDoc
 import bot.config as config
 
 # general python
+import pandas as pd
+import sqlite3
 import os
 import pytest
 
@@ -115,3 +117,33 @@ def test_parser_text_processing(test_doc, rucio_doc_parser):
     extra_spaces_doc["doc_id"] += 111  # must be unique id
     parsed_extra_spaces_doc = rucio_doc_parser.parse(**extra_spaces_doc)
     assert parsed_extra_spaces_doc.body == extra_spaces_doc["body"][:-11] + " a"
+
+
+def test_parse_dataframe(test_doc, rucio_doc_parser, test_db):
+    test_db.create_docs_table("test_doc_table_bulk")
+    docs_df = pd.DataFrame(
+        {
+            "doc_id": [1, 2, 3],
+            "name": ["a.md", "b.md", "c.md"],
+            "url": [test_doc["url"]] * 3,
+            "body": [test_doc["body"], "less than 50 chars", test_doc["body"] + "  b"],
+            "doc_type": ["test"] * 3,
+        }
+    )
+    docs = rucio_doc_parser.parse_dataframe(
+        docs_df, db=test_db, docs_table_name="test_doc_table_bulk", return_docs=True
+    )
+    assert [doc.doc_id for doc in docs] == [1, 2, 3]
+    docs_in_db = test_db.query("SELECT doc_id, body FROM test_doc_table_bulk")
+    # when len < 50 it should not be added to db
+    assert docs_in_db == [(1, docs[0].body), (3, docs[2].body)]
+
+
+def test_bulk_insert_is_one_transaction(test_db):
+    test_db.create_docs_table("test_doc_table_bulk")
+    docs = [RucioDoc(i, "a.md", "url", "body", "test") for i in (1, 2, 2)]
+    # duplicate doc_id, none of the docs are inserted
+    with pytest.raises(sqlite3.IntegrityError):
+        test_db.insert_docs(docs, table_name="test_doc_table_bulk", batch_size=1)
+    assert test_db.query("SELECT * FROM test_doc_table_bulk") == []
+    assert test_db.insert_docs(docs[:2], table_name="test_doc_table_bulk") == 2
@@ -0,0 +1,71 @@
+# bot modules
+from bot.searcher.attributes import AttributeIndex, InvalidFilterError
+
+# general python
+import pandas as pd
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def attributes():
+    return AttributeIndex(
+        pd.DataFrame(
+            {
+                "doc_type": ["daemon", "client", "daemon", None],
+                "created_at": [
+                    "2020-07-23 07:15:19+00:00",
+                    "2020-08-12 15:25:19+00:00",
+                    None,
+                    "2019-01-01 00:00:00+00:00",
+                ],
+            }
+        )
+    )
+
+
+def test_category_filter(attributes):
+    assert attributes.mask({"doc_type": "daemon"}).tolist() == [True, False, True, False]
+    assert attributes.mask({"doc_type": ["client", "daemon"]}).tolist() == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert not attributes.mask({"doc_type": "release_notes"}).any()
+
+
+def test_range_filter(attributes):
+    mask = attributes.mask({"created_at": ("2020-01-01", None)})
+    assert mask.tolist() == [True, True, False, False]
+    # both limits are included
+    mask = attributes.mask({"created_at": (None, "2020-07-23 07:15:19+00:00")})
+    assert mask.tolist() == [True, False, False, True]
+
+
+def test_filters_combined(attributes):
+    mask = attributes.mask({"doc_type": "daemon", "created_at": ("2020-01-01", None)})
+    assert mask.tolist() == [True, False, False, False]
+    assert attributes.mask({}).all()
+
+
+def test_set_row(attributes):
+    attributes.set_row(4, {"doc_type": "client", "created_at": "2021-01-01"})
+    attributes.set_row(0, {"doc_type": "client", "created_at": None})
+    assert attributes.size == 5
+    assert np.flatnonzero(attributes.mask({"doc_type": "client"})).tolist() == [0, 1, 4]
+    mask = attributes.mask({"created_at": ("2020-01-01", None)})
+    assert np.flatnonzero(mask).tolist() == [1, 4]
+
+
+def test_invalid_filter(attributes):
+    with pytest.raises(InvalidFilterError):
+        attributes.mask({"state": "open"})
+
+
+def test_cache_key(attributes):
+    key = attributes.cache_key({"doc_type": ["daemon"], "created_at": ("2020", None)})
+    assert key == attributes.cache_key(
+        {"created_at": ["2020", None], "doc_type": ("daemon",)}
+    )
+    assert attributes.cache_key(None) is None
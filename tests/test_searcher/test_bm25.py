@@ -0,0 +1,304 @@
+# bot modules
+from bot.database.sqlite import Database
+from bot.searcher.base import SearchEngine
+from bot.searcher.bm25 import InvertedIndexBM25, IndexFormatError
+import bot.searcher.bm25 as bm25_module
+
+# general python
+from rank_bm25 import BM25Okapi
+import numpy as np
+import random
+import json
+import pytest
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    random.seed(42)
+    vocabulary = [f"term{i}" for i in range(200)]
+    # skewed term distribution so that some terms get a negative idf
+    weights = [1 / (i + 1) for i in range(200)]
+    return [
+        random.choices(vocabulary, weights=weights, k=random.randint(1, 30))
+        for _ in range(300)
+    ]
+
+
+@pytest.fixture(scope="module")
+def queries():
+    random.seed(7)
+    return [
+        [f"term{random.randint(0, 220)}" for _ in range(random.randint(1, 6))]
+        for _ in range(50)
+    ]
+
+
+def test_idf_same_as_rank_bm25(corpus):
+    reference = BM25Okapi(corpus)
+    bm25 = InvertedIndexBM25(corpus)
+    assert bm25.average_idf == reference.average_idf
+    for term, idf in reference.idf.items():
+        assert bm25.idf[bm25.vocabulary[term]] == idf
+
+
+def test_scores_same_as_rank_bm25(corpus, queries):
+    reference = BM25Okapi(corpus)
+    bm25 = InvertedIndexBM25(corpus)
+    for query in queries:
+        assert np.array_equal(bm25.get_scores(query), reference.get_scores(query))
+
+
+def test_top_n_same_as_rank_bm25(corpus, queries):
+    reference = BM25Okapi(corpus)
+    bm25 = InvertedIndexBM25(corpus)
+    for query in queries:
+        scores = reference.get_scores(query)
+        rows, top_scores = bm25.get_top_n(query, 10)
+        expected = np.sort(scores[scores != 0])[::-1][:10]
+        assert np.array_equal(top_scores, expected)
+        assert np.array_equal(scores[rows], top_scores)
+
+
+def test_top_n_only_matching_documents():
+    bm25 = InvertedIndexBM25([["apple"], ["banana"], ["apple", "banana"]])
+    rows, scores = bm25.get_top_n(["banana"], 10)
+    assert sorted(rows.tolist()) == [1, 2]
+    rows, scores = bm25.get_top_n(["cherry"], 10)
+    assert len(rows) == 0
+
+
+def test_search_engine_backends_same_results(test_db):
+    results = []
+    for backend in ["max_score", "inverted_index", "rank_bm25"]:
+        se = SearchEngine(index="body", ids="email_id", backend=backend)
+        se.type = "Dummy Emails Search Engine"
+        se.load_index(
+            db=test_db, table_name="emails_doc_term_matrix", original_table="emails"
+        )
+        results.append(se.search("unique words in the email body", top_n=3))
+    reference = results[-1]
+    for res in results[:-1]:
+        assert res.email_id.tolist() == reference.email_id.tolist()
+        assert res.bm25_score.tolist() == reference.bm25_score.tolist()
+
+
+def test_search_engine_wrong_backend():
+    with pytest.raises(AssertionError):
+        SearchEngine(backend="elasticsearch")
+
+
+def test_pruned_top_n_same_as_exhaustive(corpus, queries, monkeypatch):
+    # prune even on the small test corpus
+    monkeypatch.setattr(bm25_module, "MIN_POSTINGS_TO_PRUNE", 0)
+    monkeypatch.setattr(bm25_module, "BLOCK_SIZE", 8)
+    bm25 = InvertedIndexBM25(corpus * 5)
+    for query in queries:
+        for n in [1, 3, 10]:
+            rows, scores = bm25.get_top_n(query, n)
+            pruned_rows, pruned_scores = bm25.get_top_n_pruned(query, n)
+            assert np.array_equal(rows, pruned_rows)
+            assert np.array_equal(scores, pruned_scores)
+
+
+def test_max_scores_are_upper_bounds(corpus):
+    bm25 = InvertedIndexBM25(corpus)
+    for term, term_id in bm25.vocabulary.items():
+        scores = bm25.get_scores([term])
+        assert scores[scores != 0].max() == bm25.max_scores[term_id]
+
+
+def test_save_load_same_scores(corpus, queries, tmp_path):
+    bm25 = InvertedIndexBM25(corpus)
+    bm25.save(str(tmp_path / "index"), doc_ids=[f"id_{i}" for i in range(len(corpus))])
+    loaded = InvertedIndexBM25.load(str(tmp_path / "index"))
+    assert type(loaded.postings) == np.memmap
+    assert loaded.doc_ids[3] == "id_3"
+    for query in queries:
+        assert np.array_equal(loaded.get_scores(query), bm25.get_scores(query))
+        for method in ["get_top_n", "get_top_n_pruned"]:
+            rows, scores = getattr(bm25, method)(query, 10)
+            loaded_rows, loaded_scores = getattr(loaded, method)(query, 10)
+            assert np.array_equal(rows, loaded_rows)
+            assert np.array_equal(scores, loaded_scores)
+
+
+def test_mapped_vocabulary(tmp_path):
+    bm25 = InvertedIndexBM25([["rucio", "rse"], ["rule", "ärger"], ["rse"]])
+    bm25.save(str(tmp_path / "index"))
+    vocabulary = InvertedIndexBM25.load(str(tmp_path / "index")).vocabulary
+    assert len(vocabulary) == 4
+    assert sorted(vocabulary) == sorted(["rucio", "rse", "rule", "ärger"])
+    assert "ärger" in vocabulary
+    assert "rucio" in vocabulary
+    assert "rules" not in vocabulary
+    with pytest.raises(KeyError):
+        vocabulary["aaa"]
+
+
+def test_load_wrong_format_version(tmp_path):
+    bm25 = InvertedIndexBM25([["rucio"]])
+    bm25.save(str(tmp_path / "index"))
+    with open(tmp_path / "index" / "header.json", "w") as f:
+        json.dump({"format_version": 0}, f)
+    with pytest.raises(IndexFormatError):
+        InvertedIndexBM25.load(str(tmp_path / "index"))
+    with pytest.raises(IndexFormatError):
+        InvertedIndexBM25.load(str(tmp_path / "missing"))
+
+
+def test_search_engine_converted_index(test_db, data_dir):
+    se = SearchEngine(index="body", ids="email_id")
+    se.type = "Dummy Emails Search Engine"
+    se.convert_index(db=test_db, table_name="emails_doc_term_matrix")
+    se.load_index(
+        db=test_db, table_name="emails_doc_term_matrix", original_table="emails"
+    )
+    assert type(se.bm25.postings) == np.memmap
+    res = se.search(query="banana", top_n=1)
+    assert res["email_id"].values[0] == 6
+    # already compact, nothing to do
+    se.compact()
+    assert type(se.bm25.postings) == np.memmap
+    assert se.search(query="banana", top_n=1)["email_id"].values[0] == 6
+
+
+def test_search_engine_reordered_corpus(test_db, data_dir):
+    db = Database("reordered.db")
+    test_db.get_dataframe("emails_doc_term_matrix").to_sql(
+        "emails_doc_term_matrix", con=db.db, index=False
+    )
+    emails = test_db.get_dataframe("emails")
+    se = SearchEngine(index="body", ids="email_id")
+    se.type = "Dummy Emails Search Engine"
+    se.convert_index(db=db, table_name="emails_doc_term_matrix")
+    # same number of documents, in another order
+    emails.iloc[::-1].to_sql("emails", con=db.db, index=False)
+    se.load_index(db=db, table_name="emails_doc_term_matrix", original_table="emails")
+    assert type(se.bm25.postings) != np.memmap
+    db.close_connection()
+
+
+def check_same_as_fresh_build(bm25, documents, queries):
+    """Compares the updated index to an index built from the documents left."""
+    rows = [row for row, document in enumerate(documents) if document is not None]
+    fresh = InvertedIndexBM25([documents[row] for row in rows])
+    for query in queries:
+        assert np.array_equal(bm25.get_scores(query)[rows], fresh.get_scores(query))
+        top_rows, top_scores = bm25.get_top_n_pruned(query, 10)
+        fresh_rows, fresh_scores = fresh.get_top_n(query, 10)
+        assert [rows.index(row) for row in top_rows] == fresh_rows.tolist()
+        assert np.array_equal(top_scores, fresh_scores)
+    assert bm25.average_idf == fresh.average_idf
+
+
+def test_incremental_updates_same_as_fresh_build(corpus, queries):
+    random.seed(3)
+    documents = [list(document) for document in corpus]
+    bm25 = InvertedIndexBM25(documents)
+    new_terms = [f"new{i}" for i in range(20)]
+    for step in range(200):
+        live = [row for row, document in enumerate(documents) if document is not None]
+        document = random.sample(new_terms + corpus[step], k=5)
+        action = random.choice(["add", "update", "delete"])
+        if action == "add":
+            assert bm25.add_document(document) == len(documents)
+            documents.append(document)
+        elif action == "update":
+            row = random.choice(live)
+            bm25.update_document(row, document)
+            documents[row] = document
+        else:
+            row = random.choice(live)
+            bm25.delete_document(row)
+            documents[row] = None
+        if step % 20 == 0:
+            check_same_as_fresh_build(bm25, documents, queries + [new_terms[:3]])
+    check_same_as_fresh_build(bm25, documents, queries + [new_terms[:3]])
+    rows = bm25.compact()
+    assert bm25.pending_updates == 0
+    check_same_as_fresh_build(bm25, [documents[row] for row in rows], queries)
+
+
+def test_delete_first_occurrence():
+    # "apple" and "banana" first occur in the deleted document
+    bm25 = InvertedIndexBM25([["apple", "banana"], ["banana", "apple"], ["cherry"]])
+    bm25.delete_document(0)
+    fresh = InvertedIndexBM25([["banana", "apple"], ["cherry"]])
+    assert bm25.get_scores(["apple"])[1:].tolist() == fresh.get_scores(["apple"]).tolist()
+    assert bm25.average_idf == fresh.average_idf
+
+
+def test_loaded_index_not_updatable(tmp_path):
+    InvertedIndexBM25([["rucio"]]).save(str(tmp_path / "index"))
+    bm25 = InvertedIndexBM25.load(str(tmp_path / "index"))
+    with pytest.raises(AssertionError):
+        bm25.add_document(["rse"])
+
+
+def test_save_pending_updates(tmp_path):
+    bm25 = InvertedIndexBM25([["rucio"]])
+    bm25.add_document(["rse"])
+    with pytest.raises(AssertionError):
+        bm25.save(str(tmp_path / "index"))
+    bm25.compact()
+    bm25.save(str(tmp_path / "index"))
+
+
+def test_batch_top_n_same_as_top_n(corpus, queries):
+    bm25 = InvertedIndexBM25(corpus)
+    rows, scores, offsets = bm25.get_top_n_batch(queries, 10)
+    assert len(offsets) == len(queries) + 1
+    for i, query in enumerate(queries):
+        top_rows, top_scores = bm25.get_top_n(query, 10)
+        nonzero = top_scores != 0
+        assert np.array_equal(rows[offsets[i] : offsets[i + 1]], top_rows[nonzero])
+        assert np.array_equal(scores[offsets[i] : offsets[i + 1]], top_scores[nonzero])
+
+
+def test_batch_top_n_after_updates(corpus, queries):
+    bm25 = InvertedIndexBM25(corpus)
+    bm25.get_top_n_batch(queries, 5)
+    bm25.add_document(["term1", "term2", "term2"])
+    bm25.delete_document(0)
+    rows, scores, offsets = bm25.get_top_n_batch(queries, 5)
+    for i, query in enumerate(queries):
+        top_rows, top_scores = bm25.get_top_n(query, 5)
+        assert np.array_equal(rows[offsets[i] : offsets[i + 1]], top_rows)
+        assert np.array_equal(scores[offsets[i] : offsets[i + 1]], top_scores)
+
+
+def test_search_batch_same_as_search(test_db):
+    queries = ["banana", "tfidf", "unique words in the email body", "", "email"]
+    for backend in ["max_score", "rank_bm25"]:
+        se = SearchEngine(index="body", ids="email_id", backend=backend)
+        se.type = "Dummy Emails Search Engine"
+        se.load_index(
+            db=test_db, table_name="emails_doc_term_matrix", original_table="emails"
+        )
+        ids, scores, offsets = se.search_batch(queries, top_n=3)
+        for i, query in enumerate(queries):
+            res = se.search(query, top_n=3)
+            assert ids[offsets[i] : offsets[i + 1]].tolist() == res.email_id.tolist()
+            assert scores[offsets[i] : offsets[i + 1]].tolist() == res.bm25_score.tolist()
+        # an empty batch
+        ids, scores, offsets = se.search_batch([], top_n=3)
+        assert len(ids) == len(scores) == 0
+        assert offsets.tolist() == [0]
+
+
+def test_filtered_top_n(corpus, queries, monkeypatch):
+    monkeypatch.setattr(bm25_module, "MIN_POSTINGS_TO_PRUNE", 0)
+    monkeypatch.setattr(bm25_module, "BLOCK_SIZE", 8)
+    bm25 = InvertedIndexBM25(corpus * 5)
+    random.seed(5)
+    allowed = np.array([random.random() < 0.3 for _ in range(bm25.corpus_size)])
+    for query in queries:
+        scores = bm25.get_scores(query)
+        matching = np.flatnonzero((scores != 0) & allowed)
+        expected = matching[np.lexsort((-matching, -scores[matching]))][:10]
+        for method in [bm25.get_top_n, bm25.get_top_n_pruned]:
+            rows, top_scores = method(query, 10, allowed)
+            assert rows.tolist() == expected.tolist()
+            assert np.array_equal(top_scores, scores[expected])
+    rows, top_scores, offsets = bm25.get_top_n_batch(queries, 10, allowed)
+    assert allowed[rows].all()
@@ -1,5 +1,6 @@
 # bot modules
 from bot.searcher.faq import FAQSearchEngine
+from bot.database.sqlite import Database
 
 # general python
 import pytest
@@ -33,3 +34,18 @@ def test_create_index():
 @pytest.mark.skip(reason="look into how to test")
 def test_load_index():
     pass
+
+
+def test_create_index_with_workers(test_db, data_dir):
+    faqs = test_db.get_dataframe("faq")
+    tables = {}
+    for workers in (1, 2):
+        db = Database(f"faq_{workers}.db")
+        se = FAQSearchEngine()
+        se.create_index(
+            corpus=faqs, db=db, table_name="faq_doc_term_matrix", workers=workers
+        )
+        tables[workers] = db.get_dataframe("faq_doc_term_matrix")
+        db.close_connection()
+    assert len(tables[1]) == len(faqs)
+    assert tables[1].equals(tables[2])
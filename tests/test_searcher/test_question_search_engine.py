@@ -1,7 +1,9 @@
 # bot modules
 from bot.searcher.question import QuestionSearchEngine
+from bot.database.sqlite import Database
 
 # general python
+import pandas as pd
 import pytest
 
 
@@ -33,3 +35,46 @@ def test_create_index():
 @pytest.mark.skip(reason="look into how to test")
 def test_load_index():
     pass
+
+
+def test_create_index_with_workers(test_db, data_dir):
+    questions = test_db.get_dataframe("questions")
+    tables = {}
+    for workers in (1, 2):
+        db = Database(f"questions_{workers}.db")
+        se = QuestionSearchEngine()
+        se.create_index(
+            corpus=questions,
+            db=db,
+            table_name="questions_doc_term_matrix",
+            workers=workers,
+        )
+        tables[workers] = db.get_dataframe("questions_doc_term_matrix")
+        db.close_connection()
+    assert len(tables[1]) == len(questions)
+    assert tables[1].equals(tables[2])
+
+
+def test_question_attributes_from_issues(test_db, data_dir):
+    questions = test_db.get_dataframe("questions")
+    issues = test_db.get_dataframe("issues")
+    # a few more questions so that the question's terms get a positive idf
+    others = pd.DataFrame(
+        {
+            "question_id": ["q1", "q2", "q3"],
+            "question": ["How do I add an RSE?", "What is a DID?", "Why use rules?"],
+            "issue_id": [None, None, None],
+        }
+    )
+    questions = pd.concat([questions, others], ignore_index=True)
+    db = Database("questions.db")
+    issues.to_sql("issues", con=db.db, index=False)
+    se = QuestionSearchEngine()
+    se.create_index(corpus=questions, db=db, table_name="questions_doc_term_matrix")
+    question = questions.question.values[0]
+    issue = issues[issues.issue_id == int(questions.issue_id.values[0])].iloc[0]
+    res = se.search(question, top_n=1, filters={"state": issue.state})
+    assert len(res) == 1
+    res = se.search(question, top_n=1, filters={"created_at": (None, "2000-01-01")})
+    assert len(res) == 0
+    db.close_connection()
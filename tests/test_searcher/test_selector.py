@@ -0,0 +1,56 @@
+# bot modules
+from bot.searcher.selector import CandidateSelector, select_within_budget, count_tokens
+
+# general python
+import pandas as pd
+import pytest
+
+
+@pytest.fixture()
+def results():
+    return pd.DataFrame(
+        {
+            "doc_id": [4, 2, 7, 1],
+            "bm25_score": [10.0, 6.0, 4.0, 1.0],
+            "context": ["one two three", "four five", "six seven eight nine", "ten"],
+        }
+    )
+
+
+def test_no_pruning_by_default(results):
+    assert CandidateSelector().select(results).equals(results)
+
+
+def test_select_by_score_fraction(results):
+    selected = CandidateSelector(min_score_fraction=0.5).select(results)
+    assert selected.doc_id.tolist() == [4, 2]
+
+
+def test_select_by_token_budget(results):
+    selector = CandidateSelector(max_tokens=6)
+    assert selector.select(results).doc_id.tolist() == [4, 2]
+    # the budget of the request is used when it's smaller
+    assert selector.select(results, max_tokens=3).doc_id.tolist() == [4]
+    # the top candidate is kept even if it doesn't fit
+    assert selector.select(results, max_tokens=1).doc_id.tolist() == [4]
+    assert CandidateSelector(min_candidates=0).select(results, max_tokens=1).empty
+
+
+def test_select_empty_results():
+    assert CandidateSelector(min_score_fraction=0.5, max_tokens=1).select(pd.DataFrame()).empty
+
+
+def test_select_within_budget(results):
+    questions = pd.DataFrame(
+        {"question_id": ["a", "b"], "bm25_score": [3.0, 2.7], "context": ["w " * 4, "w " * 5]}
+    )
+    selected_questions, selected_docs = select_within_budget([questions, results], 12)
+    # relative scores: a=1.0, doc 4=1.0, b=0.9, doc 2=0.6, ...
+    assert selected_questions.question_id.tolist() == ["a", "b"]
+    assert selected_docs.doc_id.tolist() == [4]
+    selected_questions, selected_docs = select_within_budget([questions, results], 0)
+    assert len(selected_questions) + len(selected_docs) == 1
+
+
+def test_count_tokens():
+    assert count_tokens(" Rucio  rules\nand RSEs ") == 4
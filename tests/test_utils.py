@@ -223,3 +223,42 @@ def test_custom_request():
     assert response["created_at"] == "2017-11-07T13:03:03Z"
     assert response["assignees"][0]["login"] == "bari12"
     assert type(response) == dict
+
+
+def test_analyzer_same_as_pre_process_text():
+    analyzer = utils.Analyzer()
+    texts = [
+        "How can I add a Replication Rule to 10 datasets?",
+        "The RSE's (Rucio Storage Elements) cannot be deleted... or can they?!",
+        "gonna try\twith tabs\nand newlines, programmers programming programs",
+        "naïve café “quoted” words",
+        "",
+    ]
+    for text in texts:
+        expected = utils.pre_process_text(
+            text,
+            lower_text=True,
+            remove_numbers=True,
+            numbers_replacement=" ",
+            remove_punctuation=True,
+            punctuation_replacement=" ",
+            remove_stop_words=True,
+            stem=True,
+            tokenize_text=True,
+        )
+        assert analyzer.analyze(text) == expected
+
+
+def test_analyzer_memoizes_chunks():
+    analyzer = utils.Analyzer(cache_size=2)
+    analyzer.analyze("replication replication rule")
+    info = analyzer.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.maxsize == 2
+
+
+def test_answer_f1():
+    assert utils.answer_f1("The Rucio daemons.", "rucio daemons the") == 1.0
+    assert utils.answer_f1("rucio", "rucio daemons") == pytest.approx(2 / 3)
+    assert utils.answer_f1("", "rucio") == 0.0